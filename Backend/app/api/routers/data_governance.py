@@ -1,328 +1,680 @@
-import logging
-import json
-from typing import Optional
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import ValidationError
-
-from app.core.config import Settings, get_settings # type: ignore
-from app.api import models # type: ignore
-from app.services import db_service, llm_service # type: ignore
-from app.services.errors import DatabaseServiceError, LLMServiceError # type: ignore
-
-logger = logging.getLogger(__name__)    
-
-router = APIRouter(
-    prefix="/data-gov",
-    tags=["Data Governance Workflow"]
-)
-
-def _get_conn_str(provided_str: Optional[str], settings: Settings) -> str:
-    conn_str = provided_str or settings.DATABASE_URL
-    if not conn_str:
-        raise HTTPException(status_code=400, detail="DB connection string not provided and not configured on server.")
-    return conn_str
-
-@router.post("/schema", response_model=models.SchemaResponse)
-async def extract_schema(params: models.DBParams, settings: Settings = Depends(get_settings)):
-    try:
-        conn_str = _get_conn_str(params.connection_string, settings)
-        schema_dict = await db_service.extract_db_schema(conn_str)
-        validated_schema = models.ExtractedSchema.model_validate(schema_dict)
-        return models.SchemaResponse(schema_data=validated_schema)
-    except ValidationError as e:
-        logger.error(f"Failed to validate the extracted schema: {e}")
-        raise HTTPException(status_code=500, detail=f"The extracted database schema has an unexpected structure: {e}")
-    except DatabaseServiceError as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
-
-
-@router.post("/explain_referential_integrity", response_model=models.ReferentialIntegrityResponse)
-async def explain_referential_integrity(
-    params: models.DBParams, 
-    settings: Settings = Depends(get_settings),
-    llm_service_instance: llm_service.LLMService = Depends(llm_service.get_llm_service)
-):
-    try:
-        conn_str = _get_conn_str(params.connection_string, settings)
-        schema_dict = await db_service.extract_db_schema(conn_str)
-        validated_schema = models.ExtractedSchema.model_validate(schema_dict)
-        
-        all_table_names = [table for table in validated_schema.tables]
-        foreign_keys_data = [fk.model_dump() for fk in validated_schema.foreign_keys]
-
-        user_prompt_data = {
-            "foreign_keys": foreign_keys_data,
-            "all_tables": all_table_names
-        }
-        
-        system_prompt = """
-        You are an expert data strategist and business analyst. Your job is to analyze a database schema and translate it into a holistic business intelligence report for a non-technical executive.
-        You will explain two types of data structures:
-        1.  **Data Relationships:** The connections between tables (foreign keys).
-        2.  **Foundational Tables:** Core tables that do not depend on others.
-        **Your Task:**
-        Based on the provided list of `foreign_keys` and `all_tables`, generate a JSON object with two sections.
-        **Part 1: Data Relationships**
-        For each foreign key, generate a three-part explanation.
-        - **The Business Rule:** A simple English statement of the rule (e.g., "Every `Order` must belong to an existing `Customer`.").
-        - **Impact of Change:** A clear warning about the "ripple effect" of breaking this link.
-        **Part 2: Foundational Data Tables**
-        First, identify the foundational tables. These are tables from the `all_tables` list that **do not appear** as a `from_table` in any of the `foreign_keys`.
-        For each foundational table you identify, provide:
-        - **Business Role:** Explain what this table represents in the business.
-        - **Impact of Change:** Explain the risk of modifying or deleting this table.
-        **Output Format (Strict JSON Only):**
-        - Your ONLY output must be a single, valid JSON object. No explanations or text outside the JSON.
-        - The root of the object must have TWO keys: `"relationship_explanations"` and `"foundational_tables"`.
-        - `"relationship_explanations"` is an array of objects, each with keys: `from_table`, `to_table`, `business_rule`, and `impact_of_change`.
-        - `"foundational_tables"` is an array of objects, each with keys: `table_name`, `business_role`, and `impact_of_change`.
-        """
-        user_prompt = f"Explain the schema based on this data:\n{json.dumps(user_prompt_data, indent=2)}"
-
-        response_json_str = await llm_service_instance.call_llm(
-            system_prompt, user_prompt, response_format={"type": "json_object"}
-        )
-        logger.info(f"Raw integrity explanation from AI: {response_json_str}")
-        
-        validated_explanation = models.ReferentialIntegrityResponse.model_validate_json(response_json_str)
-        
-        return validated_explanation
-
-    except (ValidationError, json.JSONDecodeError) as e:
-        raw_response = "N/A"
-        if 'response_json_str' in locals():
-            raw_response = response_json_str
-        logger.error(f"LLM returned data in an invalid format: {e}\nRaw Response: {raw_response}")
-        raise HTTPException(status_code=502, detail=f"The AI agent returned data in an invalid format: {e}")
-    except (DatabaseServiceError, LLMServiceError) as e:
-        raise HTTPException(status_code=getattr(e, 'status_code', 500), detail=str(e))
-
-
-@router.post("/classify_data", response_model=models.ClassificationResponse)
-async def classify_data(
-    params: models.ClassificationRequest, 
-    settings: Settings = Depends(get_settings),
-    llm_service_instance: llm_service.LLMService = Depends(llm_service.get_llm_service)
-):
-    try:
-        schema_to_classify = params.schema_data
-        if not schema_to_classify:
-            conn_str = _get_conn_str(params.connection_string, settings)
-            schema_dict = await db_service.extract_db_schema(conn_str)
-            schema_to_classify = models.ExtractedSchema.model_validate(schema_dict)
-
-        system_prompt = """
-        You are an expert data privacy and governance analyst. Your task is to classify each column in the provided database schema.
-        RULES:
-        1. You MUST return ONLY a single, valid JSON object.
-        2. The root key of the JSON object must be "classification_results".
-        3. The value of "classification_results" MUST be a JSON array (a list of objects `[]`).
-        4. Each object in the array represents a table and must have a "table_name" and a "columns" key.
-        5. For each column, provide a `classification` from this exact list: ["Public/Non-Sensitive", "Internal/Confidential", "PII", "Sensitive"].
-        6. Also provide a brief `reasoning` string for your classification choice.
-        ### EXAMPLE OF DESIRED JSON OUTPUT ###
-        {
-        "classification_results": [
-            {
-            "table_name": "users",
-            "columns": [
-                {
-                "column_name": "id",
-                "data_type": "INTEGER",
-                "classification": "Internal/Confidential",
-                "reasoning": "Internal identifier, not sensitive."
-                },
-                {
-                "column_name": "email",
-                "data_type": "VARCHAR",
-                "classification": "PII",
-                "reasoning": "Email is Personally Identifiable Information."
-                }
-            ]
-            }
-        ]
-        }
-        """
-        user_prompt = f"Classify the columns in this schema:\n{json.dumps(schema_to_classify.model_dump(), indent=2)}"
-        
-        response_json_str = await llm_service_instance.call_llm(
-            system_prompt, user_prompt, response_format={"type": "json_object"}
-        )
-        
-        logger.info(f"Raw classification response from AI: {response_json_str}")
-        return models.ClassificationResponse.model_validate_json(response_json_str)
-    except (ValidationError, json.JSONDecodeError) as e:
-        raise HTTPException(status_code=502, detail=f"The AI agent returned data in an invalid format: {e}")
-    except (DatabaseServiceError, LLMServiceError) as e:
-        raise HTTPException(status_code=getattr(e, 'status_code', 500), detail=str(e))
-
-
-@router.post("/generate_masking_sql", response_model=models.SQLGenerationResponse)
-async def generate_masking_sql(
-    params: models.MaskingRequest, 
-    settings: Settings = Depends(get_settings),
-    llm_service_instance: llm_service.LLMService = Depends(llm_service.get_llm_service)
-):
-    try:
-        system_prompt = """
-        You are a meticulous, senior PostgreSQL database administrator. Your only task is to generate a JSON data masking plan that produces 100% syntactically correct and executable PostgreSQL SQL.
-        **Golden Rules - You MUST follow these without exception:**
-        1.  **Absolute Identifier Quoting:** Every single identifier (table names, column names, and aliases) MUST be enclosed in double quotes ("").
-            - Correct: `"users"`, `"email"`, `AS "email"`
-            - Incorrect: `users`, `email`, `AS email`
-        2.  **User Check Logic:** The masking logic MUST use the simple user check: `current_user = 'admin'`. This logic determines if the user sees real data or masked data.
-        3.  **Strict Type Safety in CASE Statements:** Every branch of a `CASE` statement MUST return the exact same data type. To guarantee this, you MUST explicitly cast the masked value in the `ELSE` clause to match the original column's data type.
-            - For `text`, `varchar`, `char`: Use `'***'::text`.
-            - For `numeric`, `decimal`: Use `0::numeric`.
-            - For `integer`, `bigint`, `smallint`: Use `0::integer`.
-            - For `timestamp`, `timestamptz`, `date`: Use `'1970-01-01 00:00:00'::timestamp`.
-            - For `boolean`: Use `FALSE::boolean`.
-            - For `uuid`: Use `'00000000-0000-0000-0000-000000000000'::uuid`.
-        4.  **Referential Integrity is Sacred:** Columns classified as 'PK' (Primary Key) or 'FK' (Foreign Key) MUST NEVER be masked. Their `select_expression` must be only the double-quoted column name.
-        **Input Context:**
-        You will receive a JSON array describing tables. For each column, you are given its `column_name`, `data_type`, and `classification`. Use this information to apply the Golden Rules correctly.
-        **Output Format (JSON Only):**
-        - Your entire output must be a single JSON object. No explanations or markdown ````json.
-        - The root key is `"tables"`, an array of objects.
-        - Each table object has two keys: `"table_name"` and `"columns"`.
-        - Each column object has one key: `"select_expression"`.
-        ---
-        **Example Walkthrough (Corrected and Consistent)**
-        *   **For a sensitive `email` column (data_type: text):**
-            `"select_expression": "CASE WHEN current_user = 'admin' THEN \"email\" ELSE '***'::text END AS \"email\""`
-        *   **For a sensitive `balance` column (data_type: numeric):**
-            `"select_expression": "CASE WHEN current_user = 'admin' THEN \"balance\" ELSE 0::numeric END AS \"balance\""`
-        *   **For a primary key `id` column (data_type: integer, classification: PK):**
-            `"select_expression": "\"id\""`
-        *   **For a non-sensitive `created_at` column (data_type: timestamp):**
-            `"select_expression": "\"created_at\""`
-        """
-
-        user_prompt_data = [table.model_dump() for table in params.classification_results]
-        user_prompt = f"Generate the JSON masking plan for this classification:\n{json.dumps(user_prompt_data, indent=2)}"
-        
-        response_json_str = await llm_service_instance.call_llm(
-            system_prompt, user_prompt, response_format={"type": "json_object"}
-        )
-        logger.info(f"Raw masking plan response from AI: {response_json_str}")
-        
-        llm_data = json.loads(response_json_str)
-        validated_plan = models.LLMResponseModel.model_validate(llm_data)
-        
-        final_statements = []
-        for table_plan in validated_plan.tables:
-            if not table_plan.columns:
-                continue
-            
-            view_name = f"{table_plan.table_name}_governed_view"
-            select_clauses = [col.select_expression for col in table_plan.columns]
-            columns_sql = ",\n        ".join(select_clauses)
-            
-            create_view_sql = (
-                f'CREATE OR REPLACE VIEW public."{view_name}" AS\n'
-                f'    SELECT\n'
-                f'        {columns_sql}\n'
-                f'    FROM\n'
-                f'        public."{table_plan.table_name}";'
-            )
-            final_statements.append(create_view_sql)
-            
-        return models.SQLGenerationResponse(
-            sql_statements=final_statements,
-            message=f"Successfully generated {len(final_statements)} SQL statements."
-        )
-
-    except json.JSONDecodeError as e:
-        logger.error(f"LLM returned non-JSON response: {e}\nRaw Response: {response_json_str}")
-        raise HTTPException(
-            status_code=502,
-            detail="The AI agent returned a malformed response that could not be parsed as JSON."
-        )
-    except ValidationError as e:
-        logger.error(f"LLM response failed validation: {e}\nRaw Data: {llm_data}")
-        raise HTTPException(
-            status_code=502,
-            detail=f"The AI agent returned data in an unexpected format. Validation errors: {e}"
-        )
-    except LLMServiceError as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
-
-
-@router.post("/apply_masking_plan", response_model=models.ApplyPlanResponse)
-async def apply_masking_plan(params: models.ApplyMaskingRequest, settings: Settings = Depends(get_settings)):
-    try:
-        if not params.sql_statements:
-            raise HTTPException(status_code=400, detail="No SQL statements provided to apply.")
-
-        conn_str = _get_conn_str(params.connection_string, settings)
-        await db_service.execute_statements(conn_str, params.sql_statements)
-        
-        statement_count = len(params.sql_statements)
-        return models.ApplyPlanResponse(
-            message=f"Successfully applied {statement_count} SQL statement(s) to the database."
-        )
-        
-    except DatabaseServiceError as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
-
-@router.post("/list-governed-views", response_model=models.ListViewsResponse)
-async def list_governed_views(params: models.DBParams, settings: Settings = Depends(get_settings)):
-    try:
-        conn_str = _get_conn_str(params.connection_string, settings)
-        logger.info(f"Listing governed views for connection.")
-        
-        view_list = await db_service.list_governed_views(conn_str)
-        
-        return models.ListViewsResponse(governed_views=view_list)
-
-    except DatabaseServiceError as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
-    except Exception as e:
-        logger.error(f"Unexpected error listing views: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="An unexpected server error occurred.")
-
-
-@router.post("/fetch-view-data", response_model=models.FetchViewDataResponse)
-async def fetch_governed_view_data(
-    # The 'params' object now automatically includes the 'role' field
-    # thanks to our change in models.py.
-    params: models.FetchViewDataRequest, 
-    settings: Settings = Depends(get_settings)
-):
-    """
-    Fetches paginated data from a specified governed view, assuming a specific
-    database role for the duration of the query.
-    """
-    try:
-        conn_str = _get_conn_str(params.connection_string, settings)
-        view_name = params.view_name
-        
-        if not view_name.endswith('_governed_view'):
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Invalid view name. Only views ending in '_governed_view' can be queried by this endpoint."
-            )
-        
-        # Add a log message to show which role is being used for the query.
-        logger.info(f"Fetching data from view '{view_name}' as role '{params.role}' with limit {params.limit}, offset {params.offset}.")
-        
-        # Pass the new 'role' parameter to the service function call.
-        data_rows = await db_service.fetch_view_data(
-            conn_str=conn_str,
-            view_name=view_name,
-            limit=params.limit,
-            offset=params.offset,
-            role=params.role  
-        )
-        
-        return models.FetchViewDataResponse(
-            view_name=view_name,
-            row_count=len(data_rows),
-            data=data_rows
-        )
-
-    except DatabaseServiceError as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
-    except Exception as e:
-        logger.error(f"Unexpected error fetching view data: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="An unexpected server error occurred.")
\ No newline at end of file
+import asyncio
+import logging
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import ValidationError
+
+from app.core.config import Settings, get_settings # type: ignore
+from app.api import models # type: ignore
+from app.services import columnar, db_service, llm_service, sse # type: ignore
+from app.services.classification_catalog import classification_catalog # type: ignore
+from app.services.errors import DatabaseServiceError, LLMServiceError # type: ignore
+from app.logic import classification, fk_graph, masking_compiler, pagination, pre_classifier, prompt_encoding, referential_integrity # type: ignore
+from app.logic.data_gov_logic import clean_masking_plan # type: ignore
+
+logger = logging.getLogger(__name__)    
+
+router = APIRouter(
+    prefix="/data-gov",
+    tags=["Data Governance Workflow"]
+)
+
+def _get_conn_str(provided_str: Optional[str], settings: Settings) -> str:
+    conn_str = provided_str or settings.DATABASE_URL
+    if not conn_str:
+        raise HTTPException(status_code=400, detail="DB connection string not provided and not configured on server.")
+    return conn_str
+
+@router.post("/schema", response_model=models.SchemaResponse)
+async def extract_schema(params: models.DBParams, settings: Settings = Depends(get_settings)):
+    try:
+        conn_str = _get_conn_str(params.connection_string, settings)
+        schema_dict = await db_service.extract_db_schema(conn_str)
+        validated_schema = models.ExtractedSchema.model_validate(schema_dict)
+        return models.SchemaResponse(schema_data=validated_schema)
+    except ValidationError as e:
+        logger.error(f"Failed to validate the extracted schema: {e}")
+        raise HTTPException(status_code=500, detail=f"The extracted database schema has an unexpected structure: {e}")
+    except DatabaseServiceError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+
+@router.post("/explain_referential_integrity", response_model=models.ReferentialIntegrityResponse)
+async def explain_referential_integrity(
+    params: models.DBParams, 
+    settings: Settings = Depends(get_settings),
+    llm_service_instance: llm_service.LLMService = Depends(llm_service.get_llm_service)
+):
+    try:
+        conn_str = _get_conn_str(params.connection_string, settings)
+        schema_dict = await db_service.extract_db_schema(conn_str)
+        validated_schema = models.ExtractedSchema.model_validate(schema_dict)
+        
+        # Roots, depths, cycles and impact sets are graph facts computed locally;
+        # the LLM only words the explanations, one call per group of related tables.
+        graph = await asyncio.to_thread(fk_graph.get_fk_graph, validated_schema)
+        return await referential_integrity.explain_schema(
+            graph,
+            llm_service_instance,
+            concurrency=settings.RI_EXPLAIN_CONCURRENCY,
+            max_items_per_batch=settings.RI_EXPLAIN_MAX_FKS_PER_BATCH,
+        )
+
+    except (ValidationError, json.JSONDecodeError) as e:
+        logger.error(f"LLM returned data in an invalid format: {e}")
+        raise HTTPException(status_code=502, detail=f"The AI agent returned data in an invalid format: {e}")
+    except (DatabaseServiceError, LLMServiceError) as e:
+        raise HTTPException(status_code=getattr(e, 'status_code', 500), detail=str(e))
+
+
+@router.post("/explain_referential_integrity/stream")
+async def explain_referential_integrity_stream(
+    params: models.DBParams,
+    settings: Settings = Depends(get_settings),
+    llm_service_instance: llm_service.LLMService = Depends(llm_service.get_llm_service)
+):
+    """
+    Server-sent-events variant of `/explain_referential_integrity`. Emits `graph`
+    (table_dependencies and cycles, computed locally) immediately, then each
+    `relationship` and `foundational_table` as the model finishes it, and finally
+    `done` with the complete ReferentialIntegrityResponse, or `error`.
+    """
+    try:
+        conn_str = _get_conn_str(params.connection_string, settings)
+        schema_dict = await db_service.extract_db_schema(conn_str)
+        validated_schema = models.ExtractedSchema.model_validate(schema_dict)
+        graph = await asyncio.to_thread(fk_graph.get_fk_graph, validated_schema)
+    except ValidationError as e:
+        raise HTTPException(status_code=500, detail=f"The extracted database schema has an unexpected structure: {e}")
+    except DatabaseServiceError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+    async def events():
+        async for event, payload in referential_integrity.stream_report(
+            graph,
+            llm_service_instance,
+            concurrency=settings.RI_EXPLAIN_CONCURRENCY,
+            max_items_per_batch=settings.RI_EXPLAIN_MAX_FKS_PER_BATCH,
+        ):
+            yield sse.format_event(event, payload)
+
+    return sse.sse_response(events())
+
+
+@router.post("/classify_data", response_model=models.ClassificationResponse)
+async def classify_data(
+    params: models.ClassificationRequest, 
+    settings: Settings = Depends(get_settings),
+    llm_service_instance: llm_service.LLMService = Depends(llm_service.get_llm_service)
+):
+    """
+    Classifies every column of the schema. Unless `pre_classify` is off, columns
+    that name/type rules (and, if enabled, Presidio over sampled values) can
+    settle are decided locally; only the rest are sent to the LLM. Each column
+    records the engine that decided it in `decided_by`.
+
+    When the database is known (extracted here or given by `connection_string`),
+    results are kept in the classification catalog and a re-run only classifies
+    columns that were added or changed type; unchanged columns are returned as stored.
+    """
+    try:
+        conn_str = None
+        schema_to_classify = params.schema_data
+        if not schema_to_classify:
+            conn_str = _get_conn_str(params.connection_string, settings)
+            schema_dict = await db_service.extract_db_schema(conn_str)
+            schema_to_classify = models.ExtractedSchema.model_validate(schema_dict)
+        elif params.connection_string:
+            conn_str = params.connection_string
+
+        return await _classify_incrementally(
+            schema_to_classify, conn_str, params, settings, llm_service_instance,
+            use_catalog=params.use_catalog,
+        )
+    except (ValidationError, json.JSONDecodeError) as e:
+        raise HTTPException(status_code=502, detail=f"The AI agent returned data in an invalid format: {e}")
+    except (DatabaseServiceError, LLMServiceError) as e:
+        raise HTTPException(status_code=getattr(e, 'status_code', 500), detail=str(e))
+
+
+@router.post("/classify_data/reclassify", response_model=models.ClassificationResponse)
+async def reclassify_tables(
+    params: models.ReclassifyTablesRequest,
+    settings: Settings = Depends(get_settings),
+    llm_service_instance: llm_service.LLMService = Depends(llm_service.get_llm_service)
+):
+    """
+    Discards the catalog entries of `table_names` and classifies those tables
+    from scratch, e.g. after their contents changed meaning without a type change.
+    """
+    try:
+        conn_str = _get_conn_str(params.connection_string, settings)
+        schema_dict = await db_service.extract_db_schema(conn_str)
+        full_schema = models.ExtractedSchema.model_validate(schema_dict)
+        missing = [name for name in params.table_names if name not in full_schema.tables]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Tables not found in the database: {', '.join(missing)}")
+
+        wanted = set(params.table_names)
+        schema_to_classify = models.ExtractedSchema(
+            tables={name: table for name, table in full_schema.tables.items() if name in wanted},
+            foreign_keys=[fk for fk in full_schema.foreign_keys if fk.referencing_table in wanted],
+        )
+        removed = await asyncio.to_thread(classification_catalog.forget_tables, conn_str, params.table_names)
+        logger.info(f"Forgot {removed} stored classification(s) for tables {params.table_names}.")
+
+        classify_params = models.ClassificationRequest(
+            connection_string=params.connection_string, pre_classify=params.pre_classify,
+        )
+        return await _classify_incrementally(
+            schema_to_classify, conn_str, classify_params, settings, llm_service_instance, use_catalog=True,
+        )
+    except (ValidationError, json.JSONDecodeError) as e:
+        raise HTTPException(status_code=502, detail=f"The AI agent returned data in an invalid format: {e}")
+    except (DatabaseServiceError, LLMServiceError) as e:
+        raise HTTPException(status_code=getattr(e, 'status_code', 500), detail=str(e))
+
+
+async def _classify_incrementally(
+    schema: models.ExtractedSchema,
+    conn_str: Optional[str],
+    params: models.ClassificationRequest,
+    settings: Settings,
+    llm_service_instance: llm_service.LLMService,
+    use_catalog: bool,
+) -> models.ClassificationResponse:
+    """Catalog lookup -> local pre-classification -> LLM for the rest -> merge and store."""
+    decided, residual, use_catalog = await _decide_locally(schema, conn_str, params, settings, use_catalog)
+
+    llm_result = None
+    if residual.tables:
+        llm_result = await _classify_with_llm(residual, params, settings, llm_service_instance)
+
+    result = pre_classifier.merge_classifications(schema, decided, llm_result)
+    if use_catalog:
+        await asyncio.to_thread(classification_catalog.store, conn_str, schema, result)
+    return result
+
+
+async def _decide_locally(
+    schema: models.ExtractedSchema,
+    conn_str: Optional[str],
+    params: models.ClassificationRequest,
+    settings: Settings,
+    use_catalog: bool,
+) -> Tuple[Dict[str, Dict[str, models.ClassifiedColumn]], models.ExtractedSchema, bool]:
+    """
+    Everything that needs no LLM: catalog reuse, then name/type rules and Presidio.
+    Returns (decided columns per table, residual schema for the LLM, whether the catalog is in use).
+    """
+    use_catalog = use_catalog and conn_str is not None and classification_catalog.enabled
+    known, pending = {}, schema
+    if use_catalog:
+        known, pending = await asyncio.to_thread(classification_catalog.lookup, conn_str, schema)
+
+    decided, residual = {}, pending
+    if params.pre_classify and pending.tables:
+        decided, residual = pre_classifier.pre_classify(pending)
+        if settings.CLASSIFY_PRESIDIO_ENABLED and conn_str and residual.tables and pre_classifier.presidio_available():
+            samples = await db_service.sample_column_values(
+                conn_str, pre_classifier.text_columns(residual), settings.CLASSIFY_PRESIDIO_SAMPLE_ROWS
+            )
+            found = await asyncio.to_thread(pre_classifier.classify_samples_with_presidio, residual, samples)
+            for table_name, columns in found.items():
+                decided.setdefault(table_name, {}).update(columns)
+            residual = pre_classifier.remove_decided(residual, found)
+
+    for table_name, columns in decided.items():
+        known.setdefault(table_name, {}).update(columns)
+    return known, residual, use_catalog
+
+
+@router.post("/classify_data/stream")
+async def classify_data_stream(
+    params: models.ClassificationRequest,
+    settings: Settings = Depends(get_settings),
+    llm_service_instance: llm_service.LLMService = Depends(llm_service.get_llm_service)
+):
+    """
+    Server-sent-events variant of `/classify_data`. Emits one `table` event
+    (a ClassifiedTable) per table as soon as it is fully classified: tables
+    settled locally first, then each table as the model finishes it. Ends with
+    `done` carrying the complete ClassificationResponse, or `error`. Items the
+    model gets wrong are reported as `invalid` and reclassified before `done`.
+    """
+    try:
+        conn_str = None
+        schema_to_classify = params.schema_data
+        if not schema_to_classify:
+            conn_str = _get_conn_str(params.connection_string, settings)
+            schema_dict = await db_service.extract_db_schema(conn_str)
+            schema_to_classify = models.ExtractedSchema.model_validate(schema_dict)
+        elif params.connection_string:
+            conn_str = params.connection_string
+    except ValidationError as e:
+        raise HTTPException(status_code=500, detail=f"The extracted database schema has an unexpected structure: {e}")
+    except DatabaseServiceError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+    return sse.sse_response(
+        _classification_events(schema_to_classify, conn_str, params, settings, llm_service_instance)
+    )
+
+
+async def _classification_events(
+    schema: models.ExtractedSchema,
+    conn_str: Optional[str],
+    params: models.ClassificationRequest,
+    settings: Settings,
+    llm_service_instance: llm_service.LLMService,
+) -> AsyncIterator[str]:
+    decided, residual, use_catalog = await _decide_locally(schema, conn_str, params, settings, params.use_catalog)
+
+    def merged_table(table_name: str, llm_table: Optional[models.ClassifiedTable]) -> Optional[models.ClassifiedTable]:
+        single = models.ExtractedSchema(tables={table_name: schema.tables[table_name]}, foreign_keys=[])
+        llm_result = models.ClassificationResponse(classification_results=[llm_table] if llm_table else [])
+        results = pre_classifier.merge_classifications(single, {table_name: decided.get(table_name, {})}, llm_result)
+        return results.classification_results[0] if results.classification_results else None
+
+    for table_name in schema.tables:
+        if table_name not in residual.tables and table_name in decided:
+            yield sse.format_event("table", merged_table(table_name, None))
+
+    llm_tables: Dict[str, models.ClassifiedTable] = {}
+    if residual.tables:
+        max_chunk_tokens = (params.max_chunk_tokens or settings.CLASSIFY_CHUNK_MAX_TOKENS) if params.chunked else None
+        async for event, payload in classification.stream_classified_tables(
+            residual, llm_service_instance, max_chunk_tokens, settings.CLASSIFY_CHUNK_CONCURRENCY
+        ):
+            if event != "table":
+                yield sse.format_event(event, payload)
+                continue
+            if payload.table_name not in residual.tables or payload.table_name in llm_tables:
+                continue
+            llm_tables[payload.table_name] = payload
+            table = merged_table(payload.table_name, payload)
+            if table is not None:
+                yield sse.format_event("table", table)
+
+        missing = [name for name in residual.tables if name not in llm_tables]
+        if missing:
+            logger.warning(f"Streamed classification left out tables {missing}; classifying them again.")
+            retry_schema = models.ExtractedSchema(
+                tables={name: residual.tables[name] for name in missing},
+                foreign_keys=[fk for fk in residual.foreign_keys if fk.referencing_table in missing],
+            )
+            retried = await _classify_with_llm(retry_schema, params, settings, llm_service_instance)
+            for llm_table in retried.classification_results:
+                if llm_table.table_name in retry_schema.tables and llm_table.table_name not in llm_tables:
+                    llm_tables[llm_table.table_name] = llm_table
+                    table = merged_table(llm_table.table_name, llm_table)
+                    if table is not None:
+                        yield sse.format_event("table", table)
+
+    llm_result = models.ClassificationResponse(classification_results=list(llm_tables.values()))
+    result = pre_classifier.merge_classifications(schema, decided, llm_result)
+    if use_catalog:
+        await asyncio.to_thread(classification_catalog.store, conn_str, schema, result)
+    yield sse.format_event("done", result)
+
+
+async def _classify_with_llm(
+    schema: models.ExtractedSchema,
+    params: models.ClassificationRequest,
+    settings: Settings,
+    llm_service_instance: llm_service.LLMService,
+) -> models.ClassificationResponse:
+    if params.chunked:
+        return await classification.classify_schema_chunked(
+            schema,
+            llm_service_instance,
+            max_chunk_tokens=params.max_chunk_tokens or settings.CLASSIFY_CHUNK_MAX_TOKENS,
+            concurrency=settings.CLASSIFY_CHUNK_CONCURRENCY,
+            max_retries=settings.CLASSIFY_CHUNK_MAX_RETRIES,
+        )
+
+    system_prompt = classification.CLASSIFICATION_SYSTEM_PROMPT
+    user_prompt = classification.build_classification_user_prompt(schema)
+    
+    response_json_str = await llm_service_instance.call_llm(
+        system_prompt, user_prompt, response_format={"type": "json_object"}, endpoint="classify_data",
+        validate=models.ClassificationResponse.model_validate_json,
+    )
+    
+    logger.info(f"Raw classification response from AI: {response_json_str}")
+    return models.ClassificationResponse.model_validate_json(response_json_str)
+
+
+@router.post("/generate_masking_sql", response_model=models.SQLGenerationResponse)
+async def generate_masking_sql(
+    params: models.MaskingRequest, 
+    settings: Settings = Depends(get_settings),
+    llm_service_instance: llm_service.LLMService = Depends(llm_service.get_llm_service)
+):
+    """
+    Builds one `CREATE OR REPLACE VIEW <table>_governed_view` statement per classified table.
+
+    By default the views are compiled locally from fixed rules (quoted identifiers,
+    type-matched mask literals, PK/FK columns never masked), which needs no LLM call.
+    `mode="llm"` keeps the previous AI-generated plan.
+    """
+    if params.mode == "compiler":
+        return await _compile_masking_sql(params, settings)
+    try:
+        key_columns = await _masking_key_columns(params, settings, params.classification_results)
+        final_statements = await _generate_masking_statements_with_llm(
+            params.classification_results, llm_service_instance, key_columns
+        )
+        return models.SQLGenerationResponse(
+            sql_statements=final_statements,
+            message=f"Successfully generated {len(final_statements)} SQL statements."
+        )
+
+    except json.JSONDecodeError as e:
+        logger.error(f"LLM returned non-JSON response: {e}")
+        raise HTTPException(
+            status_code=502,
+            detail="The AI agent returned a malformed response that could not be parsed as JSON."
+        )
+    except ValidationError as e:
+        logger.error(f"LLM response failed validation: {e}")
+        raise HTTPException(
+            status_code=502,
+            detail=f"The AI agent returned data in an unexpected format. Validation errors: {e}"
+        )
+    except (DatabaseServiceError, LLMServiceError) as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+
+async def _generate_masking_statements_with_llm(
+    classification_results: List[models.ClassifiedTable],
+    llm_service_instance: llm_service.LLMService,
+    key_columns: Optional[Dict[str, List[str]]] = None,
+) -> List[str]:
+    """
+    LLM mode for /generate_masking_sql: one CREATE VIEW statement per table in the
+    AI's plan. `key_columns` (PK/FK columns per table) lets columns the plan leaves
+    out be masked safely; without it they are passed through unmasked.
+    """
+    system_prompt = """
+    You are a meticulous, senior PostgreSQL database administrator. Your only task is to generate a JSON data masking plan that produces 100% syntactically correct and executable PostgreSQL SQL.
+    **Golden Rules - You MUST follow these without exception:**
+    1.  **Absolute Identifier Quoting:** Every single identifier (table names, column names, and aliases) MUST be enclosed in double quotes ("").
+        - Correct: `"users"`, `"email"`, `AS "email"`
+        - Incorrect: `users`, `email`, `AS email`
+    2.  **User Check Logic:** The masking logic MUST use the simple user check: `current_user = 'admin'`. This logic determines if the user sees real data or masked data.
+    3.  **Strict Type Safety in CASE Statements:** Every branch of a `CASE` statement MUST return the exact same data type. To guarantee this, you MUST explicitly cast the masked value in the `ELSE` clause to match the original column's data type.
+        - For `text`, `varchar`, `char`: Use `'***'::text`.
+        - For `numeric`, `decimal`: Use `0::numeric`.
+        - For `integer`, `bigint`, `smallint`: Use `0::integer`.
+        - For `timestamp`, `timestamptz`, `date`: Use `'1970-01-01 00:00:00'::timestamp`.
+        - For `boolean`: Use `FALSE::boolean`.
+        - For `uuid`: Use `'00000000-0000-0000-0000-000000000000'::uuid`.
+    4.  **Referential Integrity is Sacred:** Columns classified as 'PK' (Primary Key) or 'FK' (Foreign Key) MUST NEVER be masked. Their `select_expression` must be only the double-quoted column name.
+    **Input Context:**
+    You will receive one line per table in the form `table: column data_type [classification], ...`. Use each column's name, data type and classification to apply the Golden Rules correctly.
+    **Output Format (JSON Only):**
+    - Your entire output must be a single JSON object. No explanations or markdown ````json.
+    - The root key is `"tables"`, an array of objects.
+    - Each table object has two keys: `"table_name"` and `"columns"`.
+    - Each column object has one key: `"select_expression"`.
+    ---
+    **Example Walkthrough (Corrected and Consistent)**
+    *   **For a sensitive `email` column (data_type: text):**
+        `"select_expression": "CASE WHEN current_user = 'admin' THEN \"email\" ELSE '***'::text END AS \"email\""`
+    *   **For a sensitive `balance` column (data_type: numeric):**
+        `"select_expression": "CASE WHEN current_user = 'admin' THEN \"balance\" ELSE 0::numeric END AS \"balance\""`
+    *   **For a primary key `id` column (data_type: integer, classification: PK):**
+        `"select_expression": "\"id\""`
+    *   **For a non-sensitive `created_at` column (data_type: timestamp):**
+        `"select_expression": "\"created_at\""`
+    """
+
+    user_prompt = (
+        "Generate the JSON masking plan for this classification:\n"
+        f"{prompt_encoding.encode_classified_tables(classification_results)}"
+    )
+    
+    def parse_plan(response_json_str: str) -> models.LLMResponseModel:
+        llm_data = clean_masking_plan(json.loads(response_json_str), classification_results, key_columns)
+        return models.LLMResponseModel.model_validate(llm_data)
+
+    response_json_str = await llm_service_instance.call_llm(
+        system_prompt, user_prompt, response_format={"type": "json_object"}, endpoint="generate_masking_sql",
+        validate=parse_plan,
+    )
+    logger.info(f"Raw masking plan response from AI: {response_json_str}")
+    
+    validated_plan = parse_plan(response_json_str)
+    
+    schema_by_table = {table.table_name: table.schema_name for table in classification_results}
+    final_statements = []
+    for table_plan in validated_plan.tables:
+        if not table_plan.columns:
+            continue
+        
+        schema = schema_by_table.get(table_plan.table_name)
+        view_name = f"{table_plan.table_name}_governed_view"
+        select_clauses = [col.select_expression for col in table_plan.columns]
+        columns_sql = ",\n        ".join(select_clauses)
+        
+        create_view_sql = (
+            f'CREATE OR REPLACE VIEW {masking_compiler.qualified_name(schema, view_name)} AS\n'
+            f'    SELECT\n'
+            f'        {columns_sql}\n'
+            f'    FROM\n'
+            f'        {masking_compiler.qualified_name(schema, table_plan.table_name)};'
+        )
+        final_statements.append(create_view_sql)
+    return final_statements
+
+
+async def _compile_masking_sql(params: models.MaskingRequest, settings: Settings) -> models.SQLGenerationResponse:
+    """Compiler mode for /generate_masking_sql: no LLM round trip."""
+    try:
+        key_columns = await _masking_key_columns(params, settings, params.classification_results)
+        final_statements = masking_compiler.compile_masking_plan(params.classification_results, key_columns)
+        return models.SQLGenerationResponse(
+            sql_statements=final_statements,
+            message=f"Successfully compiled {len(final_statements)} SQL statements."
+        )
+    except DatabaseServiceError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+
+async def _masking_key_columns(
+    params: models.MaskingRequest, settings: Settings, tables: List[models.ClassifiedTable]
+) -> Optional[Dict[str, List[str]]]:
+    """
+    PK/FK columns of `tables`, read from the database they were classified from
+    (the server's default database when no connection_string is given). The
+    compiler cannot run without them; llm mode returns None when there is no
+    database to read from.
+    """
+    if params.mode != "compiler" and not (params.connection_string or settings.DATABASE_URL):
+        return None
+    conn_str = _get_conn_str(params.connection_string, settings)
+    schema_by_table = {table.table_name: table.schema_name for table in tables}
+    return await db_service.get_key_columns(conn_str, list(schema_by_table), schema_by_table)
+
+
+@router.post("/apply_masking_plan", response_model=models.ApplyPlanResponse)
+async def apply_masking_plan(params: models.ApplyMaskingRequest, settings: Settings = Depends(get_settings)):
+    try:
+        if not params.sql_statements:
+            raise HTTPException(status_code=400, detail="No SQL statements provided to apply.")
+
+        conn_str = _get_conn_str(params.connection_string, settings)
+        await db_service.execute_statements(conn_str, params.sql_statements)
+        
+        statement_count = len(params.sql_statements)
+        return models.ApplyPlanResponse(
+            message=f"Successfully applied {statement_count} SQL statement(s) to the database."
+        )
+        
+    except DatabaseServiceError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+@router.post("/list-governed-views", response_model=models.ListViewsResponse)
+async def list_governed_views(params: models.DBParams, settings: Settings = Depends(get_settings)):
+    try:
+        conn_str = _get_conn_str(params.connection_string, settings)
+        logger.info(f"Listing governed views for connection.")
+        
+        view_list = await db_service.list_governed_views(conn_str)
+        
+        return models.ListViewsResponse(governed_views=view_list)
+
+    except DatabaseServiceError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Unexpected error listing views: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="An unexpected server error occurred.")
+
+
+@router.post("/fetch-view-data", response_model=models.FetchViewDataResponse)
+async def fetch_governed_view_data(
+    # The 'params' object now automatically includes the 'role' field
+    # thanks to our change in models.py.
+    params: models.FetchViewDataRequest, 
+    request: Request,
+    format: Optional[str] = Query(None, description="Response format: json (default), arrow or parquet. Overrides the Accept header."),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Fetches paginated data from a specified governed view, assuming a specific
+    database role for the duration of the query.
+
+    JSON is returned by default. Clients that send `Accept: application/vnd.apache.arrow.stream`
+    (or `application/vnd.apache.parquet`), or pass `?format=arrow|parquet`, get the page as a
+    columnar payload instead; in cursor mode the next cursor is sent in the X-Next-Cursor header.
+    """
+    try:
+        conn_str = _get_conn_str(params.connection_string, settings)
+        view_name = params.view_name
+        
+        if not view_name.endswith('_governed_view'):
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Invalid view name. Only views ending in '_governed_view' can be queried by this endpoint."
+            )
+
+        try:
+            output_format = columnar.negotiate_format(request.headers.get("accept"), format)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        next_cursor = None
+        if params.use_cursor or params.cursor:
+            columns, rows, next_cursor = await _fetch_view_rows_by_cursor(conn_str, params)
+        else:
+            # Add a log message to show which role is being used for the query.
+            logger.info(f"Fetching data from view '{view_name}' as role '{params.role}' with limit {params.limit}, offset {params.offset}.")
+            
+            # Pass the new 'role' parameter to the service function call.
+            columns, rows = await db_service.fetch_view_rows(
+                conn_str=conn_str,
+                view_name=view_name,
+                limit=params.limit,
+                offset=params.offset,
+                role=params.role  
+            )
+
+        if output_format != "json":
+            return _columnar_response(columns, rows, output_format, {"view_name": view_name, "next_cursor": next_cursor})
+
+        return models.FetchViewDataResponse(
+            view_name=view_name,
+            row_count=len(rows),
+            data=[dict(zip(columns, row)) for row in rows],
+            next_cursor=next_cursor,
+        )
+
+    except HTTPException:
+        raise
+    except DatabaseServiceError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Unexpected error fetching view data: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="An unexpected server error occurred.")
+
+
+
+@router.post("/export-view-data")
+async def export_governed_view_data(params: models.ExportViewDataRequest, settings: Settings = Depends(get_settings)):
+    """
+    Streams every row of a governed view as NDJSON or CSV, as the given role.
+    Rows are read through a server-side cursor, so memory stays constant
+    whatever the size of the view.
+    """
+    conn_str = _get_conn_str(params.connection_string, settings)
+    view_name = params.view_name
+    if not view_name.endswith('_governed_view'):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid view name. Only views ending in '_governed_view' can be exported by this endpoint."
+        )
+    try:
+        logger.info(f"Exporting view '{view_name}' as role '{params.role}' in {params.format} format.")
+        export = await db_service.open_view_export(conn_str, view_name, params.role, params.format, params.batch_size)
+    except DatabaseServiceError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+    media_type = "text/csv" if params.format == "csv" else "application/x-ndjson"
+    extension = "csv" if params.format == "csv" else "ndjson"
+    return StreamingResponse(
+        iter(export),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{view_name}.{extension}"'},
+        background=BackgroundTask(export.close),
+    )
+
+async def _fetch_view_rows_by_cursor(conn_str: str, params: models.FetchViewDataRequest):
+    """
+    Keyset pagination for /fetch-view-data: cost per page is independent of page depth.
+    Returns (columns, row tuples, next cursor or None).
+    """
+    view_name = params.view_name
+    after = None
+    if params.cursor:
+        try:
+            cursor_view, key_columns, after = pagination.decode_cursor(params.cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if cursor_view != view_name:
+            raise HTTPException(status_code=400, detail=f"The cursor was issued for view '{cursor_view}', not '{view_name}'.")
+    else:
+        key_columns = await db_service.get_view_key_columns(conn_str, view_name, params.key_column)
+
+    logger.info(f"Fetching data from view '{view_name}' as role '{params.role}' with limit {params.limit}, keyset on {key_columns}.")
+    columns, rows, last_key = await db_service.fetch_view_rows_keyset(
+        conn_str=conn_str,
+        view_name=view_name,
+        limit=params.limit,
+        role=params.role,
+        key_columns=key_columns,
+        after=after,
+    )
+    try:
+        next_cursor = pagination.encode_cursor(view_name, key_columns, last_key) if last_key is not None else None
+    except TypeError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot page '{view_name}' by {key_columns}: {e}. Use a text, numeric, date/time or UUID key column.",
+        )
+    return columns, rows, next_cursor
+
+
+def _columnar_response(columns, rows, output_format: str, metadata: dict) -> Response:
+    """Encodes a page of rows as Arrow IPC or Parquet, mirroring metadata into headers."""
+    try:
+        body = columnar.encode(columns, rows, output_format, metadata)
+    except columnar.ColumnarUnavailableError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    headers = {"X-Row-Count": str(len(rows))}
+    if metadata.get("next_cursor"):
+        headers["X-Next-Cursor"] = metadata["next_cursor"]
+    return Response(content=body, media_type=columnar.media_type_for(output_format), headers=headers)
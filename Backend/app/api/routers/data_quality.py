@@ -2,14 +2,16 @@
 
 import logging
 import json
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel, ValidationError
 
 from app.core.config import Settings, get_settings
 from app.api import models
-from app.services import db_service, llm_service
+from app.logic import json_stream, prompt_encoding
+from app.services import db_service, llm_service, quality_engine, sse
 from app.services.errors import DatabaseServiceError, LLMServiceError
+from app.services.cancellation import cancel_on_disconnect, ClientDisconnectedError
 
 logger = logging.getLogger(__name__)    
 
@@ -24,27 +26,7 @@ def _get_conn_str(provided_str: Optional[str], settings: Settings) -> str:
         raise HTTPException(status_code=400, detail="DB connection string not provided and not configured on server.")
     return conn_str
 
-# ===================================================================
-# ENDPOINT 1: Generate a plan of proposed checks
-# ===================================================================
-@router.post("/generate-quality-plan", response_model=models.GenerateQualityPlanResponse)
-async def generate_quality_plan(
-    params: models.GenerateQualityPlanRequest, 
-    settings: Settings = Depends(get_settings),
-    llm_service_instance: llm_service.LLMService = Depends(llm_service.get_llm_service)
-):
-    """
-    Analyzes a table's schema and generates a list of recommended data quality checks.
-    """
-    try:
-        conn_str = _get_conn_str(params.connection_string, settings)
-        schema_dict = await db_service.extract_db_schema(conn_str)
-        
-        target_table_schema = schema_dict.get("tables", {}).get(params.table_name)
-        if not target_table_schema:
-            raise HTTPException(status_code=404, detail=f"Table '{params.table_name}' not found in the database.")
-
-        system_prompt = f"""
+QUALITY_PLAN_SYSTEM_PROMPT = """
         You are a Senior Data Quality Analyst specializing in PostgreSQL. Your task is to analyze the schema of a single database table and generate a JSON list of proposed data quality checks.
 
         **Core Task:**
@@ -67,16 +49,44 @@ async def generate_quality_plan(
         - Your ONLY output must be a single, valid JSON object.
         - The root key must be `"proposed_checks"`, which is a list of the check objects you generated.
         """
-        user_prompt = f"Generate a data quality plan for the table `{params.table_name}` with the following schema:\n{json.dumps(target_table_schema, indent=2)}"
 
-        response_json_str = await llm_service_instance.call_llm(
-            system_prompt, user_prompt, response_format={"type": "json_object"}
-        )
-        logger.info(f"Raw quality plan from AI: {response_json_str}")
-        
+
+async def _quality_plan_prompts(params: models.GenerateQualityPlanRequest, settings: Settings) -> Tuple[str, str]:
+    conn_str = _get_conn_str(params.connection_string, settings)
+    schema_dict = await db_service.extract_db_schema(conn_str)
+
+    target_table_schema = schema_dict.get("tables", {}).get(params.table_name)
+    if not target_table_schema:
+        raise HTTPException(status_code=404, detail=f"Table '{params.table_name}' not found in the database.")
+
+    table_line = prompt_encoding.encode_table(params.table_name, models.ExtractedTable.model_validate(target_table_schema))
+    user_prompt = f"Generate a data quality plan for the table `{params.table_name}` with the following schema (table: column type, ...):\n{table_line}"
+    return QUALITY_PLAN_SYSTEM_PROMPT, user_prompt
+
+# ===================================================================
+# ENDPOINT 1: Generate a plan of proposed checks
+# ===================================================================
+@router.post("/generate-quality-plan", response_model=models.GenerateQualityPlanResponse)
+async def generate_quality_plan(
+    params: models.GenerateQualityPlanRequest, 
+    settings: Settings = Depends(get_settings),
+    llm_service_instance: llm_service.LLMService = Depends(llm_service.get_llm_service)
+):
+    """
+    Analyzes a table's schema and generates a list of recommended data quality checks.
+    """
+    try:
+        system_prompt, user_prompt = await _quality_plan_prompts(params, settings)
+
         # Use a temporary model to validate the LLM's direct output
         class LLMPlanResponse(BaseModel):
             proposed_checks: List[models.ProposedQualityCheck]
+
+        response_json_str = await llm_service_instance.call_llm(
+            system_prompt, user_prompt, response_format={"type": "json_object"}, endpoint="generate_quality_plan",
+            validate=LLMPlanResponse.model_validate_json,
+        )
+        logger.info(f"Raw quality plan from AI: {response_json_str}")
         
         validated_plan = LLMPlanResponse.model_validate_json(response_json_str)
         
@@ -91,12 +101,50 @@ async def generate_quality_plan(
         raise HTTPException(status_code=getattr(e, 'status_code', 500), detail=str(e))
 
 
+@router.post("/generate-quality-plan/stream")
+async def generate_quality_plan_stream(
+    params: models.GenerateQualityPlanRequest,
+    settings: Settings = Depends(get_settings),
+    llm_service_instance: llm_service.LLMService = Depends(llm_service.get_llm_service)
+):
+    """
+    Server-sent-events variant of `/generate-quality-plan`. Emits each
+    ProposedQualityCheck as a `check` event as soon as the model has written it,
+    `invalid` for checks that fail validation, and finally `done` with the
+    GenerateQualityPlanResponse, or `error`.
+    """
+    try:
+        system_prompt, user_prompt = await _quality_plan_prompts(params, settings)
+    except DatabaseServiceError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    async def events():
+        proposed_checks = []
+        async for _, _, item in json_stream.stream_array_items(
+            llm_service_instance, [(system_prompt, user_prompt)], ["proposed_checks"], "generate_quality_plan"
+        ):
+            try:
+                check = models.ProposedQualityCheck.model_validate(item)
+            except ValidationError as e:
+                yield sse.format_event("invalid", {"kind": "check", "error": str(e), "item": item})
+                continue
+            proposed_checks.append(check)
+            yield sse.format_event("check", check)
+        yield sse.format_event("done", models.GenerateQualityPlanResponse(
+            table_name=params.table_name,
+            proposed_checks=proposed_checks
+        ))
+
+    return sse.sse_response(events())
+
+
 # ===================================================================
 # ENDPOINT 2: Execute the selected checks
 # ===================================================================
 @router.post("/execute-quality-checks", response_model=models.ExecuteQualityChecksResponse)
 async def execute_quality_checks(
     params: models.ExecuteQualityChecksRequest, 
+    request: Request,
     settings: Settings = Depends(get_settings)
 ):
     """
@@ -105,32 +153,31 @@ async def execute_quality_checks(
     """
     try:
         conn_str = _get_conn_str(params.connection_string, settings)
-        final_results = []
 
         if not params.checks_to_run:
             raise HTTPException(status_code=400, detail="No checks were provided to execute.")
         
-        # Get total row count once for context
-        total_rows = await db_service.execute_scalar_query(conn_str, f'SELECT COUNT(*) FROM "{params.table_name}"')
-
-        for check in params.checks_to_run:
-            logger.info(f"Executing check: {check.rule_name}")
-            invalid_count = await db_service.execute_scalar_query(conn_str, check.check_sql)
-            
-            result = models.ValidationResult(
-                check_id=check.check_id,
-                rule_name=check.rule_name,
-                is_valid=(invalid_count == 0),
-                invalid_count=invalid_count,
-                total_rows=total_rows,
-                check_query=check.check_sql
-            )
-            final_results.append(result)
+        # Compatible COUNT(*) checks (and the total row count) are fused into a
+        # single scan; everything else runs on its own, concurrently. Work is
+        # cancelled if the client goes away.
+        final_results = await cancel_on_disconnect(
+            request,
+            quality_engine.run_quality_checks(
+                conn_str,
+                params.table_name,
+                params.checks_to_run,
+                concurrency=settings.QUALITY_CHECK_CONCURRENCY,
+                timeout_ms=settings.QUALITY_CHECK_TIMEOUT_MS,
+                use_result_cache=params.use_result_cache,
+            ),
+        )
         
         return models.ExecuteQualityChecksResponse(
             table_name=params.table_name,
             validation_results=final_results
         )
         
+    except ClientDisconnectedError:
+        raise HTTPException(status_code=499, detail="Client disconnected; quality checks were cancelled.")
     except DatabaseServiceError as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
\ No newline at end of file
@@ -0,0 +1,292 @@
+# In file: app/api/routers/jobs.py
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel
+
+from app.core.config import Settings, get_settings # type: ignore
+from app.api import models # type: ignore
+from app.api.routers import data_governance # type: ignore
+from app.services import db_service, llm_service, quality_engine # type: ignore
+from app.services.job_runner import JobContext, job_runner # type: ignore
+from app.services.job_store import FAILED, FINISHED_STATES, SUCCEEDED, job_store # type: ignore
+from app.logic import classification, masking_compiler # type: ignore
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["Background Jobs"]
+)
+
+
+def _status(job: Dict[str, Any]) -> models.JobStatusResponse:
+    def timestamp(value: Optional[float]) -> Optional[datetime]:
+        return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+
+    return models.JobStatusResponse(
+        job_id=job["job_id"],
+        kind=job["kind"],
+        status=job["status"],
+        progress_done=job["progress_done"],
+        progress_total=job["progress_total"],
+        attempts=job["attempts"],
+        cancel_requested=job["cancel_requested"],
+        error=job["error"],
+        error_status=job["error_status"],
+        created_at=timestamp(job["created_at"]),
+        started_at=timestamp(job["started_at"]),
+        finished_at=timestamp(job["finished_at"]),
+    )
+
+
+async def _submit(kind: str, params: BaseModel) -> models.JobStatusResponse:
+    try:
+        job = await job_runner.submit(kind, params.model_dump(mode="json"))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    logger.info(f"Queued {kind} job {job['job_id']}.")
+    return _status(job)
+
+
+async def _get_job(job_id: str) -> Dict[str, Any]:
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return job
+
+
+# ===================================================================
+# Submit
+# ===================================================================
+@router.post("/classify_data", response_model=models.JobStatusResponse, status_code=202)
+async def submit_classify_job(params: models.ClassificationRequest, settings: Settings = Depends(get_settings)):
+    """
+    Runs `/data-gov/classify_data` as a background job. Tables are classified in
+    token-budgeted batches and each classified table is checkpointed, so a
+    restart or a retry only classifies the tables still missing.
+    """
+    if not params.schema_data:
+        data_governance._get_conn_str(params.connection_string, settings)
+    return await _submit("classify_data", params)
+
+
+@router.post("/generate_masking_sql", response_model=models.JobStatusResponse, status_code=202)
+async def submit_masking_job(params: models.MaskingRequest, settings: Settings = Depends(get_settings)):
+    """Runs `/data-gov/generate_masking_sql` as a background job, one checkpoint per table."""
+    if params.mode == "compiler":
+        # Primary/foreign keys are read from this database when the job runs.
+        data_governance._get_conn_str(params.connection_string, settings)
+    return await _submit("generate_masking_sql", params)
+
+
+@router.post("/apply_masking_plan", response_model=models.JobStatusResponse, status_code=202)
+async def submit_apply_job(params: models.ApplyMaskingRequest, settings: Settings = Depends(get_settings)):
+    """
+    Runs `/data-gov/apply_masking_plan` as a background job. Statements are
+    applied and checkpointed one at a time (each is an idempotent
+    CREATE OR REPLACE VIEW), so a resumed job does not re-run applied ones.
+    """
+    if not params.sql_statements:
+        raise HTTPException(status_code=400, detail="No SQL statements provided to apply.")
+    data_governance._get_conn_str(params.connection_string, settings)
+    return await _submit("apply_masking_plan", params)
+
+
+@router.post("/run_quality_checks", response_model=models.JobStatusResponse, status_code=202)
+async def submit_quality_job(params: models.QualityRunRequest, settings: Settings = Depends(get_settings)):
+    """Executes data quality checks over several tables as a background job, one checkpoint per table."""
+    if not any(table.checks_to_run for table in params.tables):
+        raise HTTPException(status_code=400, detail="No checks were provided to execute.")
+    data_governance._get_conn_str(params.connection_string, settings)
+    return await _submit("run_quality_checks", params)
+
+
+# ===================================================================
+# Status, result, cancel
+# ===================================================================
+@router.get("", response_model=models.JobListResponse)
+async def list_jobs(
+    status: Optional[str] = Query(None, description="Only jobs in this state."),
+    limit: int = Query(50, ge=1, le=500),
+):
+    jobs = await asyncio.to_thread(job_store.list, status, limit)
+    return models.JobListResponse(jobs=[_status(job) for job in jobs])
+
+
+@router.get("/{job_id}", response_model=models.JobStatusResponse)
+async def get_job_status(job_id: str):
+    return _status(await _get_job(job_id))
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str) -> Dict[str, Any]:
+    """
+    The job's result, shaped like the response of the corresponding synchronous
+    endpoint. A failed job answers with the error and status code that endpoint
+    would have returned; an unfinished or cancelled one with 409.
+    """
+    job = await _get_job(job_id)
+    if job["status"] == SUCCEEDED:
+        return job["result"]
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=job["error_status"] or 500, detail=job["error"])
+    raise HTTPException(status_code=409, detail=f"Job '{job_id}' is {job['status']}; no result is available.")
+
+
+@router.post("/{job_id}/cancel", response_model=models.JobStatusResponse)
+async def cancel_job(job_id: str):
+    """Cancels a queued or running job. Checkpoints are kept, so it can be retried later."""
+    job = await _get_job(job_id)
+    if job["status"] in FINISHED_STATES:
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' has already finished ({job['status']}).")
+    return _status(await job_runner.cancel(job_id))
+
+
+@router.post("/{job_id}/retry", response_model=models.JobStatusResponse)
+async def retry_job(job_id: str, params: Optional[models.DBParams] = None):
+    """
+    Re-queues a failed or cancelled job. It resumes from its checkpoints.
+    Connection strings are not stored with jobs, so a job submitted with one
+    needs it again in the body.
+    """
+    await _get_job(job_id)
+    try:
+        retried = await job_runner.retry(job_id, params.connection_string if params else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not retried:
+        raise HTTPException(status_code=409, detail="Only failed or cancelled jobs can be retried.")
+    return _status(await _get_job(job_id))
+
+
+# ===================================================================
+# Job handlers
+# ===================================================================
+async def _run_classify_job(context: JobContext, settings: Settings) -> models.ClassificationResponse:
+    params = models.ClassificationRequest.model_validate(context.params)
+    conn_str = None
+    schema = params.schema_data
+    if not schema:
+        conn_str = data_governance._get_conn_str(params.connection_string, settings)
+        schema = models.ExtractedSchema.model_validate(await db_service.extract_db_schema(conn_str))
+    elif params.connection_string:
+        conn_str = params.connection_string
+
+    classified: Dict[str, models.ClassifiedTable] = {}
+    for table_name in schema.tables:
+        saved = context.checkpoint_for(f"table:{table_name}")
+        if saved is not None:
+            classified[table_name] = models.ClassifiedTable.model_validate(saved)
+    pending = models.ExtractedSchema(
+        tables={name: table for name, table in schema.tables.items() if name not in classified},
+        foreign_keys=[fk for fk in schema.foreign_keys if fk.referencing_table not in classified],
+    )
+    total = len(schema.tables)
+    processed = total - len(pending.tables)
+    await context.progress(processed, total)
+
+    if pending.tables:
+        llm_service_instance = llm_service.get_llm_service()
+        # Chunked mode fails the batch (502) instead of returning it with tables left out.
+        batch_params = params.model_copy(update={"schema_data": None, "chunked": True})
+        max_tokens = params.max_chunk_tokens or settings.CLASSIFY_CHUNK_MAX_TOKENS
+        for batch in classification.split_schema_into_chunks(pending, max_tokens):
+            result = await data_governance._classify_incrementally(
+                batch, conn_str, batch_params, settings, llm_service_instance, use_catalog=params.use_catalog,
+            )
+            for table in result.classification_results:
+                if table.table_name in batch.tables:
+                    classified[table.table_name] = table
+                    await context.checkpoint(f"table:{table.table_name}", table)
+            processed += len(batch.tables)
+            await context.progress(processed, total)
+
+    return models.ClassificationResponse(
+        classification_results=[classified[name] for name in schema.tables if name in classified]
+    )
+
+
+async def _run_masking_job(context: JobContext, settings: Settings) -> models.SQLGenerationResponse:
+    params = models.MaskingRequest.model_validate(context.params)
+    tables = params.classification_results
+    pending = [table.table_name for table in tables if context.checkpoint_for(f"table:{table.table_name}") is None]
+
+    key_columns = None
+    if pending:
+        key_columns = await data_governance._masking_key_columns(
+            params, settings, [table for table in tables if table.table_name in pending]
+        )
+    llm_service_instance = llm_service.get_llm_service() if params.mode == "llm" else None
+
+    statements = []
+    for done, table in enumerate(tables, start=1):
+        step = f"table:{table.table_name}"
+        table_statements = context.checkpoint_for(step)
+        if table_statements is None:
+            if params.mode == "compiler":
+                table_statements = masking_compiler.compile_masking_plan([table], key_columns)
+            else:
+                table_statements = await data_governance._generate_masking_statements_with_llm(
+                    [table], llm_service_instance, key_columns
+                )
+            await context.checkpoint(step, table_statements)
+        statements.extend(table_statements)
+        await context.progress(done, len(tables))
+
+    return models.SQLGenerationResponse(
+        sql_statements=statements,
+        message=f"Successfully generated {len(statements)} SQL statements."
+    )
+
+
+async def _run_apply_job(context: JobContext, settings: Settings) -> models.ApplyPlanResponse:
+    params = models.ApplyMaskingRequest.model_validate(context.params)
+    conn_str = data_governance._get_conn_str(params.connection_string, settings)
+    total = len(params.sql_statements)
+    for done, statement in enumerate(params.sql_statements, start=1):
+        step = f"statement:{done - 1}"
+        if context.checkpoint_for(step) is None:
+            await db_service.execute_statements(conn_str, [statement])
+            await context.checkpoint(step, True)
+        await context.progress(done, total)
+
+    return models.ApplyPlanResponse(
+        message=f"Successfully applied {total} SQL statement(s) to the database."
+    )
+
+
+async def _run_quality_job(context: JobContext, settings: Settings) -> models.QualityRunResponse:
+    params = models.QualityRunRequest.model_validate(context.params)
+    conn_str = data_governance._get_conn_str(params.connection_string, settings)
+    reports = []
+    for done, table in enumerate(params.tables, start=1):
+        step = f"table:{table.table_name}"
+        saved = context.checkpoint_for(step)
+        if saved is None:
+            results = await quality_engine.run_quality_checks(
+                conn_str,
+                table.table_name,
+                table.checks_to_run,
+                concurrency=settings.QUALITY_CHECK_CONCURRENCY,
+                timeout_ms=settings.QUALITY_CHECK_TIMEOUT_MS,
+                use_result_cache=params.use_result_cache,
+            )
+            report = models.ExecuteQualityChecksResponse(table_name=table.table_name, validation_results=results)
+            await context.checkpoint(step, report)
+        else:
+            report = models.ExecuteQualityChecksResponse.model_validate(saved)
+        reports.append(report)
+        await context.progress(done, len(params.tables))
+
+    return models.QualityRunResponse(results=reports)
+
+
+job_runner.register("classify_data", _run_classify_job)
+job_runner.register("generate_masking_sql", _run_masking_job)
+job_runner.register("apply_masking_plan", _run_apply_job)
+job_runner.register("run_quality_checks", _run_quality_job)
@@ -0,0 +1,38 @@
+# In file: app/api/routers/system.py
+
+import asyncio
+import logging
+from typing import Any, Dict
+from fastapi import APIRouter
+
+from app.services import engine_registry, llm_service, singleflight # type: ignore
+from app.services.schema_cache import schema_cache # type: ignore
+from app.services.translation_cache import translation_cache # type: ignore
+from app.services.result_cache import result_cache # type: ignore
+from app.services.rate_limiter import rate_limiter # type: ignore
+from app.services.classification_catalog import classification_catalog # type: ignore
+from app.services.job_runner import job_runner # type: ignore
+from app.services.job_store import job_store # type: ignore
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/system",
+    tags=["System"]
+)
+
+@router.get("/metrics")
+async def get_metrics() -> Dict[str, Any]:
+    """Returns in-process cache and connection-pool counters for monitoring."""
+    return {
+        "connection_pools": engine_registry.registry.stats(),
+        "schema_cache": schema_cache.stats(),
+        "translation_cache": translation_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "llm_response_cache": await asyncio.to_thread(llm_service.response_cache.stats),
+        "llm_prompt_tokens": llm_service.prompt_token_metrics.stats(),
+        "llm_rate_limiter": rate_limiter.stats(),
+        "single_flight": singleflight.stats(),
+        "classification_catalog": await asyncio.to_thread(classification_catalog.stats),
+        "jobs": {**job_runner.stats(), "by_status": await asyncio.to_thread(job_store.counts)},
+    }
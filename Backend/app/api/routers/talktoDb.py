@@ -1,12 +1,18 @@
 # In file: app/api/routers/talktoDb.py
 
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
 
 # Import the schemas (models) and services needed
 from app.api import models as schemas # type: ignore
-from app.services import db_service, llm_service,talktoDbservice # type: ignore
+from app.services import columnar, db_service, llm_service,talktoDbservice # type: ignore
 from app.services.errors import DatabaseServiceError, LLMServiceError # type: ignore
+from app.services.cancellation import cancel_on_disconnect, ClientDisconnectedError # type: ignore
+from app.core.config import Settings, get_settings # type: ignore
+from app.services.translation_cache import translation_cache # type: ignore
 
 # Get the same logger instance for consistent logging
 logger = logging.getLogger(__name__)
@@ -24,27 +30,52 @@ router = APIRouter(
 )
 async def generate_and_run_sql(
     request: schemas.NaturalLanguageQueryRequest,
+    http_request: Request,
+    format: Optional[str] = Query(None, description="Result format: json (default), arrow or parquet. Overrides the Accept header."),
     talktoDbservice: talktoDbservice.DatabaseService = Depends(talktoDbservice.get_db_service),
-    llm_service: llm_service.LLMService = Depends(llm_service.get_llm_service)
+    llm_service: llm_service.LLMService = Depends(llm_service.get_llm_service),
+    settings: Settings = Depends(get_settings)
 ):
     """
     This endpoint provides a complete, end-to-end flow for converting a natural
     language question into an executable SQL query.
 
-    - **Step 1:** Introspects the database to get an accurate schema.
+    - **Step 1:** Introspects the database and picks the tables relevant to the prompt.
     - **Step 2:** Constructs a detailed system prompt for the LLM.
     - **Step 3:** Calls the LLM to generate a precise PostgreSQL query.
-    - **Step 4:** Executes the query and returns the result.
+    - **Step 4:** Checks the SQL (single read-only statement, row limit, optional
+      planner-cost cap), executes it and returns the result.
+
+    Translations that executed successfully are cached per (normalized prompt,
+    schema fingerprint, model); `from_cache` reports whether the LLM was skipped.
+
+    Database work runs on a dedicated bounded executor with a per-request
+    statement_timeout, and is cancelled server-side if the client disconnects.
+
+    Read results can be requested as Arrow IPC or Parquet via the Accept header or
+    `?format=`; the generated SQL is then carried in the X-Generated-SQL header
+    (URL-encoded) and in the schema metadata.
     """
     try:
+        try:
+            output_format = columnar.negotiate_format(http_request.headers.get("accept"), format)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
         # Step 1: Get the database schema representation.
         # This mirrors the logic in your other endpoints that need schema context.
         db_name = request.connection_string.path.lstrip('/') if request.connection_string.path else "N/A"
         logger.info(f"Extracting schema for database: {db_name}")
 
         # Now, we use your talktoDb_service instance to call the method
-        schema_representation = talktoDbservice.get_schema_representation(
-            conn_str=str(request.connection_string)
+        # Only the tables relevant to this prompt (plus their join paths) go into the prompt.
+        schema_representation, schema_fingerprint = await cancel_on_disconnect(
+            http_request,
+            talktoDbservice.get_schema_context(
+                conn_str=str(request.connection_string),
+                prompt=request.prompt,
+                top_k=settings.TALKTODB_SCHEMA_TOP_K
+            )
         )
 
         # Step 2: Define the System and User Prompts, keeping the logic in the endpoint.
@@ -78,32 +109,87 @@ async def generate_and_run_sql(
 
         ---
         ### DATABASE SCHEMA
+        (One line per table: "schema"."table": column type, ...)
         {schema_representation}
         ---
         """
         user_prompt = request.prompt
         logger.info(f"Generating SQL for prompt: '{user_prompt}'")
 
-        # Step 3: Call the LLM service with the explicit prompts.
-        generated_sql = await llm_service.call_llm(
-            system_prompt=system_prompt,
-            user_prompt=user_prompt
-        )
-        logger.info(f"LLM generated SQL: {generated_sql[:200]}...") 
+        # Step 3: Reuse a known-good translation, or call the LLM service with the explicit prompts.
+        cache_key = translation_cache.make_key(user_prompt, schema_fingerprint, settings.MODEL)
+        generated_sql = translation_cache.get(cache_key)
+        from_cache = generated_sql is not None
+        if from_cache:
+            logger.info(f"Translation cache hit: {generated_sql[:200]}...")
+        else:
+            # The translation cache only keeps SQL that ran; don't let the raw response cache replay failures.
+            generated_sql = await cancel_on_disconnect(
+                http_request,
+                llm_service.call_llm(
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    endpoint="talk_to_db",
+                    use_cache=False
+                )
+            )
+            logger.info(f"LLM generated SQL: {generated_sql[:200]}...") 
 
         # Step 4: Execute the generated query against the database.
-        execution_result = talktoDbservice.execute_query(
-            conn_str=str(request.connection_string),
-            sql_query=generated_sql
-        )
+        execute = talktoDbservice.execute_query if output_format == "json" else talktoDbservice.execute_query_rows
+        try:
+            execution_result = await cancel_on_disconnect(
+                http_request,
+                execute(
+                    conn_str=str(request.connection_string),
+                    sql_query=generated_sql,
+                    timeout_ms=settings.TALKTODB_STATEMENT_TIMEOUT_MS,
+                    use_result_cache=request.use_result_cache
+                )
+            )
+        except DatabaseServiceError:
+            if from_cache:
+                translation_cache.discard(cache_key)
+            raise
+        if not from_cache:
+            translation_cache.put(cache_key, generated_sql)
+
+        if output_format != "json":
+            if "rows" in execution_result:
+                try:
+                    body = columnar.encode(
+                        execution_result["columns"], execution_result["rows"], output_format,
+                        {"generated_sql": generated_sql},
+                    )
+                except columnar.ColumnarUnavailableError as e:
+                    raise HTTPException(status_code=406, detail=str(e))
+                return Response(
+                    content=body,
+                    media_type=columnar.media_type_for(output_format),
+                    headers={
+                        "X-Generated-SQL": quote(generated_sql, safe=""),
+                        "X-Row-Count": str(len(execution_result["rows"])),
+                        "X-SQL-From-Cache": str(from_cache).lower(),
+                        "X-Truncated": str(execution_result["truncated"]).lower(),
+                    },
+                )
+            # Writes have no result set; fall through to the usual JSON message.
+            return schemas.NaturalLanguageQueryResponse(
+                generated_sql=generated_sql, message=execution_result["message"], from_cache=from_cache
+            )
 
         # Step 5: Combine the results into a validated response model.
         return schemas.NaturalLanguageQueryResponse(
             generated_sql=generated_sql,
+            from_cache=from_cache,
             **execution_result
         )
 
     # Replicate the exact error handling pattern from your reference code.
+    except HTTPException:
+        raise
+    except ClientDisconnectedError:
+        raise HTTPException(status_code=499, detail="Client disconnected; the query was cancelled.")
     except (DatabaseServiceError, LLMServiceError) as e:
         logger.error(f"A service error occurred: {e}")
         raise HTTPException(status_code=e.status_code, detail=e.message)
@@ -1,23 +1,101 @@
-# In file: app/core/config.py
-from pydantic_settings import BaseSettings, SettingsConfigDict
-from functools import lru_cache
-
-class Settings(BaseSettings):
-    DATABASE_URL: str
-    GROQ_API_KEY: str
-    MODEL: str = "gemma2-9b-it"
-
-    # Configure Pydantic to read from .env
-    model_config = SettingsConfigDict(
-        env_file=".env",
-        env_file_encoding='utf-8',
-        extra='ignore'  # <-- THIS IS THE FIX. Add this line.
-    )
-
-@lru_cache()
-def get_settings() -> Settings:
-    """
-    Returns a cached instance of the Settings object.
-    Using lru_cache ensures the .env file is read only once.
-    """
+# In file: app/core/config.py
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import lru_cache
+from typing import List
+
+class Settings(BaseSettings):
+    DATABASE_URL: str
+    GROQ_API_KEY: str
+    MODEL: str = "gemma2-9b-it"
+
+    # --- LLM transport ---
+    LLM_MAX_CONCURRENCY: int = 8            # Per-process cap on in-flight Groq calls.
+    LLM_REQUEST_TIMEOUT_SECONDS: float = 60.0
+    LLM_MAX_CONNECTIONS: int = 20           # Shared HTTP connection pool size.
+
+    # --- LLM rate limiting and retries (process-wide; refined from x-ratelimit-* headers) ---
+    LLM_RATE_LIMIT_ENABLED: bool = True
+    LLM_RATE_LIMIT_RPM: int = 30            # Requests per minute; 0 disables the request bucket.
+    LLM_RATE_LIMIT_TPM: int = 15000         # Tokens per minute; 0 disables the token bucket.
+    LLM_RATE_LIMIT_COMPLETION_RESERVE_TOKENS: int = 512  # Reserved per call for the completion until usage is known.
+    LLM_MAX_RETRIES: int = 4
+    LLM_RETRY_BASE_SECONDS: float = 1.0
+    LLM_RETRY_MAX_SECONDS: float = 30.0
+
+    # --- Persistent LLM response cache (SQLite, shared across workers) ---
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = "llm_cache.sqlite3"
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 5000
+    LLM_CACHE_BYPASS_ENDPOINTS: List[str] = []  # e.g. ["talk_to_db"]
+
+    # --- Chunked classification ---
+    CLASSIFY_CHUNK_MAX_TOKENS: int = 3000
+    CLASSIFY_CHUNK_CONCURRENCY: int = 4
+    CLASSIFY_CHUNK_MAX_RETRIES: int = 2
+    CLASSIFY_PRESIDIO_ENABLED: bool = False     # Scan sampled values with presidio-analyzer (needs a spaCy model).
+    CLASSIFY_PRESIDIO_SAMPLE_ROWS: int = 100
+
+    # --- Referential-integrity explanations (one LLM call per group of related tables) ---
+    RI_EXPLAIN_CONCURRENCY: int = 4
+    RI_EXPLAIN_MAX_FKS_PER_BATCH: int = 40
+
+    # --- Persistent column classification catalog (SQLite, incremental re-runs) ---
+    CLASSIFICATION_CATALOG_ENABLED: bool = True
+    CLASSIFICATION_CATALOG_PATH: str = "classification_catalog.sqlite3"
+
+    # --- Background jobs (SQLite-backed queue, resumable per table) ---
+    JOBS_MAX_WORKERS: int = 2
+    JOBS_STORE_PATH: str = "jobs.sqlite3"
+    JOBS_RETENTION_SECONDS: int = 7 * 24 * 3600   # Finished jobs older than this are pruned at startup; 0 keeps them.
+    JOBS_LEASE_SECONDS: int = 60                  # A process's jobs are adopted by others once its heartbeat is this old.
+
+    # --- Data-quality check execution ---
+    QUALITY_CHECK_CONCURRENCY: int = 4
+    QUALITY_CHECK_TIMEOUT_MS: int = 30000   # Per-query statement_timeout.
+
+    # --- Talk-to-DB execution ---
+    TALKTODB_MAX_WORKERS: int = 8                # Dedicated threads for schema reads and NL queries.
+    TALKTODB_STATEMENT_TIMEOUT_MS: int = 30000   # Per-request statement_timeout for generated SQL.
+    TALKTODB_SCHEMA_TOP_K: int = 8               # Most relevant tables put in the prompt; 0 sends the whole schema.
+    TALKTODB_READ_ONLY: bool = True              # Refuse generated DML/DDL.
+    TALKTODB_MAX_ROWS: int = 1000                # LIMIT injected/clamped on generated reads.
+    TALKTODB_FETCH_BATCH_SIZE: int = 500
+    TALKTODB_MAX_PLAN_COST: float = 0            # Refuse reads whose EXPLAIN cost is higher; 0 disables the check.
+    TALKTODB_TRANSLATION_CACHE_MAX_ENTRIES: int = 1000   # 0 disables the NL-to-SQL cache.
+    TALKTODB_TRANSLATION_CACHE_TTL_SECONDS: int = 24 * 3600
+
+    # --- Read-only query result cache (talk-to-db, quality checks) ---
+    # Opt-in: writes made outside this app are only seen once an entry's TTL expires.
+    RESULT_CACHE_ENABLED: bool = False
+    RESULT_CACHE_TTL_SECONDS: int = 300
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # --- Connection pooling (shared engine/pool registry) ---
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_ASYNC_POOL_MIN_SIZE: int = 1
+    DB_ASYNC_POOL_MAX_SIZE: int = 10
+    DB_ENGINE_IDLE_TTL_SECONDS: int = 900   # Dispose pools unused for this long.
+    DB_ENGINE_MAX_DSNS: int = 16            # LRU cap on distinct connection strings.
+
+    # --- Fingerprinted schema cache ---
+    SCHEMA_CACHE_TTL_SECONDS: int = 600
+    SCHEMA_CACHE_MAX_ENTRIES: int = 32
+
+    # Configure Pydantic to read from .env
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding='utf-8',
+        extra='ignore'  # <-- THIS IS THE FIX. Add this line.
+    )
+
+@lru_cache()
+def get_settings() -> Settings:
+    """
+    Returns a cached instance of the Settings object.
+    Using lru_cache ensures the .env file is read only once.
+    """
     return Settings()
\ No newline at end of file
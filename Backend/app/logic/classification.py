@@ -0,0 +1,203 @@
+# In file: app/logic/classification.py
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.api import models # type: ignore
+from app.logic import json_stream, prompt_encoding # type: ignore
+from app.logic.data_gov_logic import clean_classification_data # type: ignore
+from app.services.errors import LLMServiceError # type: ignore
+
+logger = logging.getLogger(__name__)
+
+CLASSIFICATION_SYSTEM_PROMPT = """
+        You are an expert data privacy and governance analyst. Your task is to classify each column in the provided database schema.
+        RULES:
+        1. You MUST return ONLY a single, valid JSON object.
+        2. The root key of the JSON object must be "classification_results".
+        3. The value of "classification_results" MUST be a JSON array (a list of objects `[]`).
+        4. Each object in the array represents a table and must have a "table_name" and a "columns" key.
+        5. For each column, provide a `classification` from this exact list: ["Public/Non-Sensitive", "Internal/Confidential", "PII", "Sensitive"].
+        6. Also provide a brief `reasoning` string for your classification choice.
+        ### EXAMPLE OF DESIRED JSON OUTPUT ###
+        {
+        "classification_results": [
+            {
+            "table_name": "users",
+            "columns": [
+                {
+                "column_name": "id",
+                "data_type": "INTEGER",
+                "classification": "Internal/Confidential",
+                "reasoning": "Internal identifier, not sensitive."
+                },
+                {
+                "column_name": "email",
+                "data_type": "VARCHAR",
+                "classification": "PII",
+                "reasoning": "Email is Personally Identifiable Information."
+                }
+            ]
+            }
+        ]
+        }
+        """
+
+
+def build_classification_user_prompt(schema: models.ExtractedSchema) -> str:
+    return f"Classify the columns in this schema:\n{prompt_encoding.encode_schema(schema)}"
+
+
+def split_schema_into_chunks(schema: models.ExtractedSchema, max_tokens: int) -> List[models.ExtractedSchema]:
+    """
+    Greedily packs tables into sub-schemas whose serialized size stays under
+    `max_tokens`. A table that is larger than the budget on its own gets a chunk
+    to itself. Foreign keys travel with the chunk of their referencing table.
+    """
+    chunks: List[Dict[str, models.ExtractedTable]] = []
+    current: Dict[str, models.ExtractedTable] = {}
+    current_tokens = 0
+    for table_name, table in schema.tables.items():
+        table_tokens = prompt_encoding.estimate_tokens(prompt_encoding.encode_table(table_name, table))
+        if current and current_tokens + table_tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = {}, 0
+        current[table_name] = table
+        current_tokens += table_tokens
+    if current:
+        chunks.append(current)
+
+    return [
+        models.ExtractedSchema(
+            tables=tables,
+            foreign_keys=[fk for fk in schema.foreign_keys if fk.referencing_table in tables],
+        )
+        for tables in chunks
+    ]
+
+
+async def _classify_chunk(chunk: models.ExtractedSchema, llm_service_instance, use_cache: bool) -> Tuple[models.ClassificationResponse, List[str]]:
+    """Classifies one chunk; returns the repaired result and any tables the model left out."""
+    def parse(response_json_str: str) -> models.ClassificationResponse:
+        return models.ClassificationResponse.model_validate(clean_classification_data(json.loads(response_json_str), chunk))
+
+    response_json_str = await llm_service_instance.call_llm(
+        CLASSIFICATION_SYSTEM_PROMPT,
+        build_classification_user_prompt(chunk),
+        response_format={"type": "json_object"},
+        endpoint="classify_data",
+        use_cache=use_cache,
+        validate=parse,
+    )
+    result = parse(response_json_str)
+    returned = {table.table_name for table in result.classification_results}
+    missing = [name for name in chunk.tables if name not in returned]
+    return result, missing
+
+
+async def classify_schema_chunked(
+    schema: models.ExtractedSchema,
+    llm_service_instance,
+    max_chunk_tokens: int,
+    concurrency: int,
+    max_retries: int,
+) -> models.ClassificationResponse:
+    """
+    Classifies a large schema as token-budgeted chunks run concurrently under a
+    semaphore, retrying only chunks that failed or came back incomplete, and
+    merges everything into a single ClassificationResponse in schema order.
+    """
+    chunks = split_schema_into_chunks(schema, max_chunk_tokens)
+    logger.info(f"Classifying {len(schema.tables)} tables in {len(chunks)} chunk(s) (concurrency={concurrency}).")
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(chunk: models.ExtractedSchema, use_cache: bool):
+        async with semaphore:
+            return await _classify_chunk(chunk, llm_service_instance, use_cache)
+
+    results: Dict[int, Dict[str, models.ClassifiedTable]] = {i: {} for i in range(len(chunks))}
+    errors: Dict[int, Exception] = {}
+    pending = list(range(len(chunks)))
+    for attempt in range(max_retries + 1):
+        # Retries must reach the model: a cached answer would just repeat the failure.
+        outcomes = await asyncio.gather(*(run(chunks[i], attempt == 0) for i in pending), return_exceptions=True)
+        retry: List[int] = []
+        for index, outcome in zip(pending, outcomes):
+            if isinstance(outcome, (ValidationError, json.JSONDecodeError, LLMServiceError)):
+                errors[index] = outcome
+                retry.append(index)
+                continue
+            if isinstance(outcome, BaseException):
+                raise outcome
+            result, missing = outcome
+            errors.pop(index, None)
+            for table in result.classification_results:
+                results[index][table.table_name] = table
+            if missing:
+                logger.warning(f"Chunk {index} came back without tables {missing} (attempt {attempt + 1}).")
+                # Only the tables the model dropped are sent again.
+                chunks[index] = _sub_schema(chunks[index], missing)
+                retry.append(index)
+        pending = retry
+        if not pending:
+            break
+        logger.info(f"Retrying {len(pending)} chunk(s).")
+
+    failed = [i for i in pending if i in errors]
+    if failed:
+        last_error = errors[failed[0]]
+        if isinstance(last_error, LLMServiceError):
+            raise last_error
+        raise LLMServiceError(
+            f"{len(failed)} of {len(chunks)} classification chunk(s) failed after {max_retries + 1} attempt(s): {last_error}", 502
+        )
+    if pending:
+        missing = [name for i in pending for name in chunks[i].tables]
+        raise LLMServiceError(
+            f"The AI agent did not classify {len(missing)} table(s) after {max_retries + 1} attempt(s): {', '.join(missing)}", 502
+        )
+
+    by_table = {name: table for tables in results.values() for name, table in tables.items()}
+    return models.ClassificationResponse(
+        classification_results=[by_table[name] for name in schema.tables if name in by_table]
+    )
+
+
+async def stream_classified_tables(
+    schema: models.ExtractedSchema,
+    llm_service_instance,
+    max_chunk_tokens: Optional[int],
+    concurrency: int,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streams the classification of `schema` (split into token-budgeted chunks when
+    `max_chunk_tokens` is given) and yields ("table", ClassifiedTable) as each
+    table is completed by the model, or ("invalid", details) when one fails
+    validation. Tables the model leaves out are simply never yielded.
+    """
+    chunks = split_schema_into_chunks(schema, max_chunk_tokens) if max_chunk_tokens else [schema]
+    prompts = [(CLASSIFICATION_SYSTEM_PROMPT, build_classification_user_prompt(chunk)) for chunk in chunks]
+    async for index, _, item in json_stream.stream_array_items(
+        llm_service_instance, prompts, ["classification_results"], "classify_data", concurrency
+    ):
+        if not isinstance(item, dict):
+            continue
+        cleaned = clean_classification_data({"classification_results": [item]}, chunks[index])["classification_results"]
+        if not cleaned:
+            yield "invalid", {"kind": "table", "error": "Unknown table or missing columns.", "item": item}
+            continue
+        try:
+            yield "table", models.ClassifiedTable.model_validate(cleaned[0])
+        except ValidationError as e:
+            yield "invalid", {"kind": "table", "error": str(e), "item": item}
+
+
+def _sub_schema(schema: models.ExtractedSchema, table_names: List[str]) -> models.ExtractedSchema:
+    wanted = set(table_names)
+    return models.ExtractedSchema(
+        tables={name: table for name, table in schema.tables.items() if name in wanted},
+        foreign_keys=[fk for fk in schema.foreign_keys if fk.referencing_table in wanted],
+    )
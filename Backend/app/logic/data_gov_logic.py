@@ -1,56 +1,119 @@
-import logging
-from typing import Optional, List
-from fastapi import HTTPException
-
-from app.core.config import Settings
-from app.api import models
-
-logger = logging.getLogger(__name__)
-
-def get_conn_str(provided_str: Optional[str], settings: Settings) -> str:
-    # ... (this function is correct) ...
-    conn_str = provided_str or settings.DATABASE_URL
-    if not conn_str:
-        raise HTTPException(status_code=400, detail="DB connection string not provided and not configured on server.")
-    return conn_str
-
-def clean_classification_data(llm_data: dict, original_schema: models.ExtractedSchema) -> dict:
-    # ... (this function is correct) ...
-    if "classification_results" not in llm_data or not isinstance(llm_data["classification_results"], list):
-        return llm_data
-    cleaned_results = []
-    for table_data in llm_data["classification_results"]:
-        if "table" in table_data and "table_name" not in table_data:
-            table_data["table_name"] = table_data.pop("table")
-        table_name = table_data.get("table_name")
-        if not table_name or "columns" not in table_data: continue
-        original_table = original_schema.tables.get(table_name)
-        if not original_table: continue
-        dtype_lookup = {col.column_name: col.data_type for col in original_table.columns}
-        cleaned_columns = []
-        for column_data in table_data["columns"]:
-            col_name = column_data.get("column_name")
-            if not col_name: continue
-            if "data_type" not in column_data:
-                column_data["data_type"] = dtype_lookup.get(col_name, "UNKNOWN")
-            cleaned_columns.append(column_data)
-        table_data["columns"] = cleaned_columns
-        cleaned_results.append(table_data)
-    llm_data["classification_results"] = cleaned_results
-    return llm_data
-
-def clean_masking_plan(llm_data: dict, original_classification: List[models.ClassifiedTable]) -> dict:
-    # ... (this function is correct) ...
-    if "tables" not in llm_data or not isinstance(llm_data["tables"], list):
-        return llm_data
-    new_tables_list = []
-    for classified_table, llm_table_output in zip(original_classification, llm_data["tables"]):
-        if not isinstance(llm_table_output, dict) or "select" not in llm_table_output:
-            continue
-        select_expressions = llm_table_output["select"]
-        new_columns_list = []
-        for original_column, select_expr in zip(classified_table.columns, select_expressions):
-            new_columns_list.append({"column_name": original_column.column_name, "select_expression": select_expr})
-        new_tables_list.append({"table_name": classified_table.table_name, "columns": new_columns_list})
-    llm_data["tables"] = new_tables_list
-    return llm_data
\ No newline at end of file
+import logging
+from typing import Dict, Iterable, Optional, List
+from fastapi import HTTPException
+
+import sqlglot
+from sqlglot import exp
+
+from app.core.config import Settings
+from app.api import models
+from app.logic import masking_compiler
+
+logger = logging.getLogger(__name__)
+
+def get_conn_str(provided_str: Optional[str], settings: Settings) -> str:
+    # ... (this function is correct) ...
+    conn_str = provided_str or settings.DATABASE_URL
+    if not conn_str:
+        raise HTTPException(status_code=400, detail="DB connection string not provided and not configured on server.")
+    return conn_str
+
+def clean_classification_data(llm_data: dict, original_schema: models.ExtractedSchema) -> dict:
+    # Anything that is not the expected shape is left for model validation to reject.
+    if not isinstance(llm_data, dict) or not isinstance(llm_data.get("classification_results"), list):
+        return llm_data
+    cleaned_results = []
+    for table_data in llm_data["classification_results"]:
+        if not isinstance(table_data, dict): continue
+        if "table" in table_data and "table_name" not in table_data:
+            table_data["table_name"] = table_data.pop("table")
+        table_name = table_data.get("table_name")
+        if not table_name or "columns" not in table_data: continue
+        original_table = original_schema.tables.get(table_name)
+        if not original_table: continue
+        dtype_lookup = {col.column_name: col.data_type for col in original_table.columns}
+        cleaned_columns = []
+        if not isinstance(table_data["columns"], list): continue
+        for column_data in table_data["columns"]:
+            if not isinstance(column_data, dict): continue
+            col_name = column_data.get("column_name")
+            if not col_name: continue
+            if "data_type" not in column_data:
+                column_data["data_type"] = dtype_lookup.get(col_name, "UNKNOWN")
+            cleaned_columns.append(column_data)
+        table_data["columns"] = cleaned_columns
+        cleaned_results.append(table_data)
+    llm_data["classification_results"] = cleaned_results
+    return llm_data
+
+def clean_masking_plan(
+    llm_data: dict,
+    original_classification: List[models.ClassifiedTable],
+    key_columns_by_table: Optional[Dict[str, Iterable[str]]] = None,
+) -> dict:
+    """
+    Normalizes an LLM masking plan to {"tables": [{"table_name", "columns": [{"column_name", "select_expression"}]}]}.
+
+    Expressions are matched to columns by their output name (the `AS "alias"`, or the
+    bare column reference), never by position, so a dropped or reordered column can
+    no longer shift every following expression onto the wrong column. Columns the
+    model left out are filled in by the deterministic masking compiler, using the
+    table's primary/foreign-key columns from `key_columns_by_table`. Without them a
+    left-out column could be a key, so it is passed through unmasked rather than
+    risk breaking the view's joins.
+    """
+    if "tables" not in llm_data or not isinstance(llm_data["tables"], list):
+        return llm_data
+    llm_tables = {}
+    for llm_table_output in llm_data["tables"]:
+        if isinstance(llm_table_output, dict):
+            name = llm_table_output.get("table_name") or llm_table_output.get("table")
+            if name:
+                llm_tables[name] = llm_table_output
+
+    new_tables_list = []
+    for classified_table in original_classification:
+        llm_table_output = llm_tables.get(classified_table.table_name)
+        if llm_table_output is None:
+            continue
+        raw_expressions = llm_table_output.get("columns", llm_table_output.get("select", []))
+        by_output_name = {}
+        for item in raw_expressions:
+            select_expr = item.get("select_expression") if isinstance(item, dict) else item
+            if not isinstance(select_expr, str):
+                continue
+            output_name = _select_output_name(select_expr)
+            if output_name is not None:
+                by_output_name.setdefault(output_name, select_expr)
+
+        new_columns_list = []
+        for original_column in classified_table.columns:
+            select_expr = by_output_name.get(original_column.column_name)
+            if select_expr is None:
+                if key_columns_by_table is None:
+                    logger.warning(
+                        f"Masking plan for '{classified_table.table_name}' has no expression for "
+                        f"'{original_column.column_name}' and its keys are unknown; leaving it unmasked."
+                    )
+                    select_expr = masking_compiler.quote_ident(original_column.column_name)
+                else:
+                    logger.warning(
+                        f"Masking plan for '{classified_table.table_name}' has no expression for "
+                        f"'{original_column.column_name}'; compiling it locally."
+                    )
+                    keys = set(key_columns_by_table.get(classified_table.table_name, ()))
+                    select_expr = masking_compiler.compile_column(original_column, keys)
+            new_columns_list.append({"column_name": original_column.column_name, "select_expression": select_expr})
+        new_tables_list.append({"table_name": classified_table.table_name, "columns": new_columns_list})
+    llm_data["tables"] = new_tables_list
+    return llm_data
+
+def _select_output_name(select_expr: str) -> Optional[str]:
+    """The column name a select-list expression produces, or None if it cannot be parsed."""
+    try:
+        parsed = sqlglot.parse_one(f"SELECT {select_expr}", read="postgres")
+    except sqlglot.errors.ParseError:
+        return None
+    if not isinstance(parsed, exp.Select) or len(parsed.expressions) != 1:
+        return None
+    return parsed.expressions[0].alias_or_name or None
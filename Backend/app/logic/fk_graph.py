@@ -0,0 +1,209 @@
+# In file: app/logic/fk_graph.py
+"""
+Foreign-key dependency graph of an extracted schema.
+
+An edge A -> B means "A references B" (A has a foreign key into B). From that
+the structural facts of a referential-integrity report are computed locally:
+
+- foundational (root) tables reference no other table;
+- depth is the length of the longest chain of references down to a root
+  (cycles are collapsed first, so every table in a cycle shares one depth);
+- cycles are the strongly connected components with more than one table, or a
+  table referencing itself;
+- the impact set of a table is every table that references it directly or
+  transitively, i.e. what breaks if it changes (BFS over referencing tables);
+- components are the weakly connected groups of tables, the unit the LLM
+  explains in one call.
+
+Graphs are cached per schema fingerprint, so repeated reports on an unchanged
+schema skip the computation.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Set
+
+from app.api import models # type: ignore
+
+_GRAPH_CACHE_MAX_ENTRIES = 16
+_graph_cache: "OrderedDict[str, FKGraph]" = OrderedDict()
+_graph_cache_lock = threading.Lock()
+
+
+def schema_fingerprint(schema: models.ExtractedSchema) -> str:
+    """Stable hash of the table names and foreign keys, the only inputs the graph depends on."""
+    payload = json.dumps(
+        [sorted(schema.tables), sorted(fk.model_dump_json() for fk in schema.foreign_keys)],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FKGraph:
+    """Directed referencing -> referenced graph with the derived integrity facts precomputed."""
+
+    def __init__(self, schema: models.ExtractedSchema):
+        # FKs can name tables the extraction did not return (other schemas); keep them as nodes.
+        names = list(schema.tables)
+        for fk in schema.foreign_keys:
+            for name in (fk.referencing_table, fk.referenced_table):
+                if name not in schema.tables and name not in names:
+                    names.append(name)
+        self.tables: List[str] = names
+        self.external_tables: Set[str] = {name for name in names if name not in schema.tables}
+        self.foreign_keys = list(schema.foreign_keys)
+        self.depends_on: Dict[str, Set[str]] = {name: set() for name in names}
+        self.referenced_by: Dict[str, Set[str]] = {name: set() for name in names}
+        self.self_referencing: Set[str] = set()
+        for fk in self.foreign_keys:
+            if fk.referencing_table == fk.referenced_table:
+                self.self_referencing.add(fk.referencing_table)
+                continue
+            self.depends_on[fk.referencing_table].add(fk.referenced_table)
+            self.referenced_by[fk.referenced_table].add(fk.referencing_table)
+
+        self.roots: List[str] = [name for name in names if not self.depends_on[name]]
+        self._scc_of: Dict[str, int] = {}
+        self.sccs: List[List[str]] = self._strongly_connected_components()
+        self.cycles: List[List[str]] = [
+            scc for scc in self.sccs if len(scc) > 1 or scc[0] in self.self_referencing
+        ]
+        self.depth: Dict[str, int] = self._depths()
+        self.components: List[List[str]] = self._weak_components()
+        self.component_of: Dict[str, int] = {
+            name: index for index, members in enumerate(self.components) for name in members
+        }
+        self._impact_cache: Dict[str, List[str]] = {}
+
+    def _strongly_connected_components(self) -> List[List[str]]:
+        """Tarjan's algorithm, iterative so deep reference chains cannot hit the recursion limit."""
+        index_of: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: List[str] = []
+        sccs: List[List[str]] = []
+        counter = 0
+        for start in self.tables:
+            if start in index_of:
+                continue
+            work = [(start, iter(sorted(self.depends_on[start])))]
+            index_of[start] = lowlink[start] = counter
+            counter += 1
+            stack.append(start)
+            on_stack.add(start)
+            while work:
+                node, children = work[-1]
+                advanced = False
+                for child in children:
+                    if child not in index_of:
+                        index_of[child] = lowlink[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(sorted(self.depends_on[child]))))
+                        advanced = True
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index_of[child])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index_of[node]:
+                    scc = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        scc.append(member)
+                        if member == node:
+                            break
+                    for member in scc:
+                        self._scc_of[member] = len(sccs)
+                    sccs.append(sorted(scc))
+        return sccs
+
+    def _depths(self) -> Dict[str, int]:
+        # Tarjan emits SCCs in reverse topological order of the condensation: every
+        # component a table depends on is finished before the table's own component.
+        scc_depth: Dict[int, int] = {}
+        for scc_index, members in enumerate(self.sccs):
+            targets = {
+                self._scc_of[dep] for member in members for dep in self.depends_on[member]
+            } - {scc_index}
+            scc_depth[scc_index] = 1 + max((scc_depth[t] for t in targets), default=-1)
+        return {name: scc_depth[self._scc_of[name]] for name in self.tables}
+
+    def _weak_components(self) -> List[List[str]]:
+        seen: Set[str] = set()
+        components = []
+        for start in self.tables:
+            if start in seen:
+                continue
+            seen.add(start)
+            queue = deque([start])
+            members = []
+            while queue:
+                node = queue.popleft()
+                members.append(node)
+                for neighbour in sorted(self.depends_on[node] | self.referenced_by[node]):
+                    if neighbour not in seen:
+                        seen.add(neighbour)
+                        queue.append(neighbour)
+            components.append(members)
+        return components
+
+    def impact_set(self, table: str) -> List[str]:
+        """Every table that references `table` directly or transitively, nearest first."""
+        cached = self._impact_cache.get(table)
+        if cached is not None:
+            return cached
+        seen = {table}
+        order = []
+        queue = deque(sorted(self.referenced_by.get(table, ())))
+        seen.update(queue)
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for referencing in sorted(self.referenced_by[node]):
+                if referencing not in seen:
+                    seen.add(referencing)
+                    queue.append(referencing)
+        self._impact_cache[table] = order
+        return order
+
+    def in_cycle(self, table: str) -> bool:
+        return len(self.sccs[self._scc_of[table]]) > 1 or table in self.self_referencing
+
+    def table_dependencies(self) -> List[models.TableDependency]:
+        return [
+            models.TableDependency(
+                table_name=name,
+                is_foundational=not self.depends_on[name],
+                depth=self.depth[name],
+                depends_on=sorted(self.depends_on[name]),
+                referenced_by=sorted(self.referenced_by[name]),
+                impact_set=self.impact_set(name),
+                in_cycle=self.in_cycle(name),
+                component=self.component_of[name],
+            )
+            for name in self.tables
+        ]
+
+
+def get_fk_graph(schema: models.ExtractedSchema) -> FKGraph:
+    """The graph for `schema`, built once per schema fingerprint and shared by every request."""
+    fingerprint = schema_fingerprint(schema)
+    with _graph_cache_lock:
+        graph = _graph_cache.get(fingerprint)
+        if graph is not None:
+            _graph_cache.move_to_end(fingerprint)
+            return graph
+    graph = FKGraph(schema)
+    with _graph_cache_lock:
+        _graph_cache[fingerprint] = graph
+        while len(_graph_cache) > _GRAPH_CACHE_MAX_ENTRIES:
+            _graph_cache.popitem(last=False)
+    return graph
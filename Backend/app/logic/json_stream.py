@@ -0,0 +1,139 @@
+# In file: app/logic/json_stream.py
+"""
+Incremental extraction of array items from a streamed JSON object.
+
+The LLM answers with one JSON object whose interesting parts are arrays of
+objects (`classification_results`, `proposed_checks`, ...). Fed the response
+text chunk by chunk, ArrayItemStream yields each element of the wanted
+top-level arrays as soon as its closing brace arrives, so a caller can
+validate and forward it long before the whole object is complete. Text
+before the opening brace (a stray code fence, a preamble) is skipped.
+
+stream_array_items runs several such streamed LLM calls concurrently and
+interleaves their items as they complete.
+"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Iterable, List, Optional, Sequence, Tuple
+
+_END = object()
+
+
+class ArrayItemStream:
+    """Yields (key, item) for every object element of the root object's arrays named in `keys`."""
+
+    def __init__(self, keys: Iterable[str]):
+        self.keys = set(keys)
+        self.text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._pending_key: Optional[str] = None
+        self._array_key: Optional[str] = None
+        self._item_start: Optional[int] = None
+        self._done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consumes more response text; returns the items completed by it."""
+        self.text += chunk
+        items: List[Tuple[str, Any]] = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            if self._done:
+                break
+            char = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        try:
+                            self._last_string = json.loads(text[self._string_start:i + 1])
+                        except json.JSONDecodeError:
+                            self._last_string = None
+                continue
+            if not self._stack and char != "{":
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char == ":" and len(self._stack) == 1:
+                self._pending_key = self._last_string
+            elif char == "," and len(self._stack) == 1:
+                self._pending_key = None
+            elif char in "{[":
+                self._stack.append(char)
+                depth = len(self._stack)
+                if depth == 2 and char == "[" and self._pending_key in self.keys:
+                    self._array_key = self._pending_key
+                elif depth == 3 and char == "{" and self._array_key is not None:
+                    self._item_start = i
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                depth = len(self._stack)
+                if depth == 2 and char == "}" and self._item_start is not None:
+                    try:
+                        items.append((self._array_key, json.loads(text[self._item_start:i + 1])))
+                    except json.JSONDecodeError:
+                        pass
+                    self._item_start = None
+                elif depth == 1 and char == "]":
+                    self._array_key = None
+                elif depth == 0:
+                    self._done = True
+        self._pos = len(text)
+        return items
+
+
+async def stream_array_items(
+    llm_service_instance,
+    prompts: Sequence[Tuple[str, str]],
+    keys: Iterable[str],
+    endpoint: str,
+    concurrency: int = 1,
+) -> AsyncIterator[Tuple[int, str, Any]]:
+    """
+    Streams every (system prompt, user prompt) pair through the LLM, at most
+    `concurrency` at a time, and yields (prompt index, array key, raw item) as
+    items complete. The first failing call aborts the whole stream; closing the
+    iterator cancels the calls still running.
+    """
+    keys = list(keys)
+    queue: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(index: int, system_prompt: str, user_prompt: str):
+        try:
+            async with semaphore:
+                parser = ArrayItemStream(keys)
+                async for delta in llm_service_instance.stream_llm(
+                    system_prompt, user_prompt, response_format={"type": "json_object"}, endpoint=endpoint
+                ):
+                    for key, item in parser.feed(delta):
+                        queue.put_nowait((index, key, item))
+            queue.put_nowait((index, _END, None))
+        except Exception as e:
+            queue.put_nowait((index, _END, e))
+
+    tasks = [asyncio.create_task(run(i, system_prompt, user_prompt)) for i, (system_prompt, user_prompt) in enumerate(prompts)]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            index, key, item = await queue.get()
+            if key is _END:
+                remaining -= 1
+                if item is not None:
+                    raise item
+                continue
+            yield index, key, item
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,111 @@
+# In file: app/logic/masking_compiler.py
+"""
+Deterministic compiler from a ClassificationResponse to masking views.
+
+The rules the LLM masking prompt spells out are fixed, so they are applied
+here directly:
+
+- every identifier is double-quoted;
+- PII and Sensitive columns become
+  `CASE WHEN current_user = 'admin' THEN "col" ELSE <mask> END AS "col"`,
+  where <mask> is a placeholder chosen by the column's type family (see
+  MASK_LITERALS) that resolves to the column's own type;
+- primary- and foreign-key columns are never masked, whatever their class;
+- each view is created next to its table, in the table's `schema_name` (or,
+  when that is unknown, the connection's current schema, where the key
+  columns are looked up too).
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.api import models # type: ignore
+
+PRIVILEGED_USER = "admin"
+MASKED_CLASSES = {models.DataClassification.PII, models.DataClassification.SENSITIVE}
+
+# (type names as produced by format_type() or SQLAlchemy, mask literal). The first match wins.
+# The literals are deliberately untyped: PostgreSQL resolves an unknown-typed CASE
+# branch to the type of the THEN branch, so the view column keeps the table column's
+# exact type and CREATE OR REPLACE VIEW never trips over a changed column type.
+MASK_LITERALS = [
+    ({"text", "character varying", "varchar", "character", "char", "bpchar", "citext", "name", "string", "clob", "nvarchar", "nchar"}, "'***'"),
+    ({"smallint", "int2", "integer", "int", "int4", "bigint", "int8", "serial", "bigserial", "smallserial"}, "'0'"),
+    ({"numeric", "decimal", "real", "float4", "double precision", "float8", "float", "money"}, "'0'"),
+    ({"date"}, "'1970-01-01'"),
+    ({"timestamp", "timestamp without time zone", "datetime"}, "'1970-01-01 00:00:00'"),
+    ({"timestamptz", "timestamp with time zone"}, "'1970-01-01 00:00:00+00'"),
+    ({"time", "time without time zone", "timetz", "time with time zone"}, "'00:00:00'"),
+    ({"boolean", "bool"}, "'false'"),
+    ({"uuid"}, "'00000000-0000-0000-0000-000000000000'"),
+    ({"json", "jsonb"}, "'{}'"),
+    ({"bytea", "blob", "largebinary"}, "''"),
+    ({"inet"}, "'0.0.0.0'"),
+    ({"cidr"}, "'0.0.0.0/32'"),
+]
+# Anything else (arrays, enums, domains, geometry, ...) is masked with NULL, which
+# is valid for every type.
+FALLBACK_MASK = "NULL"
+
+_TYPE_MODIFIERS_RE = re.compile(r"\(.*?\)")
+
+
+def quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def qualified_name(schema: Optional[str], name: str) -> str:
+    """"schema"."name", or just "name" (resolved through search_path) when the schema is unknown."""
+    return f"{quote_ident(schema)}.{quote_ident(name)}" if schema else quote_ident(name)
+
+
+def _base_type(data_type: str) -> str:
+    """'character varying(255)' -> 'character varying', 'TIMESTAMP(6) WITH TIME ZONE' -> 'timestamp with time zone'."""
+    return " ".join(_TYPE_MODIFIERS_RE.sub("", data_type).lower().split())
+
+
+def mask_literal(data_type: str) -> str:
+    base = _base_type(data_type)
+    if base.endswith("[]"):
+        return FALLBACK_MASK
+    for type_names, literal in MASK_LITERALS:
+        if base in type_names:
+            return literal
+    return FALLBACK_MASK
+
+
+def compile_column(column: models.ClassifiedColumn, key_columns: Set[str]) -> str:
+    quoted = quote_ident(column.column_name)
+    if column.column_name in key_columns or column.classification not in MASKED_CLASSES:
+        return quoted
+    return (
+        f"CASE WHEN current_user = '{PRIVILEGED_USER}' THEN {quoted} "
+        f"ELSE {mask_literal(column.data_type)} END AS {quoted}"
+    )
+
+
+def compile_view(table: models.ClassifiedTable, key_columns: Iterable[str] = ()) -> Optional[str]:
+    """The CREATE OR REPLACE VIEW statement for one table, or None if it has no columns."""
+    if not table.columns:
+        return None
+    keys = set(key_columns)
+    columns_sql = ",\n        ".join(compile_column(column, keys) for column in table.columns)
+    return (
+        f'CREATE OR REPLACE VIEW {qualified_name(table.schema_name, table.table_name + "_governed_view")} AS\n'
+        f'    SELECT\n'
+        f'        {columns_sql}\n'
+        f'    FROM\n'
+        f'        {qualified_name(table.schema_name, table.table_name)};'
+    )
+
+
+def compile_masking_plan(
+    classification_results: List[models.ClassifiedTable],
+    key_columns_by_table: Dict[str, Iterable[str]],
+) -> List[str]:
+    """One masking view per classified table, in input order."""
+    statements = []
+    for table in classification_results:
+        statement = compile_view(table, key_columns_by_table.get(table.table_name, ()))
+        if statement:
+            statements.append(statement)
+    return statements
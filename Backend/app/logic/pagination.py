@@ -0,0 +1,38 @@
+# In file: app/logic/pagination.py
+import base64
+import datetime
+import decimal
+import json
+import uuid
+from typing import Any, List, Tuple
+
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f"Unsupported keyset value type: {type(value).__name__}")
+
+
+def encode_cursor(view_name: str, key_columns: List[str], last_values: List[Any]) -> str:
+    """
+    Builds an opaque keyset cursor: the view, the ordering key and the key of the
+    last row returned. Values are sent back to Postgres as literals, which it
+    coerces to the key column's type.
+    """
+    payload = json.dumps({"view": view_name, "k": key_columns, "v": last_values}, default=_json_default)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, List[str], List[Any]]:
+    """Returns (view_name, key_columns, last_values). Raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        view_name, key_columns, last_values = payload["view"], payload["k"], payload["v"]
+    except Exception as e:
+        raise ValueError(f"Malformed pagination cursor: {e}")
+    if not isinstance(key_columns, list) or not key_columns or len(key_columns) != len(last_values):
+        raise ValueError("Malformed pagination cursor: key columns and values do not match.")
+    return view_name, key_columns, last_values
@@ -0,0 +1,227 @@
+# In file: app/logic/pre_classifier.py
+"""
+Local pre-classification of schema columns.
+
+Most columns are classified the same way every time from their name, type and
+key membership alone (`id`, `*_id` foreign keys, `created_at`, `email`,
+`phone`, ...). Those are settled here with name/type rules; when Presidio is
+installed and enabled, sampled values of the remaining text columns are scanned
+too. Only columns neither stage is confident about are left for the LLM.
+"""
+import logging
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.api import models # type: ignore
+
+try:
+    from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine
+except ImportError:  # pragma: no cover - optional dependency
+    AnalyzerEngine = None
+    BatchAnalyzerEngine = None
+
+logger = logging.getLogger(__name__)
+
+C = models.DataClassification
+
+# Engines recorded in ClassifiedColumn.decided_by.
+DECIDED_BY_RULES = "rules"
+DECIDED_BY_PRESIDIO = "presidio"
+DECIDED_BY_LLM = "llm"
+
+_TEXT_TYPES = re.compile(r"char|text|string|citext", re.IGNORECASE)
+_TEMPORAL_TYPES = re.compile(r"date|time", re.IGNORECASE)
+_BOOLEAN_TYPES = re.compile(r"bool", re.IGNORECASE)
+
+
+def _any(*patterns: str) -> re.Pattern:
+    return re.compile(r"^(?:%s)$" % "|".join(patterns))
+
+
+# Start of a name or of an underscore-separated word in it, so 'race' does not match 'trace'.
+_WORD_START = r"(?:.*_)?"
+
+
+# (name pattern on the lower-cased column name, optional type check, classification, reasoning).
+# Evaluated in order; the first match decides.
+NAME_RULES: List[Tuple[re.Pattern, Optional[Callable[[str], bool]], C, str]] = [
+    (_any(_WORD_START + r"(password|passwd|pwd)(_hash|_digest|_salt)?", _WORD_START + r"(secret|api_?key|access_?token|refresh_?token|auth_?token|private_?key)"),
+     None, C.SENSITIVE, "Credential or secret material."),
+    (_any(_WORD_START + r"(credit_?card|card_?number|card_?no|cvv|cvc|iban|swift|bic|account_?number|routing_?number)"),
+     None, C.SENSITIVE, "Financial account identifier."),
+    (_any(_WORD_START + r"(ssn|social_security(_.*)?|national_?id|passport(_.*)?|tax_?id|driver_?licen[cs]e(_.*)?)"),
+     None, C.SENSITIVE, "Government-issued identifier."),
+    (_any(_WORD_START + r"(salary|income|wage|diagnosis|medical(_.*)?|health(_.*)?|religion|ethnicity|race|sexual_orientation)"),
+     None, C.SENSITIVE, "Special-category or compensation data."),
+    (_any(r"(e_?mail|email_?address|.*_email)"),
+     None, C.PII, "Email address is Personally Identifiable Information."),
+    (_any(r"(phone|phone_?number|mobile|mobile_?number|telephone|tel|fax|.*_phone)"),
+     None, C.PII, "Phone number is Personally Identifiable Information."),
+    (_any(r"(first_?name|last_?name|full_?name|middle_?name|surname|given_?name|family_?name|maiden_?name|customer_?name|user_?name|username|display_?name)"),
+     None, C.PII, "Person's name or handle is Personally Identifiable Information."),
+    (_any(r"(date_of_birth|dob|birth_?date|birthday)"),
+     None, C.PII, "Date of birth is Personally Identifiable Information."),
+    (_any(r"(address|street.*|address_?line_?\d*|postal_?code|post_?code|zip|zip_?code|home_?address)"),
+     None, C.PII, "Postal address component is Personally Identifiable Information."),
+    (_any(r"(ip|ip_?address|.*_ip|ip_?addr)"),
+     None, C.PII, "IP address can identify a person."),
+    (_any(r"(created|updated|modified|deleted|inserted)_?(at|on|date|time|ts)?"),
+     lambda t: bool(_TEMPORAL_TYPES.search(t)), C.PUBLIC, "Record audit timestamp."),
+    (_any(r"(is|has|can|should)_.+", r".*_(flag|enabled|active)"),
+     lambda t: bool(_BOOLEAN_TYPES.search(t)), C.PUBLIC, "Boolean status flag."),
+    # '*_key' is left to the LLM: it is as likely to be a secret (encryption_key) as an identifier.
+    (_any(r"id|uuid|guid", r".*_(id|uuid|guid)"),
+     None, C.INTERNAL_CONFIDENTIAL, "Internal identifier, not sensitive."),
+]
+
+# Presidio entity types that make a column Sensitive rather than PII.
+_SENSITIVE_ENTITIES = {"CREDIT_CARD", "IBAN_CODE", "US_SSN", "US_PASSPORT", "US_BANK_NUMBER", "US_DRIVER_LICENSE", "CRYPTO", "MEDICAL_LICENSE"}
+
+
+def _classify_by_rules(column: models.ExtractedColumn, is_fk: bool) -> Optional[models.ClassifiedColumn]:
+    name = column.column_name.lower()
+    if is_fk:
+        return models.ClassifiedColumn(
+            column_name=column.column_name, data_type=column.data_type,
+            classification=C.INTERNAL_CONFIDENTIAL, reasoning="Foreign key to another table; internal identifier.",
+            decided_by=DECIDED_BY_RULES,
+        )
+    for pattern, type_check, classification, reasoning in NAME_RULES:
+        if pattern.match(name) and (type_check is None or type_check(column.data_type)):
+            return models.ClassifiedColumn(
+                column_name=column.column_name, data_type=column.data_type,
+                classification=classification, reasoning=reasoning, decided_by=DECIDED_BY_RULES,
+            )
+    return None
+
+
+def pre_classify(schema: models.ExtractedSchema) -> Tuple[Dict[str, Dict[str, models.ClassifiedColumn]], models.ExtractedSchema]:
+    """
+    Settles the columns the name/type rules are confident about.
+    Returns ({table: {column: ClassifiedColumn}}, residual schema of undecided columns).
+    """
+    fk_columns = {(fk.referencing_table, col) for fk in schema.foreign_keys for col in fk.referencing_columns}
+    decided: Dict[str, Dict[str, models.ClassifiedColumn]] = {}
+    residual_tables: Dict[str, models.ExtractedTable] = {}
+    for table_name, table in schema.tables.items():
+        remaining = []
+        for column in table.columns:
+            result = _classify_by_rules(column, (table_name, column.column_name) in fk_columns)
+            if result is None:
+                remaining.append(column)
+            else:
+                decided.setdefault(table_name, {})[column.column_name] = result
+        if remaining:
+            residual_tables[table_name] = models.ExtractedTable(columns=remaining, schema_name=table.schema_name)
+
+    residual = models.ExtractedSchema(
+        tables=residual_tables,
+        foreign_keys=[fk for fk in schema.foreign_keys if fk.referencing_table in residual_tables],
+    )
+    total = sum(len(t.columns) for t in schema.tables.values())
+    settled = sum(len(cols) for cols in decided.values())
+    logger.info(f"Rule pre-classifier settled {settled} of {total} columns.")
+    return decided, residual
+
+
+def text_columns(schema: models.ExtractedSchema) -> Dict[str, List[str]]:
+    """Text-typed columns per table: the ones worth sampling for Presidio."""
+    return {
+        table_name: [c.column_name for c in table.columns if _TEXT_TYPES.search(c.data_type)]
+        for table_name, table in schema.tables.items()
+        if any(_TEXT_TYPES.search(c.data_type) for c in table.columns)
+    }
+
+
+_batch_analyzer = None
+
+
+def presidio_available() -> bool:
+    return BatchAnalyzerEngine is not None
+
+
+def _get_batch_analyzer():
+    global _batch_analyzer
+    if _batch_analyzer is None:
+        # Loading the spaCy model is slow; do it once per process.
+        _batch_analyzer = BatchAnalyzerEngine(analyzer_engine=AnalyzerEngine())
+    return _batch_analyzer
+
+
+def classify_samples_with_presidio(
+    schema: models.ExtractedSchema,
+    samples: Dict[str, Dict[str, List[str]]],
+    min_hit_ratio: float = 0.5,
+    min_score: float = 0.6,
+) -> Dict[str, Dict[str, models.ClassifiedColumn]]:
+    """
+    Runs Presidio over sampled values, one batched analyze call per column, and
+    classifies a column when at least `min_hit_ratio` of its non-empty samples
+    contain a recognised entity. Blocking and CPU-bound; run it in a thread.
+    """
+    if not presidio_available():
+        return {}
+    analyzer = _get_batch_analyzer()
+    decided: Dict[str, Dict[str, models.ClassifiedColumn]] = {}
+    for table_name, columns in samples.items():
+        table = schema.tables.get(table_name)
+        if table is None:
+            continue
+        dtypes = {c.column_name: c.data_type for c in table.columns}
+        for column_name, values in columns.items():
+            values = [v for v in values if v]
+            if not values or column_name not in dtypes:
+                continue
+            entity_hits: Dict[str, int] = {}
+            for findings in analyzer.analyze_iterator(values, language="en"):
+                for entity in {f.entity_type for f in findings if f.score >= min_score}:
+                    entity_hits[entity] = entity_hits.get(entity, 0) + 1
+            if not entity_hits:
+                continue
+            entity, hits = max(entity_hits.items(), key=lambda item: item[1])
+            if hits / len(values) < min_hit_ratio:
+                continue
+            classification = C.SENSITIVE if entity in _SENSITIVE_ENTITIES else C.PII
+            decided.setdefault(table_name, {})[column_name] = models.ClassifiedColumn(
+                column_name=column_name, data_type=dtypes[column_name], classification=classification,
+                reasoning=f"Presidio found {entity} in {hits} of {len(values)} sampled values.",
+                decided_by=DECIDED_BY_PRESIDIO,
+            )
+    return decided
+
+
+def remove_decided(schema: models.ExtractedSchema, decided: Dict[str, Dict[str, models.ClassifiedColumn]]) -> models.ExtractedSchema:
+    """The schema without the columns already in `decided`."""
+    tables = {}
+    for table_name, table in schema.tables.items():
+        settled = decided.get(table_name, {})
+        remaining = [c for c in table.columns if c.column_name not in settled]
+        if remaining:
+            tables[table_name] = models.ExtractedTable(columns=remaining, schema_name=table.schema_name)
+    return models.ExtractedSchema(
+        tables=tables,
+        foreign_keys=[fk for fk in schema.foreign_keys if fk.referencing_table in tables],
+    )
+
+
+def merge_classifications(
+    schema: models.ExtractedSchema,
+    decided: Dict[str, Dict[str, models.ClassifiedColumn]],
+    llm_result: Optional[models.ClassificationResponse],
+) -> models.ClassificationResponse:
+    """Combines local and LLM decisions into one response, in schema table/column order."""
+    by_table: Dict[str, Dict[str, models.ClassifiedColumn]] = {name: dict(cols) for name, cols in decided.items()}
+    if llm_result is not None:
+        for table in llm_result.classification_results:
+            for column in table.columns:
+                if column.decided_by is None:
+                    column.decided_by = DECIDED_BY_LLM
+                by_table.setdefault(table.table_name, {}).setdefault(column.column_name, column)
+
+    results = []
+    for table_name, table in schema.tables.items():
+        columns = by_table.get(table_name, {})
+        ordered = [columns[c.column_name] for c in table.columns if c.column_name in columns]
+        if ordered:
+            results.append(models.ClassifiedTable(table_name=table_name, columns=ordered, schema_name=table.schema_name))
+    return models.ClassificationResponse(classification_results=results)
@@ -0,0 +1,109 @@
+# In file: app/logic/prompt_encoding.py
+"""
+Compact schema encodings for LLM prompts, and a local token estimator.
+
+Pretty-printed JSON repeats `"column_name"` / `"data_type"` for every column
+and spends a large share of the prompt on indentation. The encodings here are
+line-oriented tables instead: one line per table, columns as `name type`
+pairs, one line per foreign key. They carry the same information in roughly
+a quarter to a third of the tokens (see benchmarks/bench_prompt_encoding.py).
+
+    customers: id integer, email character varying(255), created_at timestamp
+    orders.customer_id -> customers.id
+"""
+import math
+import re
+from typing import Dict, Iterable, Optional, Sequence
+
+from app.api import models # type: ignore
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+# Separator between a table name and its columns, and between columns.
+_TABLE_SEP = ": "
+_COLUMN_SEP = ", "
+
+# Letters, short digit runs, single punctuation marks, whitespace runs that BPE keeps apart.
+_PIECE_RE = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]|\s*\n\s*|\s{2,}")
+# A BPE vocabulary covers common English words and identifier fragments in about this many characters.
+_CHARS_PER_WORD_TOKEN = 5
+
+_encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count of `text`: exact with tiktoken's cl100k_base when installed,
+    otherwise a local approximation that counts words, digits, punctuation and
+    whitespace runs the way BPE tokenizers split them (typically within ~10%).
+    """
+    global _encoding
+    if not text:
+        return 0
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    tokens = 0
+    for piece in _PIECE_RE.findall(text):
+        if piece[0].isalpha():
+            tokens += math.ceil(len(piece) / _CHARS_PER_WORD_TOKEN)
+        else:
+            tokens += 1
+    return max(1, tokens)
+
+
+def encode_columns(columns: Iterable[models.ExtractedColumn]) -> str:
+    return _COLUMN_SEP.join(f"{c.column_name} {c.data_type}" for c in columns)
+
+
+def encode_table(table_name: str, table: models.ExtractedTable) -> str:
+    return f"{table_name}{_TABLE_SEP}{encode_columns(table.columns)}"
+
+
+def encode_foreign_key(fk: models.ExtractedForeignKey) -> str:
+    source = ",".join(fk.referencing_columns)
+    target = ",".join(fk.referenced_columns)
+    return f"{fk.referencing_table}.{source} -> {fk.referenced_table}.{target}"
+
+
+def encode_schema(schema: models.ExtractedSchema) -> str:
+    """Tables as `table: column type, ...` lines, then foreign keys as `table.col -> table.col` lines."""
+    lines = ["Tables (table: column type, ...):"]
+    lines.extend(encode_table(name, table) for name, table in schema.tables.items())
+    if schema.foreign_keys:
+        lines.append("Foreign keys (table.column -> table.column):")
+        lines.extend(encode_foreign_key(fk) for fk in schema.foreign_keys)
+    return "\n".join(lines)
+
+
+def encode_classified_tables(tables: Sequence[models.ClassifiedTable]) -> str:
+    """Classified tables as `table: column type [classification], ...` lines."""
+    lines = ["Tables (table: column type [classification], ...):"]
+    for table in tables:
+        columns = _COLUMN_SEP.join(
+            f"{c.column_name} {c.data_type} [{c.classification.value}]" for c in table.columns
+        )
+        lines.append(f"{table.table_name}{_TABLE_SEP}{columns}")
+    return "\n".join(lines)
+
+
+def encode_rows(header: Sequence[str], rows: Iterable[Sequence[object]], title: Optional[str] = None) -> str:
+    """Generic `a | b | c` table with a header line; list values are comma-joined."""
+    lines = [title] if title else []
+    lines.append(" | ".join(header))
+    for row in rows:
+        lines.append(" | ".join(
+            ", ".join(str(v) for v in value) if isinstance(value, (list, tuple)) else str(value)
+            for value in row
+        ))
+    return "\n".join(lines)
+
+
+def prompt_token_breakdown(system_prompt: str, user_prompt: str) -> Dict[str, int]:
+    system_tokens = estimate_tokens(system_prompt)
+    user_tokens = estimate_tokens(user_prompt)
+    return {"system": system_tokens, "user": user_tokens, "total": system_tokens + user_tokens}
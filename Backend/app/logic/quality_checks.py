@@ -0,0 +1,144 @@
+# In file: app/logic/quality_checks.py
+"""
+Planning for data-quality check execution.
+
+Most generated checks have the shape `SELECT COUNT(*) FROM t WHERE <violation>`.
+Checks of that shape against the same relation are folded into one scan:
+
+    SELECT COUNT(*), COUNT(*) FILTER (WHERE <v1>), COUNT(*) FILTER (WHERE <v2>), ... FROM t
+
+Anything else (GROUP BY/duplicate checks, joins, subqueries, non-COUNT(*)
+projections, unparsable SQL) is executed on its own.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import sqlglot
+from sqlglot import exp
+
+logger = logging.getLogger(__name__)
+
+TOTAL_ROWS_CHECK_ID = "__total_rows__"
+
+# Select clauses that change what COUNT(*) means, or make the query more than one scan.
+_UNFUSABLE_CLAUSES = (
+    "joins", "laterals", "group", "having", "qualify", "windows", "distinct",
+    "limit", "offset", "order", "with", "with_", "into", "pivots", "locks",
+)
+
+
+@dataclass
+class FusedScan:
+    """One pass over a relation computing several COUNT(*) FILTER aggregates."""
+    table: exp.Table
+    # (check_id, violation condition or None for an unconditional COUNT(*))
+    checks: List[Tuple[str, Optional[exp.Expression]]] = field(default_factory=list)
+
+    def to_sql(self) -> str:
+        projections = [exp.alias_(exp.Count(this=exp.Star()), "c_total")]
+        for index, (_, condition) in enumerate(self.checks):
+            if condition is not None:
+                projections.append(exp.alias_(
+                    exp.Filter(this=exp.Count(this=exp.Star()), expression=exp.Where(this=condition.copy())),
+                    f"c{index}",
+                ))
+        return exp.select(*projections).from_(self.table.copy()).sql(dialect="postgres")
+
+    def column_for(self, index: int) -> str:
+        return "c_total" if self.checks[index][1] is None else f"c{index}"
+
+
+@dataclass
+class QualityExecutionPlan:
+    fused_scans: List[FusedScan]
+    # (check_id, original SQL) for checks that must run on their own.
+    individual: List[Tuple[str, str]]
+
+
+def _is_count_star(projection: exp.Expression) -> bool:
+    if isinstance(projection, exp.Alias):
+        projection = projection.this
+    if not isinstance(projection, exp.Count) or projection.args.get("distinct"):
+        return False
+    arg = projection.this
+    return isinstance(arg, exp.Star) or (isinstance(arg, exp.Literal) and not arg.is_string)
+
+
+def analyze_count_check(sql: str) -> Optional[Tuple[exp.Table, Optional[exp.Expression]]]:
+    """
+    Returns (table, violation condition) when `sql` is a plain single-table
+    `SELECT COUNT(*) ... [WHERE ...]`, otherwise None.
+    """
+    try:
+        statements = [s for s in sqlglot.parse(sql, read="postgres") if s is not None]
+    except sqlglot.errors.ParseError:
+        return None
+    if len(statements) != 1 or not isinstance(statements[0], exp.Select):
+        return None
+    select = statements[0]
+
+    if any(select.args.get(clause) for clause in _UNFUSABLE_CLAUSES):
+        return None
+    if len(select.expressions) != 1 or not _is_count_star(select.expressions[0]):
+        return None
+
+    from_clause = select.args.get("from_") or select.args.get("from")
+    if from_clause is None or not isinstance(from_clause.this, exp.Table):
+        return None
+
+    table = from_clause.this.copy()
+    where = select.args.get("where")
+    condition = where.this.copy() if where is not None else None
+    if condition is not None:
+        # A FILTER clause may not contain aggregates, and subqueries would re-scan anyway.
+        if condition.find(exp.AggFunc) or condition.find(exp.Select) or condition.find(exp.Window):
+            return None
+        # With a single relation, qualifiers are redundant; dropping them lets
+        # `FROM t AS x WHERE x.c ...` and `FROM t WHERE c ...` share one scan.
+        qualifiers = {table.name.lower(), table.alias_or_name.lower()}
+        for column in condition.find_all(exp.Column):
+            if column.table and column.table.lower() in qualifiers:
+                column.set("table", None)
+                column.set("db", None)
+                column.set("catalog", None)
+    table.set("alias", None)
+    return table, condition
+
+
+def _relation_key(table: exp.Table) -> Tuple[str, ...]:
+    """Identity of a FROM relation, with Postgres case-folding for unquoted names."""
+    def part(identifier) -> str:
+        if identifier is None:
+            return ""
+        if isinstance(identifier, exp.Identifier):
+            return identifier.this if identifier.quoted else identifier.this.lower()
+        return str(identifier.name).lower()
+    return (part(table.args.get("catalog")), part(table.args.get("db")), part(table.this))
+
+
+def plan_quality_checks(table_name: str, checks: List[Tuple[str, str]]) -> QualityExecutionPlan:
+    """
+    Groups fusable checks by relation. The table's total row count is planned
+    as an extra unconditional check with id TOTAL_ROWS_CHECK_ID.
+    """
+    all_checks = [(TOTAL_ROWS_CHECK_ID, f'SELECT COUNT(*) FROM "{table_name}"')] + list(checks)
+    scans: dict = {}
+    individual: List[Tuple[str, str]] = []
+    for check_id, sql in all_checks:
+        analyzed = analyze_count_check(sql)
+        if analyzed is None:
+            individual.append((check_id, sql))
+            continue
+        table, condition = analyzed
+        key = _relation_key(table)
+        if key not in scans:
+            scans[key] = FusedScan(table=table)
+        scans[key].checks.append((check_id, condition))
+
+    fused = list(scans.values())
+    logger.info(
+        f"Quality plan for '{table_name}': {len(all_checks)} queries -> "
+        f"{len(fused)} fused scan(s) + {len(individual)} individual query(ies)."
+    )
+    return QualityExecutionPlan(fused_scans=fused, individual=individual)
@@ -0,0 +1,247 @@
+# In file: app/logic/referential_integrity.py
+"""
+Referential-integrity report built on the local FK graph.
+
+The structure (foundational tables, depths, cycles, impact sets) comes from
+app.logic.fk_graph; the LLM is only asked for the business wording, one call
+per connected group of tables (large groups are split by foreign-key count,
+isolated tables are grouped together). Anything the model leaves out is
+filled with a plain explanation derived from the graph.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from app.api import models # type: ignore
+from app.logic import json_stream, prompt_encoding # type: ignore
+from app.logic.fk_graph import FKGraph # type: ignore
+from app.services.errors import LLMServiceError # type: ignore
+
+logger = logging.getLogger(__name__)
+
+INTEGRITY_SYSTEM_PROMPT = """
+        You are an expert data strategist and business analyst. Your job is to explain part of a database schema to a non-technical executive.
+        The structural analysis has already been done for you: you receive the foreign keys of one group of related tables and the
+        foundational tables of that group (tables that do not depend on any other table), together with the tables that depend on them.
+        Do NOT decide which tables are foundational yourself; explain exactly the items you are given.
+        **Part 1: Data Relationships**
+        For each foreign key provide:
+        - **The Business Rule:** A simple English statement of the rule (e.g., "Every `Order` must belong to an existing `Customer`.").
+        - **Impact of Change:** A clear warning about the "ripple effect" of breaking this link.
+        **Part 2: Foundational Data Tables**
+        For each foundational table provide:
+        - **Business Role:** Explain what this table represents in the business.
+        - **Impact of Change:** Explain the risk of modifying or deleting this table, using the dependent tables you are given.
+        **Output Format (Strict JSON Only):**
+        - Your ONLY output must be a single, valid JSON object. No explanations or text outside the JSON.
+        - The root of the object must have TWO keys: `"relationship_explanations"` and `"foundational_tables"`.
+        - `"relationship_explanations"` is an array of objects, each with keys: `from_table`, `to_table`, `business_rule`, and `impact_of_change`.
+        - `"foundational_tables"` is an array of objects, each with keys: `table_name`, `business_role`, and `impact_of_change`.
+        """
+
+# Dependent tables listed per foundational table in a prompt; the count is always given.
+_MAX_LISTED_DEPENDENTS = 20
+
+# Response array -> (stream event, item model).
+_STREAM_MODELS = {
+    "relationship_explanations": ("relationship", models.RelationshipExplanation),
+    "foundational_tables": ("foundational_table", models.FoundationalTable),
+}
+
+
+def build_batches(graph: FKGraph, max_items_per_batch: int) -> List[Tuple[List[models.ExtractedForeignKey], List[str]]]:
+    """
+    Splits the report into LLM batches of (foreign keys, foundational tables):
+    one per connected component, large components cut into runs of at most
+    `max_items_per_batch` foreign keys, and isolated tables packed together.
+    """
+    max_items = max(1, max_items_per_batch)
+    fks_by_component: Dict[int, List[models.ExtractedForeignKey]] = defaultdict(list)
+    for fk in graph.foreign_keys:
+        fks_by_component[graph.component_of[fk.referencing_table]].append(fk)
+
+    batches: List[Tuple[List[models.ExtractedForeignKey], List[str]]] = []
+    isolated: List[str] = []
+    for index, members in enumerate(graph.components):
+        roots = [name for name in members if not graph.depends_on[name] and name not in graph.external_tables]
+        fks = fks_by_component.get(index, [])
+        if not fks:
+            isolated.extend(roots)
+            continue
+        for start in range(0, len(fks), max_items):
+            # The component's foundational tables travel with its first batch.
+            batches.append((fks[start:start + max_items], roots if start == 0 else []))
+    for start in range(0, len(isolated), max_items):
+        batches.append(([], isolated[start:start + max_items]))
+    return batches
+
+
+def build_batch_prompt(graph: FKGraph, fks: List[models.ExtractedForeignKey], roots: List[str]) -> str:
+    parts = ["Explain this part of the schema."]
+    if fks:
+        parts.append("Foreign keys (from_table.columns -> to_table.columns):")
+        parts.extend(prompt_encoding.encode_foreign_key(fk) for fk in fks)
+    if roots:
+        parts.append(prompt_encoding.encode_rows(
+            ["table_name", "dependent_table_count", "dependent_tables"],
+            (
+                [name, len(graph.impact_set(name)), graph.impact_set(name)[:_MAX_LISTED_DEPENDENTS] or "-"]
+                for name in roots
+            ),
+            title="Foundational tables:",
+        ))
+    return "\n".join(parts)
+
+
+def _fallback_relationship(graph: FKGraph, fk: models.ExtractedForeignKey) -> models.RelationshipExplanation:
+    dependents = [fk.referencing_table] + graph.impact_set(fk.referencing_table)
+    return models.RelationshipExplanation(
+        from_table=fk.referencing_table,
+        to_table=fk.referenced_table,
+        business_rule=f"Every `{fk.referencing_table}` row must point to an existing `{fk.referenced_table}` row.",
+        impact_of_change=(
+            f"Deleting or re-keying `{fk.referenced_table}` rows breaks the link for "
+            f"{len(dependents)} table(s): {', '.join(dependents[:_MAX_LISTED_DEPENDENTS])}."
+        ),
+    )
+
+
+def _fallback_foundational(graph: FKGraph, table_name: str) -> models.FoundationalTable:
+    dependents = graph.impact_set(table_name)
+    return models.FoundationalTable(
+        table_name=table_name,
+        business_role=f"`{table_name}` does not depend on any other table.",
+        impact_of_change=(
+            f"{len(dependents)} table(s) depend on it: {', '.join(dependents[:_MAX_LISTED_DEPENDENTS])}."
+            if dependents else "No other table depends on it."
+        ),
+    )
+
+
+async def _explain_batch(
+    graph: FKGraph, fks: List[models.ExtractedForeignKey], roots: List[str], llm_service_instance
+) -> models.ReferentialIntegrityResponse:
+    response_json_str = await llm_service_instance.call_llm(
+        INTEGRITY_SYSTEM_PROMPT,
+        build_batch_prompt(graph, fks, roots),
+        response_format={"type": "json_object"},
+        endpoint="explain_referential_integrity",
+        validate=models.ReferentialIntegrityResponse.model_validate_json,
+    )
+    logger.info(f"Raw integrity explanation from AI: {response_json_str}")
+    return models.ReferentialIntegrityResponse.model_validate_json(response_json_str)
+
+
+async def explain_schema(
+    graph: FKGraph,
+    llm_service_instance,
+    concurrency: int,
+    max_items_per_batch: int,
+) -> models.ReferentialIntegrityResponse:
+    """
+    Full report for the graph's schema: graph facts computed locally, explanations from
+    concurrent per-component LLM calls, returned in foreign-key / table order.
+    A batch whose call or response fails is logged and left to the graph-derived
+    fallbacks of build_report; only when every batch fails is the error raised.
+    """
+    batches = build_batches(graph, max_items_per_batch)
+    logger.info(
+        f"Explaining {len(graph.foreign_keys)} foreign key(s) across {len(graph.components)} component(s) "
+        f"in {len(batches)} LLM call(s) (concurrency={concurrency})."
+    )
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(fks, roots):
+        async with semaphore:
+            return await _explain_batch(graph, fks, roots, llm_service_instance)
+
+    results = await asyncio.gather(*(run(fks, roots) for fks, roots in batches), return_exceptions=True)
+    outcomes = []
+    failures = []
+    for (fks, roots), result in zip(batches, results):
+        if isinstance(result, (ValidationError, json.JSONDecodeError, LLMServiceError)):
+            logger.warning(
+                f"Integrity explanation batch ({len(fks)} foreign key(s), {len(roots)} foundational table(s)) "
+                f"failed; using graph-derived explanations instead: {result}"
+            )
+            failures.append(result)
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            outcomes.append(result)
+    if failures and not outcomes:
+        raise failures[0]
+    return build_report(
+        graph,
+        [item for outcome in outcomes for item in outcome.relationship_explanations],
+        [item for outcome in outcomes for item in outcome.foundational_tables],
+    )
+
+
+async def stream_report(
+    graph: FKGraph,
+    llm_service_instance,
+    concurrency: int,
+    max_items_per_batch: int,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    The report as (event, payload) pairs: `graph` with the local facts first,
+    then each `relationship` / `foundational_table` as soon as the model has
+    finished it, `invalid` for items that fail validation, and `done` with the
+    complete report (graph-derived fallbacks filled in).
+    """
+    yield "graph", {
+        "table_dependencies": [d.model_dump() for d in graph.table_dependencies()],
+        "cycles": graph.cycles,
+    }
+    batches = build_batches(graph, max_items_per_batch)
+    prompts = [(INTEGRITY_SYSTEM_PROMPT, build_batch_prompt(graph, fks, roots)) for fks, roots in batches]
+    relationships: List[models.RelationshipExplanation] = []
+    foundational: List[models.FoundationalTable] = []
+    async for _, key, item in json_stream.stream_array_items(
+        llm_service_instance, prompts, _STREAM_MODELS, "explain_referential_integrity", concurrency
+    ):
+        event, model = _STREAM_MODELS[key]
+        try:
+            validated = model.model_validate(item)
+        except ValidationError as e:
+            yield "invalid", {"kind": event, "error": str(e), "item": item}
+            continue
+        (relationships if event == "relationship" else foundational).append(validated)
+        yield event, validated
+    yield "done", build_report(graph, relationships, foundational)
+
+
+def build_report(
+    graph: FKGraph,
+    relationship_items: List[models.RelationshipExplanation],
+    foundational_items: List[models.FoundationalTable],
+) -> models.ReferentialIntegrityResponse:
+    """Orders the model's explanations by foreign key / root table and fills in what it left out."""
+    explained: Dict[Tuple[str, str], deque] = defaultdict(deque)
+    for item in relationship_items:
+        explained[(item.from_table, item.to_table)].append(item)
+    roles: Dict[str, models.FoundationalTable] = {}
+    for item in foundational_items:
+        roles.setdefault(item.table_name, item)
+
+    relationships = []
+    for fk in graph.foreign_keys:
+        queue = explained.get((fk.referencing_table, fk.referenced_table))
+        relationships.append(queue.popleft() if queue else _fallback_relationship(graph, fk))
+
+    foundational = [
+        roles.get(name) or _fallback_foundational(graph, name)
+        for name in graph.roots
+        if name not in graph.external_tables
+    ]
+    return models.ReferentialIntegrityResponse(
+        relationship_explanations=relationships,
+        foundational_tables=foundational,
+        table_dependencies=graph.table_dependencies(),
+        cycles=graph.cycles,
+    )
@@ -0,0 +1,179 @@
+# In file: app/logic/schema_index.py
+"""
+Relevance index over a database schema for NL-to-SQL prompts.
+
+Each table is a BM25 document made of its (split) table name, weighted up,
+and its column names. For a prompt, the top-k tables are selected, then
+connected to the best match through the shortest foreign-key paths so the
+model gets the bridge tables and join conditions it needs, and nothing else.
+"""
+import math
+import re
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+_WORD_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "each", "for", "from",
+    "get", "give", "has", "have", "how", "i", "in", "is", "it", "list", "me", "many", "much", "of",
+    "on", "or", "per", "please", "show", "than", "that", "the", "their", "them", "there", "to",
+    "was", "were", "what", "when", "where", "which", "who", "with", "all", "find", "return",
+}
+# Table names describe the document far better than any single column does.
+_TABLE_NAME_WEIGHT = 3
+
+
+def _stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("ses", "xes", "ches", "shes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits prose and identifiers (snake_case, camelCase) into stemmed, lower-case terms."""
+    tokens = []
+    for word in _WORD_RE.findall(text):
+        word = word.lower()
+        if word in _STOPWORDS:
+            continue
+        tokens.append(_stem(word))
+    return tokens
+
+
+TableKey = Tuple[str, str]
+
+
+class SchemaIndex:
+    """BM25 index over tables plus an undirected foreign-key graph for join paths."""
+
+    def __init__(
+        self,
+        tables: Sequence[Tuple[str, str, List[Dict[str, str]]]],
+        foreign_keys: Sequence[Dict[str, Any]],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.k1 = k1
+        self.b = b
+        # (schema, table) -> columns, so same-named tables in different schemas stay apart.
+        self.tables: Dict[TableKey, List[Dict[str, str]]] = {}
+        for schema_name, table_name, columns in tables:
+            self.tables[(schema_name, table_name)] = columns
+
+        self._term_freqs: Dict[TableKey, Counter] = {}
+        doc_freq: Counter = Counter()
+        for (schema_name, table_name), columns in self.tables.items():
+            terms = tokenize(schema_name) + tokenize(table_name) * _TABLE_NAME_WEIGHT
+            for column in columns:
+                terms.extend(tokenize(column["column_name"]))
+            counts = Counter(terms)
+            self._term_freqs[(schema_name, table_name)] = counts
+            doc_freq.update(counts.keys())
+        self._doc_lengths = {key: sum(counts.values()) for key, counts in self._term_freqs.items()}
+        self._avg_length = (sum(self._doc_lengths.values()) / len(self._doc_lengths)) if self._doc_lengths else 0.0
+        total = len(self._term_freqs)
+        self._idf = {term: math.log(1 + (total - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+        # Adjacency: table -> [(neighbour, fk)]; edges are walked in both directions.
+        # Each kept FK is stored with the resolved keys of both ends.
+        self._edges: Dict[TableKey, List[Tuple[TableKey, Dict[str, Any]]]] = {key: [] for key in self.tables}
+        self.foreign_keys: List[Tuple[TableKey, TableKey, Dict[str, Any]]] = []
+        for fk in foreign_keys:
+            source = self._resolve(fk.get("referencing_schema"), fk["referencing_table"])
+            target = self._resolve(fk.get("referenced_schema"), fk["referenced_table"])
+            if source is None or target is None:
+                continue
+            self.foreign_keys.append((source, target, fk))
+            self._edges[source].append((target, fk))
+            self._edges[target].append((source, fk))
+
+    def _resolve(self, schema_name: Optional[str], table_name: str) -> Optional[TableKey]:
+        """The key of an FK end; without a schema, only an unambiguous table name resolves."""
+        if schema_name is not None:
+            key = (schema_name, table_name)
+            return key if key in self.tables else None
+        matches = [key for key in self.tables if key[1] == table_name]
+        return matches[0] if len(matches) == 1 else None
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def score(self, prompt: str) -> List[Tuple[TableKey, float]]:
+        """BM25 scores of every table with a non-zero match, best first."""
+        query_terms = set(tokenize(prompt))
+        scores = []
+        for key, counts in self._term_freqs.items():
+            length_norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[key] / (self._avg_length or 1))
+            total = 0.0
+            for term in query_terms:
+                tf = counts.get(term)
+                if tf:
+                    total += self._idf[term] * tf * (self.k1 + 1) / (tf + length_norm)
+            if total > 0:
+                scores.append((key, total))
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        return scores
+
+    def _shortest_path(self, start: TableKey, goal: TableKey, max_hops: int) -> Optional[List[TableKey]]:
+        parents = {start: None}
+        queue = deque([(start, 0)])
+        while queue:
+            node, depth = queue.popleft()
+            if node == goal:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = parents[node]
+                return path[::-1]
+            if depth == max_hops:
+                continue
+            for neighbour, _ in self._edges[node]:
+                if neighbour not in parents:
+                    parents[neighbour] = node
+                    queue.append((neighbour, depth + 1))
+        return None
+
+    def select_tables(self, prompt: str, top_k: int, max_hops: int = 3) -> List[TableKey]:
+        """
+        The top-k matching tables, plus any bridge tables on the shortest FK path
+        from each of them to the best match. With no lexical match at all, the
+        most connected tables are used instead.
+        """
+        ranked = [key for key, _ in self.score(prompt)[:top_k]]
+        if not ranked:
+            hubs = sorted(self.tables, key=lambda key: (-len(self._edges[key]), key))
+            return hubs[:top_k]
+
+        selected = list(ranked)
+        anchor = ranked[0]
+        for key in ranked[1:]:
+            path = self._shortest_path(key, anchor, max_hops)
+            for bridge in (path or [])[1:-1]:
+                if bridge not in selected:
+                    selected.append(bridge)
+        return selected
+
+    def render(self, table_keys: Sequence[TableKey]) -> str:
+        """Renders tables, schema-qualified, in the talk-to-db prompt format, followed by their join conditions."""
+        wanted = set(table_keys)
+        parts = []
+        for schema_name, table_name in table_keys:
+            column_defs = [f"{col['column_name']} {col['data_type']}" for col in self.tables[(schema_name, table_name)]]
+            parts.append(f'"{schema_name}"."{table_name}": {", ".join(column_defs)}')
+
+        joins = []
+        for (src_schema, src_table), (tgt_schema, tgt_table), fk in self.foreign_keys:
+            if (src_schema, src_table) in wanted and (tgt_schema, tgt_table) in wanted:
+                conditions = " AND ".join(
+                    f'"{src_schema}"."{src_table}"."{src_col}" = "{tgt_schema}"."{tgt_table}"."{tgt_col}"'
+                    for src_col, tgt_col in zip(fk["referencing_columns"], fk["referenced_columns"])
+                )
+                joins.append(f"- {conditions}")
+        if joins:
+            parts.append("Join paths (foreign keys):")
+            parts.extend(joins)
+        return "\n".join(parts)
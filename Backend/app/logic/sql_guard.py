@@ -0,0 +1,104 @@
+# In file: app/logic/sql_guard.py
+"""
+Pre-execution guard for LLM-generated SQL.
+
+The generated text is parsed with sqlglot rather than sniffed with
+`startswith("select")`: exactly one statement is allowed, writes (DML, DDL,
+data-modifying CTEs, SELECT INTO, row locks) are refused in read-only mode,
+and reads get a LIMIT so a stray `SELECT *` cannot pull a whole table into memory.
+"""
+import logging
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+import sqlglot
+from sqlglot import exp
+
+logger = logging.getLogger(__name__)
+
+_CODE_FENCE_RE = re.compile(r"^\s*```(?:sql)?\s*(.*?)\s*```\s*$", re.DOTALL | re.IGNORECASE)
+_WRITE_NODES = (exp.Insert, exp.Update, exp.Delete, exp.Merge)
+
+
+class SQLGuardError(ValueError):
+    """The generated SQL was refused before reaching the database."""
+
+
+@dataclass
+class GuardedQuery:
+    sql: str                   # What will actually be executed.
+    is_read: bool
+    statement_type: str
+    max_rows: Optional[int]    # Rows to return at most; None for writes.
+    # The LIMIT was raised to max_rows + 1 so that truncation can be detected.
+    probe_row_added: bool = False
+
+
+def _strip_code_fence(sql: str) -> str:
+    match = _CODE_FENCE_RE.match(sql)
+    return match.group(1) if match else sql
+
+
+def _literal_limit(query: exp.Query) -> Optional[int]:
+    """The query's own LIMIT as an int, or None when absent or not a plain number."""
+    limit = query.args.get("limit")
+    if isinstance(limit, exp.Limit) and isinstance(limit.expression, exp.Literal) and not limit.expression.is_string:
+        try:
+            return int(limit.expression.this)
+        except ValueError:
+            return None
+    return None
+
+
+def guard_sql(sql: str, max_rows: int, read_only: bool = True) -> GuardedQuery:
+    """
+    Validates and rewrites one generated statement. Reads are capped at
+    `max_rows` (fetched as max_rows + 1 to detect truncation); anything that is
+    not a plain read is refused when `read_only` is set.
+    """
+    sql = _strip_code_fence(sql).strip().rstrip(";").strip()
+    if not sql:
+        raise SQLGuardError("The generated SQL is empty.")
+    try:
+        statements = [s for s in sqlglot.parse(sql, read="postgres") if s is not None]
+    except sqlglot.errors.ParseError as e:
+        raise SQLGuardError(f"The generated SQL could not be parsed: {e}")
+    if len(statements) != 1:
+        raise SQLGuardError(f"Exactly one SQL statement is allowed; got {len(statements)}.")
+
+    statement = statements[0]
+    statement_type = statement.key.upper()
+    is_read = (
+        isinstance(statement, exp.Query)
+        and not statement.find(*_WRITE_NODES)
+        and not statement.find(exp.Into)
+        and not any(select.args.get("locks") for select in statement.find_all(exp.Select))
+    )
+    if not is_read:
+        if read_only:
+            if isinstance(statement, exp.Query):
+                raise SQLGuardError(
+                    "Only read-only queries are allowed; the generated SELECT has side effects "
+                    "(data-modifying CTE, SELECT INTO or row locks)."
+                )
+            raise SQLGuardError(f"Only read-only queries are allowed; the generated SQL is a {statement_type} statement.")
+        logger.warning(f"Executing non-read generated statement of type {statement_type}.")
+        return GuardedQuery(sql=sql, is_read=False, statement_type=statement_type, max_rows=None)
+
+    own_limit = _literal_limit(statement)
+    if own_limit is not None and own_limit <= max_rows:
+        return GuardedQuery(sql=sql, is_read=True, statement_type=statement_type, max_rows=own_limit)
+
+    if statement.args.get("limit") is None or own_limit is not None:
+        rewritten = statement.limit(max_rows + 1, copy=True)
+    else:
+        # FETCH FIRST or a non-literal LIMIT: cap from the outside.
+        rewritten = exp.select("*").from_(statement.subquery("_guarded")).limit(max_rows + 1)
+    return GuardedQuery(
+        sql=rewritten.sql(dialect="postgres"),
+        is_read=True,
+        statement_type=statement_type,
+        max_rows=max_rows,
+        probe_row_added=True,
+    )
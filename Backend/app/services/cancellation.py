@@ -0,0 +1,36 @@
+# In file: app/services/cancellation.py
+import asyncio
+import logging
+from typing import Awaitable, TypeVar
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ClientDisconnectedError(Exception):
+    """Raised when the HTTP client went away and the work was cancelled."""
+
+
+async def cancel_on_disconnect(request: Request, work: Awaitable[T], poll_interval: float = 0.5) -> T:
+    """
+    Awaits `work`, polling the request for a client disconnect. If the client
+    leaves first, the work is cancelled (asyncpg forwards the cancellation to
+    the server, so in-flight queries stop too) and ClientDisconnectedError is raised.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info(f"Client disconnected from {request.url.path}; cancelling in-flight work.")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise ClientDisconnectedError()
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,177 @@
+# In file: app/services/classification_catalog.py
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+from app.api import models # type: ignore
+from app.core.config import Settings # type: ignore
+from app.services.engine_registry import normalize_dsn # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class ClassificationCatalog:
+    """
+    Persistent catalog of column classifications keyed by (DSN, schema, table,
+    column). A stored result is reused for as long as the column keeps the same
+    data type, so a re-run only has to classify columns that were added or whose
+    type changed. Backed by SQLite so results survive restarts and are shared by
+    all workers on the host.
+    """
+
+    def __init__(self, path: str = "classification_catalog.sqlite3", enabled: bool = False):
+        self.path = path
+        self.enabled = enabled
+        self.reused = 0
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def configure(self, settings: Settings):
+        self.path = settings.CLASSIFICATION_CATALOG_PATH
+        self.enabled = settings.CLASSIFICATION_CATALOG_ENABLED
+        if self.enabled:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS column_classifications ("
+                    " dsn_hash TEXT NOT NULL, schema_name TEXT NOT NULL, table_name TEXT NOT NULL,"
+                    " column_name TEXT NOT NULL, data_type TEXT NOT NULL, classification TEXT NOT NULL,"
+                    " reasoning TEXT NOT NULL, decided_by TEXT, updated_at REAL NOT NULL,"
+                    " PRIMARY KEY (dsn_hash, schema_name, table_name, column_name))"
+                )
+            logger.info(f"Classification catalog enabled at {self.path}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection that commits on success, rolls back on error and is always closed."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def dsn_hash(conn_str: str) -> str:
+        return hashlib.sha256(normalize_dsn(conn_str).encode("utf-8")).hexdigest()
+
+    def lookup(
+        self, conn_str: str, schema: models.ExtractedSchema
+    ) -> Tuple[Dict[str, Dict[str, models.ClassifiedColumn]], models.ExtractedSchema]:
+        """
+        Splits `schema` into the columns the catalog already classified with the
+        same data type ({table: {column: ClassifiedColumn}}) and the schema of
+        columns that still need classifying (new or type-changed).
+        """
+        known: Dict[str, Dict[str, models.ClassifiedColumn]] = {}
+        if not self.enabled:
+            return known, schema
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT schema_name, table_name, column_name, data_type, classification, reasoning, decided_by"
+                " FROM column_classifications WHERE dsn_hash = ?",
+                (self.dsn_hash(conn_str),),
+            ).fetchall()
+        stored = {(r[0], r[1], r[2]): r[3:] for r in rows}
+
+        pending_tables: Dict[str, models.ExtractedTable] = {}
+        for table_name, table in schema.tables.items():
+            schema_name = table.schema_name or ""
+            remaining = []
+            for column in table.columns:
+                entry = stored.get((schema_name, table_name, column.column_name))
+                if entry is None or entry[0] != column.data_type:
+                    remaining.append(column)
+                    continue
+                known.setdefault(table_name, {})[column.column_name] = models.ClassifiedColumn(
+                    column_name=column.column_name, data_type=column.data_type,
+                    classification=entry[1], reasoning=entry[2], decided_by=entry[3],
+                )
+            if remaining:
+                pending_tables[table_name] = models.ExtractedTable(columns=remaining, schema_name=table.schema_name)
+
+        pending = models.ExtractedSchema(
+            tables=pending_tables,
+            foreign_keys=[fk for fk in schema.foreign_keys if fk.referencing_table in pending_tables],
+        )
+        reused = sum(len(cols) for cols in known.values())
+        remaining_count = sum(len(t.columns) for t in pending_tables.values())
+        with self._lock:
+            self.reused += reused
+            self.pending += remaining_count
+        logger.info(f"Classification catalog reused {reused} column(s); {remaining_count} need classifying.")
+        return known, pending
+
+    def store(self, conn_str: str, schema: models.ExtractedSchema, response: models.ClassificationResponse):
+        """
+        Records the classification of every column in `response` and drops catalog
+        rows for columns that no longer exist in the classified tables of `schema`.
+        """
+        if not self.enabled:
+            return
+        dsn = self.dsn_hash(conn_str)
+        now = time.time()
+        rows = []
+        for table in response.classification_results:
+            extracted = schema.tables.get(table.table_name)
+            if extracted is None:
+                continue
+            schema_name = extracted.schema_name or ""
+            for column in table.columns:
+                rows.append((
+                    dsn, schema_name, table.table_name, column.column_name, column.data_type,
+                    column.classification.value, column.reasoning, column.decided_by, now,
+                ))
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO column_classifications"
+                " (dsn_hash, schema_name, table_name, column_name, data_type, classification, reasoning, decided_by, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            for table_name, table in schema.tables.items():
+                names = [c.column_name for c in table.columns]
+                placeholders = ", ".join("?" for _ in names)
+                conn.execute(
+                    "DELETE FROM column_classifications WHERE dsn_hash = ? AND schema_name = ? AND table_name = ?"
+                    f" AND column_name NOT IN ({placeholders})",
+                    (dsn, table.schema_name or "", table_name, *names),
+                )
+
+    def forget_tables(self, conn_str: str, table_names: Iterable[str]) -> int:
+        """Drops every stored classification for the given tables, in any schema. Returns the rows removed."""
+        if not self.enabled:
+            return 0
+        dsn = self.dsn_hash(conn_str)
+        removed = 0
+        with self._connect() as conn:
+            for table_name in table_names:
+                cursor = conn.execute(
+                    "DELETE FROM column_classifications WHERE dsn_hash = ? AND table_name = ?", (dsn, table_name)
+                )
+                removed += cursor.rowcount
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        entries = 0
+        if self.enabled:
+            with self._connect() as conn:
+                entries = conn.execute("SELECT COUNT(*) FROM column_classifications").fetchone()[0]
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": entries,
+                "columns_reused": self.reused,
+                "columns_pending": self.pending,
+            }
+
+
+classification_catalog = ClassificationCatalog()
+
+
+def initialize_classification_catalog(settings: Settings):
+    classification_catalog.configure(settings)
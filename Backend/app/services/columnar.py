@@ -0,0 +1,88 @@
+# In file: app/services/columnar.py
+"""
+Columnar (Apache Arrow / Parquet) encoding of query results.
+
+Row tuples from the DB cursor are transposed straight into Arrow arrays, which
+skips the per-row dict and Pydantic validation of the JSON path. pyarrow is an
+optional dependency; without it the columnar formats are simply unavailable.
+"""
+import io
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the deployment
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+_MEDIA_TYPES = {"arrow": ARROW_STREAM_MEDIA_TYPE, "parquet": PARQUET_MEDIA_TYPE}
+
+
+class ColumnarUnavailableError(Exception):
+    """Raised when a columnar format is requested but pyarrow is not installed."""
+
+
+def negotiate_format(accept: Optional[str], format_param: Optional[str]) -> str:
+    """
+    Picks the response format from an explicit `?format=` value or, failing
+    that, the Accept header. Returns "json", "arrow" or "parquet".
+    """
+    if format_param:
+        fmt = format_param.lower()
+        if fmt not in ("json", "arrow", "parquet"):
+            raise ValueError(f"Unsupported format '{format_param}'. Use one of: json, arrow, parquet.")
+        return fmt
+    if accept:
+        for media_range in accept.split(","):
+            media_type = media_range.split(";")[0].strip().lower()
+            if media_type == ARROW_STREAM_MEDIA_TYPE:
+                return "arrow"
+            if media_type in (PARQUET_MEDIA_TYPE, "application/x-parquet"):
+                return "parquet"
+    return "json"
+
+
+def media_type_for(fmt: str) -> str:
+    return _MEDIA_TYPES[fmt]
+
+
+def _to_arrow_array(values: Sequence[Any]):
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # Types Arrow cannot infer (uuid, mixed, json documents) fall back to text.
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def build_table(columns: List[str], rows: List[tuple], metadata: Optional[Dict[str, str]] = None):
+    if pa is None:
+        raise ColumnarUnavailableError("Columnar output requires the 'pyarrow' package, which is not installed.")
+    if rows:
+        arrays = [_to_arrow_array(column_values) for column_values in zip(*rows)]
+    else:
+        arrays = [pa.array([], type=pa.null()) for _ in columns]
+    table = pa.Table.from_arrays(arrays, names=columns)
+    if metadata:
+        table = table.replace_schema_metadata({k: v for k, v in metadata.items() if v is not None})
+    return table
+
+
+def encode(columns: List[str], rows: List[tuple], fmt: str, metadata: Optional[Dict[str, str]] = None) -> bytes:
+    """Encodes the rows as an Arrow IPC stream or a Parquet file."""
+    table = build_table(columns, rows, metadata)
+    sink = io.BytesIO()
+    if fmt == "arrow":
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif fmt == "parquet":
+        pq.write_table(table, sink)
+    else:
+        raise ValueError(f"Unsupported columnar format '{fmt}'.")
+    return sink.getvalue()
@@ -1,193 +1,488 @@
-# In file: app/services/db_service.py
-import logging
-from sqlalchemy import create_engine, inspect
-from typing import Dict, Any
-import asyncio
-from typing import List 
-from sqlalchemy import create_engine, text
-import asyncpg
-from .errors import DatabaseServiceError
-from app.services.errors import DatabaseServiceError # type: ignore
-
-logger = logging.getLogger(__name__)
-
-def _extract_schema_sync(conn_str: str) -> Dict[str, Any]:
-    try:
-        engine = create_engine(conn_str)
-        inspector = inspect(engine)
-        
-        all_tables_info = {}
-        all_fks = []
-        
-        schemas = [s for s in inspector.get_schema_names() if not s.startswith('pg_') and s != 'information_schema']
-        
-        if not schemas:
-            schemas = [None] 
-
-        for schema in schemas:
-            for table_name in inspector.get_table_names(schema=schema):
-                # ### FIX: Changed keys 'name'->'column_name' and 'type'->'data_type' to match models.py
-                columns = [
-                    {'column_name': col['name'], 'data_type': str(col['type'])} 
-                    for col in inspector.get_columns(table_name, schema=schema)
-                ]
-                all_tables_info[table_name] = {"columns": columns}
-                
-                foreign_keys = inspector.get_foreign_keys(table_name, schema=schema)
-                for fk in foreign_keys:
-                    all_fks.append({
-                        "name": fk['name'],
-                        "referencing_table": table_name,
-                        "referencing_columns": fk['constrained_columns'],
-                        "referenced_table": fk['referred_table'],
-                        "referenced_columns": fk['referred_columns'],
-                    })
-                    
-        return {"tables": all_tables_info, "foreign_keys": all_fks}
-        
-    except Exception as e:
-        logger.error(f"Failed to extract schema: {e}")
-        raise DatabaseServiceError(f"Failed to extract schema: {e}", 500)
-
-async def extract_db_schema(conn_str: str) -> Dict[str, Any]:
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, _extract_schema_sync, conn_str)
-
-# ### BEST PRACTICE: Included your apply_sql_statements function for completeness.
-def _execute_statements_sync(conn_str: str, statements: list[str]):
-    """
-    Synchronously executes statements using SQLAlchemy.
-    This function is designed to be run in a separate thread.
-    """
-    # create_engine is a factory for connections and manages a connection pool.
-    engine = create_engine(conn_str)
-    
-    # engine.connect() checks out a connection from the pool.
-    with engine.connect() as connection:
-        # connection.begin() starts a transaction block.
-        with connection.begin() as transaction:
-            try:
-                for stmt in statements:
-                    # Ensure we don't execute empty strings
-                    if stmt and stmt.strip():
-                        connection.execute(text(stmt))
-                
-                # The transaction is automatically committed here if no exception was raised.
-                # The explicit `transaction.commit()` is not needed with `with connection.begin()`.
-            except Exception as e:
-                # The transaction is automatically rolled back here upon exiting the `with`
-                # block due to an exception.
-                raise DatabaseServiceError(message=f"Failed to apply SQL: {e}", status_code=400)
-
-# This is your async wrapper function. We'll call this from the API endpoint.
-async def execute_statements(conn_str: str, statements: list[str]):
-    """
-    Asynchronously executes a list of SQL statements by running the
-    synchronous SQLAlchemy logic in a thread pool executor.
-    """
-    loop = asyncio.get_running_loop()
-    # `run_in_executor` pushes the blocking function to a thread,
-    # freeing the event loop to handle other requests.
-    await loop.run_in_executor(
-        None,  # Use the default thread pool executor
-        _execute_statements_sync,
-        conn_str,
-        statements
-    )
-
-def _list_governed_views_sync(conn_str: str) -> List[str]:
-    """Synchronously inspects the database for views ending in '_governed_view'."""
-    try:
-        engine = create_engine(conn_str)
-        inspector = inspect(engine)
-        all_views = inspector.get_view_names()
-        # Filter the list to find only the views created by our governance process
-        governed_views = [v for v in all_views if v.endswith('_governed_view')]
-        return governed_views
-    except Exception as e:
-        logger.error(f"Failed to list governed views: {e}", exc_info=True)
-        raise DatabaseServiceError(f"Failed to list views from database: {e}", 500)
-
-async def list_governed_views(conn_str: str) -> List[str]:
-    """Asynchronously lists governed views by running the sync inspector in a thread."""
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, _list_governed_views_sync, conn_str)
-
-
-# =============================================================================
-# NEW: Functions for Fetching Data from a View
-# =============================================================================
-
-def _fetch_view_data_sync(conn_str: str, view_name: str, limit: int, offset: int, role: str) -> List[Dict[str, Any]]:
-    """
-    Synchronously fetches paginated data from a specific view,
-    assuming a database role for the duration of the transaction.
-    """
-    try:
-        engine = create_engine(conn_str)
-        with engine.connect() as connection:
-            # Step 1: Set the role for the current transaction.
-            # This is the crucial part that applies the masking rules.
-            # We use text() and parameter binding to safely handle the role name and prevent SQL injection.
-            set_role_stmt = text("SET ROLE :role")
-            connection.execute(set_role_stmt, {"role": role})
-
-            # Step 2: Execute the main SELECT query.
-            # This query will now run with the permissions of the role set above.
-            safe_view_name = f'"{view_name}"'
-            query = text(f'SELECT * FROM {safe_view_name} LIMIT :limit OFFSET :offset')
-            result = connection.execute(query, {"limit": limit, "offset": offset})
-            rows = [dict(row._mapping) for row in result.fetchall()]
-            
-            # Note: The role is automatically reset to the original user when the
-            # connection is closed and returned to the pool at the end of the `with` block.
-            return rows
-            
-    except Exception as e:
-        logger.error(f"Failed to fetch data from view '{view_name}' as role '{role}': {e}", exc_info=True)
-        # Provide a more specific and helpful error message to the user.
-        raise DatabaseServiceError(f"Failed to fetch data from view '{view_name}'. Check if role '{role}' exists and has permissions on the view. Error: {e}", 400)
-
-async def fetch_view_data(conn_str: str, view_name: str, limit: int, offset: int, role: str) -> List[Dict[str, Any]]:
-    """
-    Asynchronously fetches view data by running the sync query (with SET ROLE) in a thread.
-    The function signature now correctly includes the 'role' parameter.
-    """
-    loop = asyncio.get_running_loop()
-    # Pass the 'role' argument to the synchronous worker function.
-    return await loop.run_in_executor(
-        None, _fetch_view_data_sync, conn_str, view_name, limit, offset, role
-    )
-
-async def execute_scalar_query(conn_str: str, query: str) -> int:
-    """
-    Executes a SQL query that is expected to return a single value (a scalar), like a count.
-
-    Args:
-        conn_str: The database connection string.
-        query: The SQL query to execute (e.g., "SELECT COUNT(*) FROM my_table").
-
-    Returns:
-        The integer result of the query.
-
-    Raises:
-        DatabaseServiceError: If any database-related error occurs.
-    """
-    conn = None
-    try:
-        # Establish connection to the database
-        conn = await asyncpg.connect(dsn=conn_str)
-        
-        # fetchval() is the perfect method to get a single value from a query
-        result = await conn.fetchval(query)
-        
-        # Ensure we return an integer. If the query returns None, default to 0.
-        return int(result) if result is not None else 0
-
-    except (asyncpg.PostgresError, OSError) as e:
-        # Catch specific database or connection errors
-        raise DatabaseServiceError(message=f"Database query failed: {e}", status_code=500)
-    finally:
-        # CRITICAL: Always ensure the connection is closed to prevent leaks
-        if conn:
-            await conn.close()
\ No newline at end of file
+# In file: app/services/db_service.py
+import csv
+import io
+import json
+import logging
+import threading
+from sqlalchemy import inspect
+from typing import Dict, Any, Optional
+import asyncio
+from typing import Iterator, List, Tuple
+from sqlalchemy import text
+import asyncpg
+from app.services.errors import DatabaseServiceError # type: ignore
+from app.services.engine_registry import get_engine, get_async_pool, normalize_dsn # type: ignore
+from app.services import pg_catalog # type: ignore
+from app.services.schema_cache import schema_cache # type: ignore
+from app.services.result_cache import result_cache, statements_footprint # type: ignore
+from app.services.singleflight import schema_flight # type: ignore
+
+logger = logging.getLogger(__name__)
+
+def _extract_schema_with_inspector(engine) -> Dict[str, Any]:
+    """Portable (but per-table) extraction path, used for non-Postgres dialects."""
+    inspector = inspect(engine)
+    
+    all_tables_info = {}
+    all_fks = []
+    
+    schemas = [s for s in inspector.get_schema_names() if not s.startswith('pg_') and s != 'information_schema']
+    
+    if not schemas:
+        schemas = [None] 
+
+    for schema in schemas:
+        for table_name in inspector.get_table_names(schema=schema):
+            # ### FIX: Changed keys 'name'->'column_name' and 'type'->'data_type' to match models.py
+            columns = [
+                {'column_name': col['name'], 'data_type': str(col['type'])} 
+                for col in inspector.get_columns(table_name, schema=schema)
+            ]
+            all_tables_info[table_name] = {"columns": columns, "schema_name": schema}
+            
+            foreign_keys = inspector.get_foreign_keys(table_name, schema=schema)
+            for fk in foreign_keys:
+                all_fks.append({
+                    "name": fk['name'],
+                    "referencing_table": table_name,
+                    "referencing_columns": fk['constrained_columns'],
+                    "referenced_table": fk['referred_table'],
+                    "referenced_columns": fk['referred_columns'],
+                })
+                
+    return {"tables": all_tables_info, "foreign_keys": all_fks}
+
+def _load_schema(engine) -> Dict[str, Any]:
+    if pg_catalog.is_postgres(engine):
+        # Bulk path: a handful of set-based pg_catalog queries instead of N+1 Inspector calls.
+        with engine.connect() as connection:
+            return pg_catalog.extract_schema(connection)
+    return _extract_schema_with_inspector(engine)
+
+def _extract_schema_sync(conn_str: str) -> Dict[str, Any]:
+    try:
+        # Served from the fingerprinted schema cache until the catalog changes.
+        schema, _ = schema_cache.get_or_load(conn_str, "extracted_schema", _load_schema)
+        return schema
+        
+    except DatabaseServiceError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to extract schema: {e}")
+        raise DatabaseServiceError(f"Failed to extract schema: {e}", 500)
+
+async def extract_db_schema(conn_str: str) -> Dict[str, Any]:
+    # Concurrent extractions of the same database share one run; the result is read-only.
+    loop = asyncio.get_running_loop()
+    return await schema_flight.do(
+        (normalize_dsn(conn_str), "extracted_schema"),
+        lambda: loop.run_in_executor(None, _extract_schema_sync, conn_str),
+    )
+
+# ### BEST PRACTICE: Included your apply_sql_statements function for completeness.
+def _execute_statements_sync(conn_str: str, statements: list[str]):
+    """
+    Synchronously executes statements using SQLAlchemy.
+    This function is designed to be run in a separate thread.
+    """
+    # The registry hands back a shared, pooled engine for this DSN.
+    engine = get_engine(conn_str)
+    
+    # engine.connect() checks out a connection from the pool.
+    with engine.connect() as connection:
+        # connection.begin() starts a transaction block.
+        with connection.begin() as transaction:
+            try:
+                # Looked up before the statements run, so views they drop are still found.
+                dependent_views = []
+                touched = statements_footprint(statements)
+                if touched and pg_catalog.is_postgres(connection):
+                    dependent_views = pg_catalog.fetch_dependent_views(connection, touched)
+
+                for stmt in statements:
+                    # Ensure we don't execute empty strings
+                    if stmt and stmt.strip():
+                        connection.execute(text(stmt))
+                
+                # The transaction is automatically committed here if no exception was raised.
+                # The explicit `transaction.commit()` is not needed with `with connection.begin()`.
+            except Exception as e:
+                # The transaction is automatically rolled back here upon exiting the `with`
+                # block due to an exception.
+                raise DatabaseServiceError(message=f"Failed to apply SQL: {e}", status_code=400)
+    return dependent_views
+
+# This is your async wrapper function. We'll call this from the API endpoint.
+async def execute_statements(conn_str: str, statements: list[str]):
+    """
+    Asynchronously executes a list of SQL statements by running the
+    synchronous SQLAlchemy logic in a thread pool executor.
+    """
+    loop = asyncio.get_running_loop()
+    # `run_in_executor` pushes the blocking function to a thread,
+    # freeing the event loop to handle other requests.
+    dependent_views = await loop.run_in_executor(
+        None,  # Use the default thread pool executor
+        _execute_statements_sync,
+        conn_str,
+        statements
+    )
+    # The statements are DDL (e.g. CREATE VIEW), so any cached schema for this DSN is stale.
+    schema_cache.invalidate(conn_str)
+    # Cached query results over the touched tables and the views reading them (or the whole DSN, if unknown) are stale too.
+    result_cache.invalidate_for_statements(conn_str, statements, dependent_views)
+
+def _get_key_columns_sync(conn_str: str, table_names: List[str], schema_by_table: Dict[str, Optional[str]]) -> Dict[str, List[str]]:
+    """
+    Primary- and foreign-key columns per table, which masking must never touch.
+    Each table is looked up in its schema from `schema_by_table`, or in the
+    connection's current schema when that is unknown.
+    """
+    try:
+        engine = get_engine(conn_str)
+        if pg_catalog.is_postgres(engine):
+            with engine.connect() as connection:
+                keys = pg_catalog.fetch_key_columns(connection)
+                current_schema = pg_catalog.fetch_current_schema(connection)
+            return {name: keys.get((schema_by_table.get(name) or current_schema, name), []) for name in table_names}
+        inspector = inspect(engine)
+        keys = {}
+        for table_name in table_names:
+            schema = schema_by_table.get(table_name)
+            columns = set(inspector.get_pk_constraint(table_name, schema=schema).get('constrained_columns') or [])
+            for fk in inspector.get_foreign_keys(table_name, schema=schema):
+                columns.update(fk['constrained_columns'])
+            keys[table_name] = sorted(columns)
+        return keys
+    except Exception as e:
+        logger.error(f"Failed to read key columns: {e}", exc_info=True)
+        raise DatabaseServiceError(f"Failed to read primary/foreign keys from database: {e}", 500)
+
+async def get_key_columns(
+    conn_str: str, table_names: List[str], schema_by_table: Optional[Dict[str, Optional[str]]] = None
+) -> Dict[str, List[str]]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _get_key_columns_sync, conn_str, table_names, schema_by_table or {})
+
+def _list_governed_views_sync(conn_str: str) -> List[str]:
+    """Synchronously inspects the database for views ending in '_governed_view'."""
+    try:
+        engine = get_engine(conn_str)
+        if pg_catalog.is_postgres(engine):
+            with engine.connect() as connection:
+                all_views = pg_catalog.fetch_view_names(connection)
+        else:
+            all_views = inspect(engine).get_view_names()
+        # Filter the list to find only the views created by our governance process
+        governed_views = [v for v in all_views if v.endswith('_governed_view')]
+        return governed_views
+    except Exception as e:
+        logger.error(f"Failed to list governed views: {e}", exc_info=True)
+        raise DatabaseServiceError(f"Failed to list views from database: {e}", 500)
+
+async def list_governed_views(conn_str: str) -> List[str]:
+    """Asynchronously lists governed views by running the sync inspector in a thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _list_governed_views_sync, conn_str)
+
+
+# =============================================================================
+# NEW: Functions for Fetching Data from a View
+# =============================================================================
+
+def _fetch_view_rows_sync(conn_str: str, view_name: str, limit: int, offset: int, role: str) -> Tuple[List[str], List[tuple]]:
+    """
+    Synchronously fetches paginated data from a specific view,
+    assuming a database role for the duration of the transaction.
+    Returns the column names and the raw row tuples.
+    """
+    try:
+        engine = get_engine(conn_str)
+        with engine.connect() as connection:
+            # Step 1: Set the role for the current transaction.
+            # This is the crucial part that applies the masking rules.
+            # We use text() and parameter binding to safely handle the role name and prevent SQL injection.
+            set_role_stmt = text("SET ROLE :role")
+            connection.execute(set_role_stmt, {"role": role})
+
+            # Step 2: Execute the main SELECT query.
+            # This query will now run with the permissions of the role set above.
+            safe_view_name = f'"{view_name}"'
+            query = text(f'SELECT * FROM {safe_view_name} LIMIT :limit OFFSET :offset')
+            result = connection.execute(query, {"limit": limit, "offset": offset})
+            columns = list(result.keys())
+            rows = [tuple(row) for row in result.fetchall()]
+            
+            # Note: The role is automatically reset to the original user when the
+            # connection is closed and returned to the pool at the end of the `with` block.
+            return columns, rows
+            
+    except Exception as e:
+        logger.error(f"Failed to fetch data from view '{view_name}' as role '{role}': {e}", exc_info=True)
+        # Provide a more specific and helpful error message to the user.
+        raise DatabaseServiceError(f"Failed to fetch data from view '{view_name}'. Check if role '{role}' exists and has permissions on the view. Error: {e}", 400)
+
+async def fetch_view_rows(conn_str: str, view_name: str, limit: int, offset: int, role: str) -> Tuple[List[str], List[tuple]]:
+    """Fetches one page of view data (with SET ROLE) in a thread; returns (columns, row tuples)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, _fetch_view_rows_sync, conn_str, view_name, limit, offset, role
+    )
+
+class ViewExport:
+    """
+    A streaming export of one view, read through a server-side cursor on a
+    dedicated connection. Iterating yields encoded chunks (one per fetched batch);
+    memory use is bounded by `batch_size` regardless of view size.
+    The connection is released when iteration ends or `close()` is called.
+    `close()` may run on another thread (the response's background task) while
+    a batch is being fetched; the lock makes it wait for that fetch, and the
+    iterator stops at the next batch once the connection is gone.
+    """
+
+    def __init__(self, connection, result, fmt: str, batch_size: int):
+        self._connection = connection
+        self._result = result
+        self._fmt = fmt
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self.rows_sent = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            with self._lock:
+                if self._connection is None:
+                    return
+                columns = list(self._result.keys())
+                partitions = self._result.partitions(self._batch_size)
+            if self._fmt == "csv":
+                yield _encode_csv([columns])
+            while True:
+                with self._lock:
+                    if self._connection is None:
+                        return
+                    batch = next(partitions, None)
+                if batch is None:
+                    break
+                if self._fmt == "csv":
+                    yield _encode_csv(batch)
+                else:
+                    yield "".join(
+                        json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in batch
+                    ).encode("utf-8")
+                self.rows_sent += len(batch)
+        finally:
+            self.close()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                # Closing rolls back the transaction, which also undoes the SET ROLE.
+                self._connection.close()
+                self._connection = None
+                logger.info(f"View export finished after {self.rows_sent} row(s).")
+
+def _encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+def _open_view_export_sync(conn_str: str, view_name: str, role: str, fmt: str, batch_size: int) -> ViewExport:
+    """
+    Opens the export before any byte is streamed, so a bad role or view is
+    reported as a normal error response rather than a truncated stream.
+    """
+    engine = get_engine(conn_str)
+    connection = engine.connect()
+    try:
+        # Same role switch as the paged endpoint; scoped to this transaction.
+        connection.execute(text("SET ROLE :role"), {"role": role})
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(
+            text(f'SELECT * FROM {_quote_ident(view_name)}')
+        )
+        return ViewExport(connection, result, fmt, batch_size)
+    except Exception as e:
+        connection.close()
+        logger.error(f"Failed to export view '{view_name}' as role '{role}': {e}", exc_info=True)
+        raise DatabaseServiceError(f"Failed to export view '{view_name}'. Check if role '{role}' exists and has permissions on the view. Error: {e}", 400)
+
+async def open_view_export(conn_str: str, view_name: str, role: str, fmt: str, batch_size: int) -> ViewExport:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _open_view_export_sync, conn_str, view_name, role, fmt, batch_size)
+
+def _quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _sample_column_values_sync(conn_str: str, columns_by_table: Dict[str, List[str]], limit: int) -> Dict[str, Dict[str, List[str]]]:
+    """Up to `limit` non-null values per column, as text, for content-based classification."""
+    samples: Dict[str, Dict[str, List[str]]] = {}
+    engine = get_engine(conn_str)
+    with engine.connect() as connection:
+        for table_name, columns in columns_by_table.items():
+            if not columns:
+                continue
+            select_list = ", ".join(f"{_quote_ident(c)}::text" for c in columns)
+            try:
+                rows = connection.execute(
+                    text(f"SELECT {select_list} FROM {_quote_ident(table_name)} LIMIT :limit"), {"limit": limit}
+                ).fetchall()
+            except Exception as e:
+                # A table we cannot read just falls through to the LLM.
+                logger.warning(f"Could not sample values from '{table_name}': {e}")
+                connection.rollback()
+                continue
+            samples[table_name] = {
+                column: [row[i] for row in rows if row[i] is not None] for i, column in enumerate(columns)
+            }
+    return samples
+
+async def sample_column_values(conn_str: str, columns_by_table: Dict[str, List[str]], limit: int) -> Dict[str, Dict[str, List[str]]]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _sample_column_values_sync, conn_str, columns_by_table, limit)
+
+def _get_view_key_columns_sync(conn_str: str, view_name: str, key_column: Optional[str] = None) -> List[str]:
+    """
+    Returns the columns to page a governed view by: the primary key of its base
+    table, which the masking plan always leaves unmasked. An explicit
+    `key_column` is used alone only when it is unique on the base table;
+    otherwise the primary key is appended as a tiebreaker, so rows sharing the
+    last key of a page are not skipped.
+    """
+    base_table = view_name[: -len('_governed_view')] if view_name.endswith('_governed_view') else view_name
+    try:
+        engine = get_engine(conn_str)
+        if pg_catalog.is_postgres(engine):
+            with engine.connect() as connection:
+                primary_key = pg_catalog.fetch_primary_key(connection, base_table)
+                unique_columns = pg_catalog.fetch_unique_columns(connection, base_table) if key_column else []
+        else:
+            inspector = inspect(engine)
+            primary_key = inspector.get_pk_constraint(base_table).get('constrained_columns') or []
+            unique_columns = [
+                constraint['column_names'][0]
+                for constraint in (inspector.get_unique_constraints(base_table) if key_column else [])
+                if len(constraint['column_names']) == 1
+            ]
+    except Exception as e:
+        logger.error(f"Failed to look up the keys of '{base_table}': {e}", exc_info=True)
+        raise DatabaseServiceError(f"Failed to look up the keys of '{base_table}': {e}", 500)
+
+    if key_column:
+        if primary_key == [key_column] or key_column in unique_columns:
+            return [key_column]
+        if primary_key:
+            return [key_column] + [col for col in primary_key if col != key_column]
+        raise DatabaseServiceError(
+            f"Column '{key_column}' is not unique in '{base_table}', and the table has no primary key to break ties "
+            f"with. Page '{view_name}' by a primary-key or uniquely indexed column.", 400
+        )
+    if not primary_key:
+        raise DatabaseServiceError(
+            f"Table '{base_table}' has no primary key to page '{view_name}' by. Provide a uniquely indexed 'key_column'.", 400
+        )
+    return primary_key
+
+async def get_view_key_columns(conn_str: str, view_name: str, key_column: Optional[str] = None) -> List[str]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _get_view_key_columns_sync, conn_str, view_name, key_column)
+
+def _fetch_view_rows_keyset_sync(
+    conn_str: str, view_name: str, limit: int, role: str, key_columns: List[str], after: Optional[List[Any]]
+) -> Tuple[List[str], List[tuple], Optional[List[Any]]]:
+    """
+    Keyset (cursor) pagination: seeks past the last key of the previous page
+    instead of OFFSET-scanning, so every page costs the same regardless of depth.
+    Rows with a NULL in any key column cannot be positioned by a cursor and are
+    excluded. Returns the column names, the row tuples and the key of the last
+    row (None when there are no more pages).
+    """
+    try:
+        engine = get_engine(conn_str)
+        with engine.connect() as connection:
+            connection.execute(text("SET ROLE :role"), {"role": role})
+
+            key_sql = ", ".join(_quote_ident(col) for col in key_columns)
+            params: Dict[str, Any] = {"limit": limit}
+            conditions = [f"{_quote_ident(col)} IS NOT NULL" for col in key_columns]
+            if after is not None:
+                placeholders = ", ".join(f":after_{i}" for i in range(len(after)))
+                # Row-value comparison matches the ORDER BY below, also for composite keys.
+                conditions.append(f"({key_sql}) > ({placeholders})")
+                params.update({f"after_{i}": value for i, value in enumerate(after)})
+            where_sql = " AND ".join(conditions)
+            query = text(f'SELECT * FROM {_quote_ident(view_name)} WHERE {where_sql} ORDER BY {key_sql} LIMIT :limit')
+            result = connection.execute(query, params)
+            columns = list(result.keys())
+            rows = [tuple(row) for row in result.fetchall()]
+
+            key_positions = [columns.index(col) for col in key_columns]
+            last_key = [rows[-1][i] for i in key_positions] if len(rows) == limit else None
+            return columns, rows, last_key
+
+    except Exception as e:
+        logger.error(f"Failed to fetch data from view '{view_name}' as role '{role}': {e}", exc_info=True)
+        raise DatabaseServiceError(f"Failed to fetch data from view '{view_name}'. Check if role '{role}' exists and has permissions on the view. Error: {e}", 400)
+
+async def fetch_view_rows_keyset(
+    conn_str: str, view_name: str, limit: int, role: str, key_columns: List[str], after: Optional[List[Any]]
+) -> Tuple[List[str], List[tuple], Optional[List[Any]]]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, _fetch_view_rows_keyset_sync, conn_str, view_name, limit, role, key_columns, after
+    )
+
+async def _fetch_on_pool(conn_str: str, query: str, fetch: str, timeout_ms: Optional[int]):
+    """
+    Runs `query` on a pooled asyncpg connection using the given fetch method.
+    With `timeout_ms`, the query runs in a transaction with a LOCAL
+    statement_timeout so the server aborts it, not just the client.
+    """
+    pool = await get_async_pool(conn_str)
+    async with pool.acquire() as conn:
+        if not timeout_ms:
+            return await getattr(conn, fetch)(query)
+        async with conn.transaction(readonly=True):
+            await conn.execute(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+            return await getattr(conn, fetch)(query)
+
+async def execute_scalar_query(conn_str: str, query: str, timeout_ms: Optional[int] = None) -> int:
+    """
+    Executes a SQL query that is expected to return a single value (a scalar), like a count.
+
+    Args:
+        conn_str: The database connection string.
+        query: The SQL query to execute (e.g., "SELECT COUNT(*) FROM my_table").
+        timeout_ms: Optional server-side statement_timeout for this query.
+
+    Returns:
+        The integer result of the query.
+
+    Raises:
+        DatabaseServiceError: If any database-related error occurs (504 on timeout).
+    """
+    try:
+        # Borrow a connection from the shared asyncpg pool for this DSN.
+        result = await _fetch_on_pool(conn_str, query, "fetchval", timeout_ms)
+        
+        # Ensure we return an integer. If the query returns None, default to 0.
+        return int(result) if result is not None else 0
+
+    except asyncpg.QueryCanceledError as e:
+        raise DatabaseServiceError(message=f"Query exceeded statement_timeout of {timeout_ms} ms: {e}", status_code=504)
+    except (asyncpg.PostgresError, OSError) as e:
+        # Catch specific database or connection errors
+        raise DatabaseServiceError(message=f"Database query failed: {e}", status_code=500)
+
+async def execute_row_query(conn_str: str, query: str, timeout_ms: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Executes a SQL query that returns a single row (e.g. several aggregates
+    computed in one scan) and returns it as a column-name -> value dict.
+    """
+    try:
+        row = await _fetch_on_pool(conn_str, query, "fetchrow", timeout_ms)
+        return dict(row) if row is not None else {}
+
+    except asyncpg.QueryCanceledError as e:
+        raise DatabaseServiceError(message=f"Query exceeded statement_timeout of {timeout_ms} ms: {e}", status_code=504)
+    except (asyncpg.PostgresError, OSError) as e:
+        raise DatabaseServiceError(message=f"Database query failed: {e}", status_code=500)
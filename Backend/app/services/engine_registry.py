@@ -0,0 +1,229 @@
+# In file: app/services/engine_registry.py
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any
+
+import asyncpg
+from sqlalchemy import create_engine, Engine
+from sqlalchemy.engine import make_url
+
+from app.core.config import Settings # type: ignore
+from app.services.errors import DatabaseServiceError # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_dsn(conn_str: str) -> str:
+    """
+    Returns a canonical form of a connection string so that equivalent DSNs
+    (different query-param order, upper-case scheme, etc.) share one pool.
+    """
+    try:
+        url = make_url(str(conn_str).strip())
+    except Exception as e:
+        raise DatabaseServiceError(f"Invalid database connection string: {e}", status_code=400)
+    url = url.set(
+        drivername=url.drivername.lower(),
+        query=dict(sorted(url.query.items())),
+    )
+    return url.render_as_string(hide_password=False)
+
+
+def _to_asyncpg_dsn(conn_str: str) -> str:
+    """asyncpg only understands the plain 'postgresql://' scheme."""
+    url = make_url(conn_str)
+    return url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class EngineRegistry:
+    """
+    Process-wide registry of SQLAlchemy engines and asyncpg pools, keyed by
+    normalized DSN. Engines are LRU-capped and disposed after sitting idle.
+    """
+
+    def __init__(self):
+        self.pool_size = 5
+        self.max_overflow = 10
+        self.pool_timeout = 30
+        self.pool_recycle = 1800
+        self.async_min_size = 1
+        self.async_max_size = 10
+        self.idle_ttl = 900
+        self.max_dsns = 16
+
+        self._engines: "OrderedDict[str, Engine]" = OrderedDict()
+        self._engine_last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        self._async_pools: "OrderedDict[str, asyncpg.Pool]" = OrderedDict()
+        self._async_last_used: Dict[str, float] = {}
+        # Pools being created, per DSN. The dicts are only touched between awaits on
+        # the event loop, so they need no lock, and a slow connect only holds up
+        # callers of its own DSN.
+        self._async_creating: Dict[str, "asyncio.Future[asyncpg.Pool]"] = {}
+
+    def configure(self, settings: Settings):
+        self.pool_size = settings.DB_POOL_SIZE
+        self.max_overflow = settings.DB_MAX_OVERFLOW
+        self.pool_timeout = settings.DB_POOL_TIMEOUT_SECONDS
+        self.pool_recycle = settings.DB_POOL_RECYCLE_SECONDS
+        self.async_min_size = settings.DB_ASYNC_POOL_MIN_SIZE
+        self.async_max_size = settings.DB_ASYNC_POOL_MAX_SIZE
+        self.idle_ttl = settings.DB_ENGINE_IDLE_TTL_SECONDS
+        self.max_dsns = max(1, settings.DB_ENGINE_MAX_DSNS)
+
+    # --- Synchronous SQLAlchemy engines ---
+
+    def get_engine(self, conn_str: str) -> Engine:
+        key = normalize_dsn(conn_str)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle_engines_locked(now)
+            engine = self._engines.get(key)
+            if engine is None:
+                logger.info("Creating pooled database engine (pool_size=%s, max_overflow=%s).", self.pool_size, self.max_overflow)
+                try:
+                    engine = create_engine(
+                        key,
+                        pool_size=self.pool_size,
+                        max_overflow=self.max_overflow,
+                        pool_timeout=self.pool_timeout,
+                        pool_recycle=self.pool_recycle,
+                        pool_pre_ping=True,
+                    )
+                except Exception as e:
+                    raise DatabaseServiceError(f"Failed to create database engine: {e}", status_code=400)
+                self._engines[key] = engine
+                while len(self._engines) > self.max_dsns:
+                    old_key, old_engine = self._engines.popitem(last=False)
+                    self._engine_last_used.pop(old_key, None)
+                    logger.info("Disposing least-recently-used database engine.")
+                    old_engine.dispose()
+            self._engines.move_to_end(key)
+            self._engine_last_used[key] = now
+            return engine
+
+    def _evict_idle_engines_locked(self, now: float):
+        if self.idle_ttl <= 0:
+            return
+        for key in [k for k, ts in self._engine_last_used.items() if now - ts > self.idle_ttl]:
+            engine = self._engines.pop(key, None)
+            self._engine_last_used.pop(key, None)
+            if engine is not None:
+                logger.info("Disposing idle database engine.")
+                engine.dispose()
+
+    # --- asyncpg pools ---
+
+    async def get_async_pool(self, conn_str: str) -> asyncpg.Pool:
+        key = normalize_dsn(conn_str)
+        now = time.monotonic()
+        self._evict_idle_async_pools(now)
+        pool = self._async_pools.get(key)
+        if pool is None:
+            creating = self._async_creating.get(key)
+            if creating is None:
+                creating = asyncio.ensure_future(self._create_async_pool(key))
+                self._async_creating[key] = creating
+                creating.add_done_callback(lambda task: self._creation_done(key, task))
+            # Shielded: one waiter giving up must not abort the connect for the others.
+            pool = await asyncio.shield(creating)
+        if key in self._async_pools:
+            self._async_pools.move_to_end(key)
+            self._async_last_used[key] = now
+        return pool
+
+    async def _create_async_pool(self, key: str) -> asyncpg.Pool:
+        logger.info("Creating asyncpg pool (min_size=%s, max_size=%s).", self.async_min_size, self.async_max_size)
+        try:
+            pool = await asyncpg.create_pool(
+                dsn=_to_asyncpg_dsn(key),
+                min_size=self.async_min_size,
+                max_size=self.async_max_size,
+                max_inactive_connection_lifetime=self.idle_ttl or 300,
+            )
+        except (asyncpg.PostgresError, OSError) as e:
+            raise DatabaseServiceError(message=f"Failed to connect to database: {e}", status_code=500)
+        self._async_pools[key] = pool
+        self._async_last_used[key] = time.monotonic()
+        while len(self._async_pools) > self.max_dsns:
+            old_key, old_pool = self._async_pools.popitem(last=False)
+            self._async_last_used.pop(old_key, None)
+            asyncio.create_task(_close_async_pool(old_pool))
+        return pool
+
+    def _creation_done(self, key: str, task: "asyncio.Future[asyncpg.Pool]"):
+        if self._async_creating.get(key) is task:
+            del self._async_creating[key]
+        if not task.cancelled():
+            # Marks a failure as retrieved even if every waiter has gone; the next call retries.
+            task.exception()
+
+    def _evict_idle_async_pools(self, now: float):
+        if self.idle_ttl <= 0:
+            return
+        for key in [k for k, ts in self._async_last_used.items() if now - ts > self.idle_ttl]:
+            pool = self._async_pools.pop(key, None)
+            self._async_last_used.pop(key, None)
+            if pool is not None:
+                logger.info("Closing idle asyncpg pool.")
+                # Close in the background so the caller is not held up by in-flight queries.
+                asyncio.create_task(_close_async_pool(pool))
+
+    # --- Lifecycle and introspection ---
+
+    async def dispose_all(self):
+        with self._lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+            self._engine_last_used.clear()
+        for engine in engines:
+            engine.dispose()
+
+        for creating in list(self._async_creating.values()):
+            creating.cancel()
+        pools = list(self._async_pools.values())
+        self._async_pools.clear()
+        self._async_last_used.clear()
+        await asyncio.gather(*(_close_async_pool(p) for p in pools), return_exceptions=True)
+        logger.info(f"Disposed {len(engines)} engine(s) and {len(pools)} asyncpg pool(s).")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            engine_pools = [engine.pool.status() for engine in self._engines.values()]
+        return {
+            "engines": len(engine_pools),
+            "engine_pools": engine_pools,
+            "async_pools": len(self._async_pools),
+            "max_dsns": self.max_dsns,
+        }
+
+
+async def _close_async_pool(pool: asyncpg.Pool, timeout: float = 10.0):
+    try:
+        await asyncio.wait_for(pool.close(), timeout=timeout)
+    except Exception:
+        pool.terminate()
+
+
+registry = EngineRegistry()
+
+
+def initialize_engine_registry(settings: Settings):
+    """Applies pool settings to the process-wide engine registry."""
+    registry.configure(settings)
+
+
+def get_engine(conn_str: str) -> Engine:
+    return registry.get_engine(conn_str)
+
+
+async def get_async_pool(conn_str: str) -> asyncpg.Pool:
+    return await registry.get_async_pool(conn_str)
+
+
+async def dispose_all():
+    await registry.dispose_all()
@@ -1,15 +1,15 @@
-# In file: app/services/errors.py
-
-class DatabaseServiceError(Exception):
-    """Custom exception for database-related errors."""
-    def __init__(self, message: str, status_code: int = 500):
-        self.message = message
-        self.status_code = status_code
-        super().__init__(self.message)
-
-class LLMServiceError(Exception):
-    """Custom exception for LLM-related errors."""
-    def __init__(self, message: str, status_code: int = 502):
-        self.message = message
-        self.status_code = status_code
+# In file: app/services/errors.py
+
+class DatabaseServiceError(Exception):
+    """Custom exception for database-related errors."""
+    def __init__(self, message: str, status_code: int = 500):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(self.message)
+
+class LLMServiceError(Exception):
+    """Custom exception for LLM-related errors."""
+    def __init__(self, message: str, status_code: int = 502):
+        self.message = message
+        self.status_code = status_code
         super().__init__(self.message)
\ No newline at end of file
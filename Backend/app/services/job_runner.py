@@ -0,0 +1,289 @@
+# In file: app/services/job_runner.py
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+
+from app.core.config import Settings # type: ignore
+from app.services.errors import DatabaseServiceError, LLMServiceError # type: ignore
+from app.services.job_store import CANCELLED, FAILED, FINISHED_STATES, SUCCEEDED, JobStore, connection_ref, job_store # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class JobContext:
+    """What a job handler sees: its params, its checkpoints and a way to report progress."""
+
+    def __init__(self, job_id: str, kind: str, params: Dict[str, Any], store: JobStore, checkpoints: Dict[str, Any]):
+        self.job_id = job_id
+        self.kind = kind
+        self.params = params
+        self._store = store
+        self._checkpoints = checkpoints
+
+    def checkpoint_for(self, step: str) -> Optional[Any]:
+        """The data saved for `step` by an earlier attempt of this job, or None."""
+        return self._checkpoints.get(step)
+
+    async def checkpoint(self, step: str, data: Any):
+        """Persists the outcome of one completed step (e.g. a table) so a restart skips it."""
+        if isinstance(data, BaseModel):
+            data = data.model_dump(mode="json")
+        await asyncio.to_thread(self._store.save_checkpoint, self.job_id, step, data)
+        self._checkpoints[step] = data
+
+    async def progress(self, done: int, total: Optional[int]):
+        await asyncio.to_thread(self._store.set_progress, self.job_id, done, total)
+
+
+JobHandler = Callable[[JobContext, Settings], Awaitable[Any]]
+
+
+class JobRunner:
+    """
+    Bounded pool of asyncio workers draining a queue of persisted jobs. A job
+    runs its kind's registered handler; handlers checkpoint every completed
+    table so a job interrupted by a restart resumes where it stopped. Cancelling
+    a running job cancels its task.
+
+    A job's connection string is never written to the store: the runner that
+    accepted the job keeps it in memory until the job finishes. A job adopted
+    from a stopped process therefore fails, asking to be retried with the
+    connection string, unless it ran against the server's default database.
+    """
+
+    def __init__(self, store: JobStore):
+        self.store = store
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._connection_strings: Dict[str, str] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._settings: Optional[Settings] = None
+        self._stopping = False
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.resumed = 0
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    @property
+    def kinds(self):
+        return list(self._handlers)
+
+    async def start(self, settings: Settings):
+        self._settings = settings
+        self._stopping = False
+        self._queue = asyncio.Queue()
+        await asyncio.to_thread(self.store.configure, settings)
+        if settings.JOBS_RETENTION_SECONDS > 0:
+            pruned = await asyncio.to_thread(self.store.prune, settings.JOBS_RETENTION_SECONDS)
+            if pruned:
+                logger.info(f"Pruned {pruned} finished job(s) past retention.")
+        await asyncio.to_thread(self.store.heartbeat, self.owner)
+        await self._adopt_orphans()
+        worker_count = max(1, settings.JOBS_MAX_WORKERS)
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(worker_count)]
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        logger.info(f"Job runner started with {worker_count} worker(s); {self._queue.qsize()} job(s) queued.")
+
+    async def stop(self):
+        """
+        Stops the workers and releases the lease. Jobs still running stay 'running'
+        in the store; another process, or this one's next start, resumes them.
+        """
+        self._stopping = True
+        tasks = list(self._running.values()) + self._workers + ([self._heartbeat] if self._heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat = None
+        self._running.clear()
+        self._connection_strings.clear()
+        await asyncio.to_thread(self.store.release, self.owner)
+
+    async def _adopt_orphans(self):
+        for job_id in await asyncio.to_thread(self.store.recover_interrupted, self.owner, self._settings.JOBS_LEASE_SECONDS):
+            self._queue.put_nowait(job_id)
+            self.resumed += 1
+
+    async def _heartbeat_loop(self):
+        """Renews the lease, stops jobs cancelled through other processes and adopts jobs of dead ones."""
+        interval = max(1.0, self._settings.JOBS_LEASE_SECONDS / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                for job_id in await asyncio.to_thread(self.store.heartbeat, self.owner):
+                    task = self._running.get(job_id)
+                    if task is not None:
+                        task.cancel()
+                await self._adopt_orphans()
+            except Exception:
+                logger.error("Job runner heartbeat failed.", exc_info=True)
+
+    async def submit(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queues a job. A `connection_string` in `params` is held in memory only;
+        the store records its connection_ref in its place.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind '{kind}'.")
+        if self._queue is None:
+            raise RuntimeError("The job runner is not started.")
+        params = dict(params)
+        conn_str = params.pop("connection_string", None)
+        if conn_str:
+            params["connection_ref"] = connection_ref(conn_str)
+        job = await asyncio.to_thread(self.store.create, kind, params, self.owner)
+        if conn_str:
+            self._connection_strings[job["job_id"]] = conn_str
+        self._queue.put_nowait(job["job_id"])
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = await asyncio.to_thread(self.store.request_cancel, job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        if job is not None and job["status"] in FINISHED_STATES:
+            self._connection_strings.pop(job_id, None)
+        return job
+
+    async def retry(self, job_id: str, connection_string: Optional[str] = None) -> bool:
+        """
+        Re-queues a failed or cancelled job; completed steps are skipped thanks to
+        the checkpoints. A job that used a connection string needs it again, and
+        it must point at the same database (ValueError otherwise).
+        """
+        if self._queue is None:
+            return False
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            return False
+        expected = job["params"].get("connection_ref")
+        if expected and not connection_string:
+            raise ValueError("This job used a connection string, which is not stored; provide it again to retry.")
+        if expected and connection_ref(connection_string) != expected:
+            raise ValueError("The connection string does not point at the database this job was submitted for.")
+        if not await asyncio.to_thread(self.store.requeue, job_id, self.owner):
+            return False
+        if expected:
+            self._connection_strings[job_id] = connection_string
+        self._queue.put_nowait(job_id)
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.error(f"Job worker {index} failed to process job {job_id}.", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        try:
+            await self._run_claimed(job_id)
+        finally:
+            if not self._stopping:
+                self._connection_strings.pop(job_id, None)
+
+    async def _run_claimed(self, job_id: str):
+        if not await asyncio.to_thread(self.store.mark_running, job_id, self.owner):
+            return
+        job = await asyncio.to_thread(self.store.get, job_id)
+        handler = self._handlers.get(job["kind"])
+        if handler is None:
+            await asyncio.to_thread(
+                self.store.finish, job_id, FAILED, error=f"Unknown job kind '{job['kind']}'.", error_status=400
+            )
+            return
+        params = dict(job["params"])
+        if params.pop("connection_ref", None):
+            conn_str = self._connection_strings.get(job_id)
+            if conn_str is None:
+                self.failed += 1
+                await asyncio.to_thread(
+                    self.store.finish, job_id, FAILED, error_status=409,
+                    error="The job's connection string is not stored and was lost when its process stopped; "
+                          "retry the job with the connection string.",
+                )
+                return
+            params["connection_string"] = conn_str
+        checkpoints = await asyncio.to_thread(self.store.load_checkpoints, job_id)
+        if checkpoints:
+            logger.info(f"Job {job_id} ({job['kind']}) resuming with {len(checkpoints)} completed step(s).")
+        context = JobContext(job_id, job["kind"], params, self.store, checkpoints)
+
+        task = asyncio.create_task(handler(context, self._settings))
+        self._running[job_id] = task
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if self._stopping:
+                raise
+            logger.info(f"Job {job_id} cancelled.")
+            self.cancelled += 1
+            await asyncio.to_thread(self.store.finish, job_id, CANCELLED)
+            return
+        except Exception as e:
+            self.failed += 1
+            message, status_code = _describe_failure(e)
+            logger.error(f"Job {job_id} ({job['kind']}) failed: {message}", exc_info=status_code == 500)
+            await asyncio.to_thread(self.store.finish, job_id, FAILED, error=message, error_status=status_code)
+            return
+        finally:
+            self._running.pop(job_id, None)
+
+        if isinstance(result, BaseModel):
+            result = result.model_dump(mode="json")
+        self.completed += 1
+        await asyncio.to_thread(self.store.finish, job_id, SUCCEEDED, result=result)
+        logger.info(f"Job {job_id} ({job['kind']}) succeeded.")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "running": len(self._running),
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "resumed_after_restart": self.resumed,
+        }
+
+
+def _describe_failure(e: Exception):
+    """(message, HTTP status) for a failed job, mirroring how the synchronous endpoints report the same error."""
+    if isinstance(e, HTTPException):
+        return str(e.detail), e.status_code
+    if isinstance(e, (DatabaseServiceError, LLMServiceError)):
+        return str(e), getattr(e, "status_code", 500)
+    if isinstance(e, (ValidationError, json.JSONDecodeError)):
+        return f"The AI agent returned data in an invalid format: {e}", 502
+    return f"Unexpected error: {e}", 500
+
+
+job_runner = JobRunner(job_store)
+
+
+async def start_job_runner(settings: Settings):
+    await job_runner.start(settings)
+
+
+async def stop_job_runner():
+    await job_runner.stop()
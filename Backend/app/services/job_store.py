@@ -0,0 +1,289 @@
+# In file: app/services/job_store.py
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.config import Settings # type: ignore
+from app.services.engine_registry import normalize_dsn # type: ignore
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+_JOB_COLUMNS = (
+    "job_id, kind, status, params, progress_done, progress_total, result, error, error_status,"
+    " cancel_requested, attempts, owner, created_at, started_at, finished_at, updated_at"
+)
+
+# A job is adopted by another process only once its owner stopped heartbeating:
+# the owner is unknown (pre-lease rows) or has no fresh row in job_workers.
+_ORPHANED = "(owner IS NULL OR owner NOT IN (SELECT owner FROM job_workers WHERE heartbeat_at >= ?))"
+
+
+def connection_ref(conn_str: str) -> str:
+    """
+    What a job stores instead of its connection string: enough to check that a
+    retry targets the same database, nothing that could be used to connect.
+    """
+    return hashlib.sha256(normalize_dsn(conn_str).encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """
+    Persistent record of background jobs and their per-step checkpoints. Backed
+    by SQLite so queued and interrupted jobs survive a restart and resume from
+    the last completed step instead of starting over.
+
+    Every job belongs to the worker process that queued or claimed it. Processes
+    heartbeat in job_workers; a job only moves to another process once its owner's
+    heartbeat is older than the lease, so several processes can share the store.
+    """
+
+    def __init__(self, path: str = "jobs.sqlite3"):
+        self.path = path
+
+    def configure(self, settings: Settings):
+        self.path = settings.JOBS_STORE_PATH
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, params TEXT NOT NULL,"
+                " progress_done INTEGER NOT NULL DEFAULT 0, progress_total INTEGER,"
+                " result TEXT, error TEXT, error_status INTEGER,"
+                " cancel_requested INTEGER NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, owner TEXT,"
+                " created_at REAL NOT NULL, started_at REAL, finished_at REAL, updated_at REAL NOT NULL)"
+            )
+            if "owner" not in {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_checkpoints ("
+                " job_id TEXT NOT NULL, step TEXT NOT NULL, data TEXT NOT NULL, updated_at REAL NOT NULL,"
+                " PRIMARY KEY (job_id, step))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS job_workers (owner TEXT PRIMARY KEY, heartbeat_at REAL NOT NULL)")
+            self._scrub_connection_strings(conn)
+        logger.info(f"Job store at {self.path}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection that commits on success, rolls back on error and is always closed."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _scrub_connection_strings(conn: sqlite3.Connection):
+        """Replaces connection strings stored by earlier versions with their connection_ref."""
+        rows = conn.execute("SELECT job_id, params FROM jobs WHERE params LIKE '%\"connection_string\"%'").fetchall()
+        for row in rows:
+            params = json.loads(row["params"])
+            conn_str = params.pop("connection_string", None)
+            if conn_str:
+                params["connection_ref"] = connection_ref(conn_str)
+            conn.execute("UPDATE jobs SET params = ? WHERE job_id = ?", (json.dumps(params), row["job_id"]))
+        if rows:
+            logger.info(f"Removed stored connection strings from {len(rows)} job(s).")
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def create(self, kind: str, params: Dict[str, Any], owner: str) -> Dict[str, Any]:
+        """Queues a job owned by `owner`. `params` are stored as-is, so they must not hold credentials."""
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, kind, status, params, owner, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(params), owner, now, now),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        query = f"SELECT {_JOB_COLUMNS} FROM jobs"
+        args: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            args = (status,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._connect() as conn:
+            rows = conn.execute(query, (*args, limit)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def mark_running(self, job_id: str, owner: str) -> bool:
+        """Claims a queued job for `owner`. False if it was cancelled (or claimed) in the meantime."""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, started_at = COALESCE(started_at, ?), attempts = attempts + 1,"
+                " updated_at = ? WHERE job_id = ? AND status = ? AND cancel_requested = 0",
+                (RUNNING, owner, now, now, job_id, QUEUED),
+            )
+        return cursor.rowcount == 1
+
+    def set_progress(self, job_id: str, done: int, total: Optional[int]):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET progress_done = ?, progress_total = ?, updated_at = ? WHERE job_id = ?",
+                (done, total, time.time(), job_id),
+            )
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        result: Any = None,
+        error: Optional[str] = None,
+        error_status: Optional[int] = None,
+    ):
+        """Records the outcome. Checkpoints are dropped once a job succeeds; a failed job keeps them for a resubmit."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, error_status = ?, finished_at = ?, updated_at = ?"
+                " WHERE job_id = ?",
+                (status, json.dumps(result) if result is not None else None, error, error_status, now, now, job_id),
+            )
+            if status == SUCCEEDED:
+                conn.execute("DELETE FROM job_checkpoints WHERE job_id = ?", (job_id,))
+
+    def request_cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Flags the job for cancellation; a job still queued is cancelled on the spot."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE job_id = ? AND status IN (?, ?)",
+                (now, job_id, QUEUED, RUNNING),
+            )
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, updated_at = ? WHERE job_id = ? AND status = ?",
+                (CANCELLED, now, now, job_id, QUEUED),
+            )
+        return self.get(job_id)
+
+    def requeue(self, job_id: str, owner: str) -> bool:
+        """Puts a failed or cancelled job back in `owner`'s queue; it resumes from its checkpoints."""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, cancel_requested = 0, error = NULL, error_status = NULL,"
+                " finished_at = NULL, updated_at = ? WHERE job_id = ? AND status IN (?, ?)",
+                (QUEUED, owner, now, job_id, FAILED, CANCELLED),
+            )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, owner: str) -> List[str]:
+        """
+        Renews `owner`'s lease. Returns its running jobs that were asked to cancel
+        (possibly through another process), so the owner can stop them.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_workers (owner, heartbeat_at) VALUES (?, ?)", (owner, time.time())
+            )
+            rows = conn.execute(
+                "SELECT job_id FROM jobs WHERE owner = ? AND status = ? AND cancel_requested = 1", (owner, RUNNING)
+            ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def release(self, owner: str):
+        """Gives up `owner`'s lease at shutdown, so its unfinished jobs can be adopted right away."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM job_workers WHERE owner = ?", (owner,))
+
+    def recover_interrupted(self, owner: str, lease_seconds: float) -> List[str]:
+        """
+        Adopts the jobs of processes whose lease expired (crashed, or stopped):
+        their running jobs go back to the queue with their checkpoints kept, and
+        queued ones change hands. Jobs of live processes are left alone. Returns
+        the ids of the adopted queued jobs, oldest first.
+        """
+        now = time.time()
+        cutoff = now - lease_seconds
+        with self._connect() as conn:
+            candidates = conn.execute(
+                f"SELECT job_id, status, cancel_requested FROM jobs WHERE status IN (?, ?) AND {_ORPHANED}"
+                " ORDER BY created_at",
+                (QUEUED, RUNNING, cutoff),
+            ).fetchall()
+            adopted, resumed = [], 0
+            for row in candidates:
+                if row["status"] == RUNNING and row["cancel_requested"]:
+                    conn.execute(
+                        f"UPDATE jobs SET status = ?, finished_at = ?, updated_at = ? WHERE job_id = ? AND status = ? AND {_ORPHANED}",
+                        (CANCELLED, now, now, row["job_id"], RUNNING, cutoff),
+                    )
+                    continue
+                # Re-checked per row: another process may have adopted the job since the SELECT.
+                cursor = conn.execute(
+                    f"UPDATE jobs SET status = ?, owner = ?, updated_at = ? WHERE job_id = ? AND status = ? AND {_ORPHANED}",
+                    (QUEUED, owner, now, row["job_id"], row["status"], cutoff),
+                )
+                if cursor.rowcount == 1:
+                    adopted.append(row["job_id"])
+                    resumed += row["status"] == RUNNING
+            conn.execute("DELETE FROM job_workers WHERE heartbeat_at < ?", (cutoff,))
+        if resumed:
+            logger.info(f"Resuming {resumed} job(s) interrupted in a process that stopped.")
+        return adopted
+
+    def save_checkpoint(self, job_id: str, step: str, data: Any):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_checkpoints (job_id, step, data, updated_at) VALUES (?, ?, ?, ?)",
+                (job_id, step, json.dumps(data), time.time()),
+            )
+
+    def load_checkpoints(self, job_id: str) -> Dict[str, Any]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT step, data FROM job_checkpoints WHERE job_id = ?", (job_id,)).fetchall()
+        return {row["step"]: json.loads(row["data"]) for row in rows}
+
+    def prune(self, older_than_seconds: float) -> int:
+        """Deletes finished jobs (and their checkpoints) older than the retention window."""
+        cutoff = time.time() - older_than_seconds
+        placeholders = ", ".join("?" for _ in FINISHED_STATES)
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM job_checkpoints WHERE job_id IN"
+                f" (SELECT job_id FROM jobs WHERE status IN ({placeholders}) AND finished_at < ?)",
+                (*FINISHED_STATES, cutoff),
+            )
+            cursor = conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({placeholders}) AND finished_at < ?",
+                (*FINISHED_STATES, cutoff),
+            )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+
+job_store = JobStore()
@@ -1,50 +1,453 @@
-# In file: app/services/llm_service.py
-import logging
-from typing import Dict, Any, Optional
-from groq import Groq, APIConnectionError, RateLimitError, APIStatusError # type: ignore
-from app.core.config import Settings # type: ignore
-from app.services.errors import LLMServiceError # type: ignore
-
-logger = logging.getLogger(__name__)
-groq_client: Optional[Groq] = None
-model_name: str = "gemma2-9b-it"
-
-def initialize_groq_client(settings: Settings):
-    """Initializes the Groq client singleton from server settings."""
-    global groq_client, model_name
-    if not settings.GROQ_API_KEY:
-        logger.error("GROQ_API_KEY is not set. LLM calls will fail.")
-    else:
-        groq_client = Groq(api_key=settings.GROQ_API_KEY)
-        model_name = settings.MODEL
-        logger.info(f"Groq client initialized successfully for model: {model_name}")
-
-
-class LLMService:
-    async def call_llm(self, system_prompt: str, user_prompt: str, response_format: Optional[Dict[str, Any]] = None) -> str:
-        """Calls the Groq API with the provided prompts."""
-        if groq_client is None:
-            raise LLMServiceError("Groq client not initialized.", 503)
-        
-        try:
-            # ### FIX: Correctly uses the response_format dict passed from the router.
-            response = groq_client.chat.completions.create(
-                model=model_name,
-                messages=[
-                   {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format=response_format,
-                temperature=0.0,
-            )
-            content = response.choices[0].message.content
-            return content.strip() if content else ""
-        except APIConnectionError as e:
-            raise LLMServiceError(f"Groq API connection failed: {str(e)}", 503)
-        except RateLimitError as e:
-            raise LLMServiceError("Groq API rate limit exceeded", 429)
-        except APIStatusError as e:
-            raise LLMServiceError(f"Groq API error: {e.status_code} - {e.response.text}", e.status_code)
-    
-def get_llm_service():
-    return LLMService()
\ No newline at end of file
+# In file: app/services/llm_service.py
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Dict, Any, Iterator, List, Optional, Tuple
+import httpx
+from groq import AsyncGroq, DefaultAsyncHttpxClient, APIConnectionError, APITimeoutError, RateLimitError, APIStatusError # type: ignore
+from app.core.config import Settings # type: ignore
+from app.logic import prompt_encoding # type: ignore
+from app.services import rate_limiter # type: ignore
+from app.services.errors import LLMServiceError # type: ignore
+from app.services.rate_limiter import rate_limiter as limiter # type: ignore
+from app.services.singleflight import llm_flight # type: ignore
+
+logger = logging.getLogger(__name__)
+groq_client: Optional[AsyncGroq] = None
+model_name: str = "gemma2-9b-it"
+request_timeout: float = 60.0
+_llm_semaphore: asyncio.Semaphore = asyncio.Semaphore(8)
+
+
+class LLMResponseCache:
+    """
+    On-disk cache of LLM responses keyed by (model, system prompt, user prompt,
+    response format). Every call runs at temperature 0, so an identical request
+    yields an identical answer. Backed by SQLite so entries survive restarts and
+    are shared by all workers on the host; bounded by TTL and an LRU entry cap.
+    """
+
+    def __init__(self, path: str = "llm_cache.sqlite3", ttl_seconds: int = 7 * 24 * 3600,
+                 max_entries: int = 5000, enabled: bool = False, bypass_endpoints: Optional[List[str]] = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.bypass_endpoints = set(bypass_endpoints or [])
+        self.metrics: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0, "bypassed": 0})
+
+    def configure(self, settings: Settings):
+        self.path = settings.LLM_CACHE_PATH
+        self.ttl_seconds = settings.LLM_CACHE_TTL_SECONDS
+        self.max_entries = max(1, settings.LLM_CACHE_MAX_ENTRIES)
+        self.bypass_endpoints = set(settings.LLM_CACHE_BYPASS_ENDPOINTS)
+        self.enabled = settings.LLM_CACHE_ENABLED
+        if self.enabled:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    " key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL,"
+                    " created_at REAL NOT NULL, last_accessed REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_accessed ON llm_cache (last_accessed)")
+            logger.info(f"LLM response cache enabled at {self.path}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection that commits on success, rolls back on error and is always closed."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_prompt: str, response_format: Optional[Dict[str, Any]]) -> str:
+        payload = json.dumps([model, system_prompt, user_prompt, response_format], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def is_active_for(self, endpoint: str) -> bool:
+        return self.enabled and endpoint not in self.bypass_endpoints
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_cache SET last_accessed = ? WHERE key = ?", (now, key))
+            return response
+
+    def put(self, key: str, model: str, response: str):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, last_accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now),
+            )
+            # Size-bounded LRU: keep only the most recently used entries.
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key NOT IN"
+                " (SELECT key FROM llm_cache ORDER BY last_accessed DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, key: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+    def record(self, endpoint: str, outcome: str):
+        self.metrics[endpoint][outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        entries = 0
+        if self.enabled:
+            with self._connect() as conn:
+                entries = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "bypass_endpoints": sorted(self.bypass_endpoints),
+            "by_endpoint": {name: dict(counts) for name, counts in self.metrics.items()},
+        }
+
+
+response_cache = LLMResponseCache()
+
+
+class PromptTokenMetrics:
+    """Per-endpoint counters of estimated prompt tokens sent to (or answered from cache for) the LLM."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_endpoint: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"calls": 0, "system_tokens": 0, "user_tokens": 0, "max_prompt_tokens": 0}
+        )
+
+    def record(self, endpoint: str, breakdown: Dict[str, int]):
+        with self._lock:
+            counts = self._by_endpoint[endpoint]
+            counts["calls"] += 1
+            counts["system_tokens"] += breakdown["system"]
+            counts["user_tokens"] += breakdown["user"]
+            counts["max_prompt_tokens"] = max(counts["max_prompt_tokens"], breakdown["total"])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                name: {
+                    **counts,
+                    "avg_prompt_tokens": round((counts["system_tokens"] + counts["user_tokens"]) / counts["calls"], 1),
+                }
+                for name, counts in self._by_endpoint.items()
+            }
+
+
+prompt_token_metrics = PromptTokenMetrics()
+
+def initialize_groq_client(settings: Settings):
+    """Initializes the async Groq client singleton, its HTTP pool and concurrency cap."""
+    global groq_client, model_name, request_timeout, _llm_semaphore
+    if not settings.GROQ_API_KEY:
+        logger.error("GROQ_API_KEY is not set. LLM calls will fail.")
+    else:
+        request_timeout = settings.LLM_REQUEST_TIMEOUT_SECONDS
+        # One keep-alive connection pool shared by every request in this process.
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+            ),
+        )
+        # Retries are scheduled by the rate limiter, not inside the SDK.
+        groq_client = AsyncGroq(api_key=settings.GROQ_API_KEY, http_client=http_client, timeout=request_timeout, max_retries=0)
+        model_name = settings.MODEL
+        _llm_semaphore = asyncio.Semaphore(max(1, settings.LLM_MAX_CONCURRENCY))
+        logger.info(f"Groq client initialized successfully for model: {model_name}")
+    rate_limiter.initialize_rate_limiter(settings)
+    try:
+        response_cache.configure(settings)
+    except sqlite3.Error as e:
+        response_cache.enabled = False
+        logger.error(f"LLM response cache disabled, could not open {settings.LLM_CACHE_PATH}: {e}")
+
+async def close_groq_client():
+    """Closes the shared HTTP connection pool on shutdown."""
+    global groq_client
+    if groq_client is not None:
+        await groq_client.close()
+        groq_client = None
+
+
+class LLMService:
+    async def call_llm(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        response_format: Optional[Dict[str, Any]] = None,
+        endpoint: str = "default",
+        use_cache: bool = True,
+        validate: Optional[Callable[[str], Any]] = None,
+    ) -> str:
+        """
+        Calls the Groq API with the provided prompts without blocking the event loop.
+        Identical requests are answered from the persistent response cache unless
+        `use_cache` is False or the endpoint is configured to bypass it; identical
+        requests that arrive while one is in flight share its result.
+
+        Only answers that pass `validate` (which raises on bad output) are cached;
+        without one, JSON-mode answers must at least parse as JSON. A validation
+        error is raised to the caller, and a cached answer that no longer validates
+        is evicted and requested again.
+        """
+        breakdown = self._record_prompt(endpoint, system_prompt, user_prompt)
+        flight_key = (LLMResponseCache.make_key(model_name, system_prompt, user_prompt, response_format), use_cache)
+        return await llm_flight.do(
+            flight_key,
+            lambda: self._cached_completion(
+                system_prompt, user_prompt, response_format, endpoint, use_cache, breakdown["total"], validate
+            ),
+        )
+
+    async def stream_llm(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        response_format: Optional[Dict[str, Any]] = None,
+        endpoint: str = "default",
+        use_cache: bool = True,
+    ) -> AsyncIterator[str]:
+        """
+        Like call_llm, but yields the response text as the model produces it.
+        A cached response is yielded as one piece. `response_format` only keys the
+        cache: the request itself is sent without it, as JSON mode cannot stream,
+        and a streamed answer is cached only when it is valid JSON.
+        """
+        breakdown = self._record_prompt(endpoint, system_prompt, user_prompt)
+        cache_key = None
+        if use_cache and response_cache.is_active_for(endpoint):
+            cache_key = LLMResponseCache.make_key(model_name, system_prompt, user_prompt, response_format)
+            cached = await asyncio.to_thread(response_cache.get, cache_key)
+            if cached is not None:
+                response_cache.record(endpoint, "hits")
+                yield cached
+                return
+            response_cache.record(endpoint, "misses")
+        else:
+            response_cache.record(endpoint, "bypassed")
+
+        parts = []
+        async for delta in self._stream_completion(system_prompt, user_prompt, endpoint, breakdown["total"]):
+            parts.append(delta)
+            yield delta
+        content = "".join(parts).strip()
+        if cache_key is not None and content and _passes(content, response_format, None):
+            await asyncio.to_thread(response_cache.put, cache_key, model_name, content)
+
+    def _record_prompt(self, endpoint: str, system_prompt: str, user_prompt: str) -> Dict[str, int]:
+        breakdown = prompt_encoding.prompt_token_breakdown(system_prompt, user_prompt)
+        prompt_token_metrics.record(endpoint, breakdown)
+        logger.info(
+            f"LLM prompt for {endpoint}: ~{breakdown['total']} tokens "
+            f"(system {breakdown['system']}, user {breakdown['user']})."
+        )
+        return breakdown
+
+    async def _cached_completion(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        response_format: Optional[Dict[str, Any]],
+        endpoint: str,
+        use_cache: bool,
+        prompt_tokens: int,
+        validate: Optional[Callable[[str], Any]] = None,
+    ) -> str:
+        cache_key = None
+        if use_cache and response_cache.is_active_for(endpoint):
+            cache_key = LLMResponseCache.make_key(model_name, system_prompt, user_prompt, response_format)
+            cached = await asyncio.to_thread(response_cache.get, cache_key)
+            if cached is not None and _passes(cached, response_format, validate):
+                response_cache.record(endpoint, "hits")
+                return cached
+            if cached is not None:
+                logger.warning(f"Evicting a cached {endpoint} response that no longer validates.")
+                await asyncio.to_thread(response_cache.delete, cache_key)
+            response_cache.record(endpoint, "misses")
+        else:
+            response_cache.record(endpoint, "bypassed")
+
+        content = await self._request_completion(
+            system_prompt, user_prompt, response_format, endpoint=endpoint, prompt_tokens=prompt_tokens
+        )
+        if validate is not None:
+            validate(content)
+        if cache_key is not None and content and (validate is not None or _passes(content, response_format, None)):
+            await asyncio.to_thread(response_cache.put, cache_key, model_name, content)
+        return content
+
+    async def _request_completion(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        response_format: Optional[Dict[str, Any]],
+        endpoint: str = "default",
+        prompt_tokens: int = 0,
+    ) -> str:
+        """
+        One completion, admitted by the process-wide rate limiter in the endpoint's
+        priority class. Rate-limit responses, connection failures and 5xx errors are
+        retried with jittered exponential backoff (or the server's retry-after)
+        instead of failing the user's request outright. A failed attempt gives its
+        token reservation back, so retries do not drain the bucket for everyone else.
+        """
+        if groq_client is None:
+            raise LLMServiceError("Groq client not initialized.", 503)
+
+        priority = rate_limiter.priority_for(endpoint)
+        attempt = 0
+        while True:
+            reserved = await limiter.acquire(prompt_tokens, priority)
+            settled = False
+            try:
+                async with _llm_semaphore:
+                    # ### FIX: Correctly uses the response_format dict passed from the router.
+                    # The raw response exposes the x-ratelimit-* headers that keep the limiter honest.
+                    raw_response = await groq_client.chat.completions.with_raw_response.create(
+                        model=model_name,
+                        messages=[
+                           {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        response_format=response_format,
+                        temperature=0.0,
+                        timeout=request_timeout,
+                    )
+                limiter.update_from_headers(raw_response.headers)
+                response = await raw_response.parse()
+                usage = getattr(response, "usage", None)
+                limiter.settle(reserved, getattr(usage, "total_tokens", None))
+                settled = True
+                content = response.choices[0].message.content
+                return content.strip() if content else ""
+            except (APIConnectionError, APIStatusError) as e:
+                delay, reason = _retry_delay_or_raise(e, attempt)
+            finally:
+                if not settled:
+                    limiter.refund(reserved)
+            limiter.record_retry()
+            attempt += 1
+            logger.warning(f"Groq call for {endpoint} {reason}; retry {attempt}/{limiter.max_retries} in {delay:.1f}s.")
+            await asyncio.sleep(delay)
+
+    async def _stream_completion(
+        self, system_prompt: str, user_prompt: str, endpoint: str, prompt_tokens: int
+    ) -> AsyncIterator[str]:
+        """
+        Streamed completion under the same admission and retry policy; retries stop
+        once text has been yielded. The reservation is settled from the usage the
+        final chunk reports (or, failing that, an estimate of the streamed text) and
+        refunded when an attempt fails before any text arrived.
+        """
+        if groq_client is None:
+            raise LLMServiceError("Groq client not initialized.", 503)
+
+        priority = rate_limiter.priority_for(endpoint)
+        attempt = 0
+        while True:
+            reserved = await limiter.acquire(prompt_tokens, priority)
+            started = False
+            used_tokens: Optional[int] = None
+            streamed: List[str] = []
+            try:
+                async with _llm_semaphore:
+                    raw_response = await groq_client.chat.completions.with_raw_response.create(
+                        model=model_name,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        temperature=0.0,
+                        stream=True,
+                        timeout=request_timeout,
+                    )
+                    limiter.update_from_headers(raw_response.headers)
+                    stream = await raw_response.parse()
+                    try:
+                        async for chunk in stream:
+                            usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+                            if usage is not None:
+                                used_tokens = getattr(usage, "total_tokens", None)
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if delta:
+                                started = True
+                                streamed.append(delta)
+                                yield delta
+                    finally:
+                        await stream.close()
+                return
+            except (APIConnectionError, APIStatusError) as e:
+                if started:
+                    raise LLMServiceError(f"Groq API stream interrupted: {str(e)}", 502)
+                delay, reason = _retry_delay_or_raise(e, attempt)
+            finally:
+                if started or used_tokens is not None:
+                    if used_tokens is None:
+                        used_tokens = prompt_tokens + prompt_encoding.estimate_tokens("".join(streamed))
+                    limiter.settle(reserved, used_tokens)
+                else:
+                    limiter.refund(reserved)
+            limiter.record_retry()
+            attempt += 1
+            logger.warning(f"Groq stream for {endpoint} {reason}; retry {attempt}/{limiter.max_retries} in {delay:.1f}s.")
+            await asyncio.sleep(delay)
+
+
+def _retry_delay_or_raise(e: Exception, attempt: int) -> Tuple[float, str]:
+    """Maps a Groq SDK error to (delay before the next attempt, reason), or raises the final LLMServiceError."""
+    if isinstance(e, APITimeoutError):
+        raise LLMServiceError(f"Groq API request timed out after {request_timeout}s", 504)
+    if isinstance(e, RateLimitError):
+        limiter.update_from_headers(e.response.headers)
+        if attempt >= limiter.max_retries:
+            raise LLMServiceError("Groq API rate limit exceeded", 429)
+        delay = limiter.retry_delay(attempt, e.response.headers)
+        limiter.record_rate_limited(delay)
+        return delay, "rate limited"
+    if isinstance(e, APIConnectionError):
+        if attempt >= limiter.max_retries:
+            raise LLMServiceError(f"Groq API connection failed: {str(e)}", 503)
+        return limiter.retry_delay(attempt), "connection failed"
+    if e.status_code < 500 or attempt >= limiter.max_retries:
+        raise LLMServiceError(f"Groq API error: {e.status_code} - {e.response.text}", e.status_code)
+    return limiter.retry_delay(attempt, e.response.headers), f"status {e.status_code}"
+
+
+def _passes(content: str, response_format: Optional[Dict[str, Any]], validate: Optional[Callable[[str], Any]]) -> bool:
+    """Whether a response is fit to cache or replay: it validates, or (JSON mode, no validator) it parses."""
+    try:
+        if validate is not None:
+            validate(content)
+        elif response_format is not None:
+            json.loads(content)
+        return True
+    except Exception:
+        return False
+
+
+def get_llm_service():
+    return LLMService()
@@ -0,0 +1,236 @@
+# In file: app/services/pg_catalog.py
+"""
+Set-based schema introspection for PostgreSQL.
+
+SQLAlchemy's Inspector issues several catalog queries per table, which is
+painfully slow on databases with thousands of tables. The helpers below read
+the same information with one query each, straight from pg_catalog.
+"""
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, Tuple
+
+from sqlalchemy import text, Connection
+
+_USER_SCHEMA_FILTER = "n.nspname NOT LIKE 'pg\\_%' AND n.nspname <> 'information_schema'"
+
+COLUMNS_SQL = text(f"""
+    SELECT n.nspname AS schema_name,
+           c.relname AS table_name,
+           a.attname AS column_name,
+           format_type(a.atttypid, a.atttypmod) AS data_type
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid
+    WHERE c.relkind IN ('r', 'p')
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+      AND {_USER_SCHEMA_FILTER}
+    ORDER BY n.nspname, c.relname, a.attnum
+""")
+
+FOREIGN_KEYS_SQL = text(f"""
+    SELECT con.conname AS name,
+           n.nspname AS referencing_schema,
+           src.relname AS referencing_table,
+           tn.nspname AS referenced_schema,
+           tgt.relname AS referenced_table,
+           array_agg(sa.attname ORDER BY k.ord) AS referencing_columns,
+           array_agg(ta.attname ORDER BY k.ord) AS referenced_columns
+    FROM pg_catalog.pg_constraint con
+    JOIN pg_catalog.pg_class src ON src.oid = con.conrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = src.relnamespace
+    JOIN pg_catalog.pg_class tgt ON tgt.oid = con.confrelid
+    JOIN pg_catalog.pg_namespace tn ON tn.oid = tgt.relnamespace
+    CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(src_attnum, tgt_attnum, ord)
+    JOIN pg_catalog.pg_attribute sa ON sa.attrelid = con.conrelid AND sa.attnum = k.src_attnum
+    JOIN pg_catalog.pg_attribute ta ON ta.attrelid = con.confrelid AND ta.attnum = k.tgt_attnum
+    WHERE con.contype = 'f'
+      AND {_USER_SCHEMA_FILTER}
+    GROUP BY n.nspname, con.oid, con.conname, src.relname, tn.nspname, tgt.relname
+    ORDER BY n.nspname, src.relname, con.conname
+""")
+
+VIEWS_SQL = text("""
+    SELECT c.relname AS view_name
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind = 'v'
+      AND n.nspname = current_schema()
+    ORDER BY c.relname
+""")
+
+# Cheap catalog digest: relation oids/names/kinds, a per-relation signature of
+# column names and types, and the set of PK/FK constraints. Any DDL that would
+# change the extracted schema changes this value.
+FINGERPRINT_SQL = text(f"""
+    WITH rels AS (
+        SELECT c.oid, c.relname, c.relkind, n.nspname
+        FROM pg_catalog.pg_class c
+        JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p', 'v')
+          AND {_USER_SCHEMA_FILTER}
+    ), cols AS (
+        SELECT a.attrelid,
+               md5(string_agg(a.attname || ':' || a.atttypid::text || ':' || a.atttypmod::text, ',' ORDER BY a.attnum)) AS sig
+        FROM pg_catalog.pg_attribute a
+        JOIN rels r ON r.oid = a.attrelid
+        WHERE a.attnum > 0 AND NOT a.attisdropped
+        GROUP BY a.attrelid
+    ), cons AS (
+        SELECT md5(coalesce(string_agg(con.oid::text, ',' ORDER BY con.oid), '')) AS sig
+        FROM pg_catalog.pg_constraint con
+        JOIN rels r ON r.oid = con.conrelid
+        WHERE con.contype IN ('p', 'f')
+    )
+    SELECT md5(
+        coalesce(string_agg(r.oid::text || ':' || r.nspname || '.' || r.relname || ':' || r.relkind::text || ':' || coalesce(cols.sig, ''), ',' ORDER BY r.oid), '')
+        || (SELECT sig FROM cons)
+    ) AS fingerprint
+    FROM rels r
+    LEFT JOIN cols ON cols.attrelid = r.oid
+""")
+
+
+def is_postgres(connection_or_engine) -> bool:
+    return connection_or_engine.dialect.name == "postgresql"
+
+
+def fetch_fingerprint(connection: Connection) -> str:
+    """Returns a digest of the user schema that changes whenever its DDL does."""
+    return connection.execute(FINGERPRINT_SQL).scalar_one()
+
+
+def fetch_table_columns(connection: Connection) -> "OrderedDict[Tuple[str, str], List[Dict[str, str]]]":
+    """Returns {(schema, table): [{'column_name', 'data_type'}, ...]} in attnum order."""
+    tables: "OrderedDict[Tuple[str, str], List[Dict[str, str]]]" = OrderedDict()
+    for row in connection.execute(COLUMNS_SQL):
+        tables.setdefault((row.schema_name, row.table_name), []).append(
+            {"column_name": row.column_name, "data_type": row.data_type}
+        )
+    return tables
+
+
+def fetch_foreign_keys(connection: Connection) -> List[Dict[str, Any]]:
+    return [
+        {
+            "name": row.name,
+            "referencing_schema": row.referencing_schema,
+            "referencing_table": row.referencing_table,
+            "referencing_columns": list(row.referencing_columns),
+            "referenced_schema": row.referenced_schema,
+            "referenced_table": row.referenced_table,
+            "referenced_columns": list(row.referenced_columns),
+        }
+        for row in connection.execute(FOREIGN_KEYS_SQL)
+    ]
+
+
+def fetch_view_names(connection: Connection) -> List[str]:
+    """View names in the current (default) schema, like Inspector.get_view_names()."""
+    return [row.view_name for row in connection.execute(VIEWS_SQL)]
+
+
+def extract_schema(connection: Connection) -> Dict[str, Any]:
+    """Builds the ExtractedSchema-shaped dict from three set-based catalog queries."""
+    all_tables_info = {}
+    for (schema_name, table_name), columns in fetch_table_columns(connection).items():
+        all_tables_info[table_name] = {"columns": columns, "schema_name": schema_name}
+    return {"tables": all_tables_info, "foreign_keys": fetch_foreign_keys(connection)}
+
+
+PRIMARY_KEY_SQL = text("""
+    SELECT a.attname AS column_name
+    FROM pg_catalog.pg_index i
+    JOIN pg_catalog.pg_class c ON c.oid = i.indrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    CROSS JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord)
+    JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid AND a.attnum = k.attnum
+    WHERE i.indisprimary
+      AND c.relname = :table_name
+      AND n.nspname = current_schema()
+    ORDER BY k.ord
+""")
+
+
+def fetch_primary_key(connection: Connection, table_name: str) -> List[str]:
+    """Primary-key column names of a table in the current schema, in key order."""
+    return [row.column_name for row in connection.execute(PRIMARY_KEY_SQL, {"table_name": table_name})]
+
+
+UNIQUE_COLUMNS_SQL = text("""
+    SELECT a.attname AS column_name
+    FROM pg_catalog.pg_index i
+    JOIN pg_catalog.pg_class c ON c.oid = i.indrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid AND a.attnum = i.indkey[0]
+    WHERE i.indisunique
+      AND i.indnkeyatts = 1
+      AND i.indpred IS NULL
+      AND i.indexprs IS NULL
+      AND c.relname = :table_name
+      AND n.nspname = current_schema()
+""")
+
+
+def fetch_unique_columns(connection: Connection, table_name: str) -> List[str]:
+    """Columns of a table in the current schema that a single-column, non-partial unique index covers on its own."""
+    return [row.column_name for row in connection.execute(UNIQUE_COLUMNS_SQL, {"table_name": table_name})]
+
+
+KEY_COLUMNS_SQL = text(f"""
+    SELECT DISTINCT n.nspname AS schema_name, c.relname AS table_name, a.attname AS column_name
+    FROM pg_catalog.pg_constraint con
+    CROSS JOIN LATERAL (
+        SELECT con.conrelid AS relid, unnest(con.conkey) AS attnum
+        UNION ALL
+        SELECT con.confrelid, unnest(con.confkey) WHERE con.contype = 'f'
+    ) k
+    JOIN pg_catalog.pg_class c ON c.oid = k.relid
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_catalog.pg_attribute a ON a.attrelid = k.relid AND a.attnum = k.attnum
+    WHERE con.contype IN ('p', 'f')
+      AND {_USER_SCHEMA_FILTER}
+""")
+
+
+def fetch_key_columns(connection: Connection) -> Dict[Tuple[str, str], List[str]]:
+    """
+    {(schema, table): [columns]} across the user schemas: every column that is
+    part of a primary key or on either side of a foreign key.
+    """
+    keys: Dict[Tuple[str, str], List[str]] = {}
+    for row in connection.execute(KEY_COLUMNS_SQL):
+        keys.setdefault((row.schema_name, row.table_name), []).append(row.column_name)
+    return keys
+
+
+def fetch_current_schema(connection: Connection) -> str:
+    return connection.execute(text("SELECT current_schema()")).scalar_one()
+
+
+DEPENDENT_VIEWS_SQL = text("""
+    WITH RECURSIVE dependents AS (
+        SELECT v.oid, v.relname
+        FROM pg_catalog.pg_class t
+        JOIN pg_catalog.pg_depend d ON d.refobjid = t.oid AND d.refclassid = 'pg_catalog.pg_class'::regclass
+        JOIN pg_catalog.pg_rewrite r ON r.oid = d.objid AND d.classid = 'pg_catalog.pg_rewrite'::regclass
+        JOIN pg_catalog.pg_class v ON v.oid = r.ev_class
+        WHERE lower(t.relname) = ANY(:table_names) AND v.oid <> t.oid
+        UNION
+        SELECT v.oid, v.relname
+        FROM dependents p
+        JOIN pg_catalog.pg_depend d ON d.refobjid = p.oid AND d.refclassid = 'pg_catalog.pg_class'::regclass
+        JOIN pg_catalog.pg_rewrite r ON r.oid = d.objid AND d.classid = 'pg_catalog.pg_rewrite'::regclass
+        JOIN pg_catalog.pg_class v ON v.oid = r.ev_class
+        WHERE v.oid <> p.oid
+    )
+    SELECT DISTINCT relname AS view_name FROM dependents
+""")
+
+
+def fetch_dependent_views(connection: Connection, table_names: Iterable[str]) -> List[str]:
+    """Views (and materialized views) that read from any of the tables, directly or through other views."""
+    names = sorted({name.lower() for name in table_names})
+    if not names:
+        return []
+    return [row.view_name for row in connection.execute(DEPENDENT_VIEWS_SQL, {"table_names": names})]
@@ -0,0 +1,125 @@
+# In file: app/services/quality_engine.py
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.api import models # type: ignore
+from app.logic.quality_checks import plan_quality_checks, FusedScan, TOTAL_ROWS_CHECK_ID # type: ignore
+from app.services import db_service # type: ignore
+from app.services.errors import DatabaseServiceError # type: ignore
+from app.services.result_cache import result_cache # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Outcome per check key: (invalid count, duration in ms, error message if the check did not complete).
+_Outcome = Tuple[int, float, Optional[str]]
+
+
+async def run_quality_checks(
+    conn_str: str,
+    table_name: str,
+    checks: List[models.CheckToExecute],
+    concurrency: int = 4,
+    timeout_ms: Optional[int] = None,
+    use_result_cache: bool = False,
+) -> List[models.ValidationResult]:
+    """
+    Executes the selected checks with as few table scans as possible and returns
+    one ValidationResult per check, in request order.
+
+    Fused scans and stand-alone checks are dispatched concurrently over the shared
+    asyncpg pool, at most `concurrency` at a time. Each query carries a server-side
+    statement_timeout; a check that times out is reported with an error instead of
+    failing the whole run. With `use_result_cache`, identical queries from recent
+    runs are answered from the result cache.
+    """
+    # Checks are keyed by position because check_ids are not guaranteed unique.
+    keyed_sql = {str(index): check.check_sql for index, check in enumerate(checks)}
+    plan = plan_quality_checks(table_name, list(keyed_sql.items()))
+    keyed_sql[TOTAL_ROWS_CHECK_ID] = f'SELECT COUNT(*) FROM "{table_name}"'
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    outcomes: Dict[str, _Outcome] = {}
+
+    async def run_individual(key: str, sql: str):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                count = await _cached_query(conn_str, sql, "scalar", timeout_ms, use_result_cache)
+                outcomes[key] = (count, _elapsed_ms(started), None)
+            except DatabaseServiceError as e:
+                if e.status_code != 504:
+                    raise
+                outcomes[key] = (0, _elapsed_ms(started), e.message)
+
+    async def run_fused(scan: FusedScan):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                row = await _cached_query(conn_str, scan.to_sql(), "row", timeout_ms, use_result_cache)
+            except DatabaseServiceError as e:
+                row = None
+                failure = e
+            duration = _elapsed_ms(started)
+        if row is None:
+            if failure.status_code == 504:
+                for key, _ in scan.checks:
+                    outcomes[key] = (0, duration, failure.message)
+                return
+            # One bad predicate poisons the whole fused query; run these separately
+            # so the failure is attributed to the right check.
+            logger.warning(f"Fused scan failed, falling back to individual checks: {failure.message}")
+            await asyncio.gather(*(run_individual(key, keyed_sql[key]) for key, _ in scan.checks))
+            return
+        for index, (key, _) in enumerate(scan.checks):
+            value = row.get(scan.column_for(index))
+            outcomes[key] = (int(value) if value is not None else 0, duration, None)
+
+    tasks = [asyncio.ensure_future(run_fused(scan)) for scan in plan.fused_scans]
+    tasks += [asyncio.ensure_future(run_individual(key, sql)) for key, sql in plan.individual]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # On error or cancellation (e.g. client disconnect), stop the stragglers too.
+        for task in tasks:
+            task.cancel()
+
+    total_rows = outcomes[TOTAL_ROWS_CHECK_ID][0]
+    results = []
+    for index, check in enumerate(checks):
+        invalid_count, duration, error = outcomes[str(index)]
+        results.append(models.ValidationResult(
+            check_id=check.check_id,
+            rule_name=check.rule_name,
+            is_valid=(error is None and invalid_count == 0),
+            invalid_count=invalid_count,
+            total_rows=total_rows,
+            check_query=check.check_sql,
+            duration_ms=duration,
+            error=error,
+        ))
+    return results
+
+
+async def _cached_query(conn_str: str, sql: str, kind: str, timeout_ms: Optional[int], use_result_cache: bool):
+    """
+    Scalar or single-row read through the shared result cache. Keying and
+    storing parse the SQL (and storing pickles the value to size it), so both
+    run in a worker thread rather than on the event loop.
+    """
+    key = await asyncio.to_thread(result_cache.make_key, conn_str, None, sql)
+    if use_result_cache:
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached
+    if kind == "scalar":
+        value = await db_service.execute_scalar_query(conn_str, sql, timeout_ms=timeout_ms)
+    else:
+        value = await db_service.execute_row_query(conn_str, sql, timeout_ms=timeout_ms)
+    await asyncio.to_thread(result_cache.put, key, conn_str, sql, value)
+    return value
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
@@ -0,0 +1,269 @@
+# In file: app/services/rate_limiter.py
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import re
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+from app.core.config import Settings # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Lower value = served first.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+_PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_NORMAL: "normal", PRIORITY_BULK: "bulk"}
+
+# Endpoints a user is actively waiting on go first; batch-shaped work yields to them.
+ENDPOINT_PRIORITIES = {
+    "talk_to_db": PRIORITY_INTERACTIVE,
+    "classify_data": PRIORITY_BULK,
+    "explain_referential_integrity": PRIORITY_BULK,
+}
+
+_DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def priority_for(endpoint: str) -> int:
+    return ENDPOINT_PRIORITIES.get(endpoint, PRIORITY_NORMAL)
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from a rate-limit header value: '7.66s', '2m59.56s', '120ms' or a bare number."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART_RE.findall(value)
+    if not parts:
+        return None
+    scale = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(float(headers[name]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class _Bucket:
+    """Token bucket refilled continuously at `per_minute` / 60 per second. per_minute <= 0 means unlimited."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float):
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def wait_time(self, cost: float, now: float) -> float:
+        blocked = max(0.0, self.blocked_until - now)
+        if self.unlimited:
+            return blocked
+        self._refill(now)
+        # A single request larger than the whole bucket waits for a full bucket, not forever.
+        cost = min(cost, self.capacity)
+        return max(blocked, (cost - self.level) * 60.0 / self.capacity if cost > self.level else 0.0)
+
+    def consume(self, cost: float):
+        if not self.unlimited:
+            self.level -= min(cost, self.capacity)
+
+    def refund(self, amount: float):
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + amount)
+
+    def sync(self, limit: Optional[int], remaining: Optional[int], reset_seconds: Optional[float], now: float, adopt_limit: bool):
+        """Aligns the local estimate with what the provider reports."""
+        if adopt_limit and limit and limit > 0 and limit != self.capacity:
+            self.capacity = float(limit)
+        if self.unlimited or remaining is None:
+            return
+        self._refill(now)
+        self.level = min(self.level, float(remaining))
+        if remaining <= 0 and reset_seconds:
+            self.blocked_until = max(self.blocked_until, now + reset_seconds)
+
+
+class LLMRateLimiter:
+    """
+    Process-wide admission control for LLM calls. Two token buckets (requests
+    and tokens per minute) are seeded from settings and corrected from the
+    provider's x-ratelimit-* response headers; callers wait in a priority queue
+    so interactive calls are admitted before bulk batches, FIFO within a priority.
+    A 429 pauses admission for the advertised retry-after.
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0, enabled: bool = False):
+        self.enabled = enabled
+        self._requests = _Bucket(requests_per_minute)
+        self._tokens = _Bucket(tokens_per_minute)
+        self._queue: List[list] = []
+        self._sequence = itertools.count()
+        self._condition: Optional[asyncio.Condition] = None
+        self.max_retries = 4
+        self.backoff_base_seconds = 1.0
+        self.backoff_max_seconds = 30.0
+        self.completion_reserve_tokens = 512
+        self.admitted = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+
+    def configure(self, settings: Settings):
+        self.enabled = settings.LLM_RATE_LIMIT_ENABLED
+        self._requests = _Bucket(settings.LLM_RATE_LIMIT_RPM)
+        self._tokens = _Bucket(settings.LLM_RATE_LIMIT_TPM)
+        self.max_retries = max(0, settings.LLM_MAX_RETRIES)
+        self.backoff_base_seconds = settings.LLM_RETRY_BASE_SECONDS
+        self.backoff_max_seconds = settings.LLM_RETRY_MAX_SECONDS
+        self.completion_reserve_tokens = settings.LLM_RATE_LIMIT_COMPLETION_RESERVE_TOKENS
+        self._queue = []
+        # Bound to the running loop on first use; recreated for every app start.
+        self._condition = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self, prompt_tokens: int, priority: int = PRIORITY_NORMAL) -> int:
+        """
+        Waits until one request and the estimated tokens fit in the buckets and
+        no higher-priority caller is ahead. Returns the tokens reserved, to be
+        passed back to `settle` once the real usage is known.
+        """
+        cost = prompt_tokens + self.completion_reserve_tokens
+        if not self.enabled:
+            return cost
+        condition = self._get_condition()
+        entry = [priority, next(self._sequence), cost]
+        started = time.monotonic()
+        async with condition:
+            heapq.heappush(self._queue, entry)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            try:
+                while True:
+                    timeout = None
+                    if self._queue[0] is entry:
+                        now = time.monotonic()
+                        timeout = max(self._requests.wait_time(1, now), self._tokens.wait_time(cost, now))
+                        if timeout <= 0:
+                            heapq.heappop(self._queue)
+                            self._requests.consume(1)
+                            self._tokens.consume(cost)
+                            break
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                raise
+            finally:
+                # Whoever is at the head now has to re-evaluate.
+                condition.notify_all()
+        waited = time.monotonic() - started
+        self.admitted += 1
+        self.total_wait_seconds += waited
+        if waited > 1:
+            logger.info(f"LLM call ({_PRIORITY_NAMES.get(priority, priority)}) waited {waited:.1f}s for rate-limit capacity.")
+        return cost
+
+    def settle(self, reserved_tokens: int, used_tokens: Optional[int]):
+        """Returns over-reserved tokens to the bucket once the response reports real usage."""
+        if self.enabled and used_tokens is not None and used_tokens < reserved_tokens:
+            self._tokens.refund(reserved_tokens - used_tokens)
+
+    def refund(self, reserved_tokens: int):
+        """Returns the whole reservation of an attempt that failed or was abandoned before completing."""
+        if self.enabled:
+            self._tokens.refund(reserved_tokens)
+
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]):
+        if not self.enabled or not headers:
+            return
+        now = time.monotonic()
+        # Request limits are per day on some providers, so only the token limit is adopted as a per-minute rate.
+        self._requests.sync(
+            _header_int(headers, "x-ratelimit-limit-requests"),
+            _header_int(headers, "x-ratelimit-remaining-requests"),
+            parse_duration(headers.get("x-ratelimit-reset-requests")),
+            now, adopt_limit=False,
+        )
+        self._tokens.sync(
+            _header_int(headers, "x-ratelimit-limit-tokens"),
+            _header_int(headers, "x-ratelimit-remaining-tokens"),
+            parse_duration(headers.get("x-ratelimit-reset-tokens")),
+            now, adopt_limit=True,
+        )
+
+    def retry_delay(self, attempt: int, headers: Optional[Mapping[str, str]] = None) -> float:
+        """
+        Seconds to wait before retry number `attempt` (0-based): the server's
+        retry-after when given, otherwise full-jitter exponential backoff.
+        """
+        retry_after = parse_duration(headers.get("retry-after")) if headers else None
+        if retry_after is not None:
+            # A little jitter so every waiting caller does not return in the same instant.
+            return min(self.backoff_max_seconds, retry_after) + random.uniform(0, self.backoff_base_seconds)
+        return random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt)))
+
+    def record_rate_limited(self, delay: float):
+        """A 429 came back: hold all admissions for `delay` seconds."""
+        self.rate_limited += 1
+        if self.enabled:
+            blocked_until = time.monotonic() + delay
+            self._requests.blocked_until = max(self._requests.blocked_until, blocked_until)
+
+    def record_retry(self):
+        self.retries += 1
+
+    def stats(self) -> Dict[str, Any]:
+        depth_by_priority: Dict[str, int] = {name: 0 for name in _PRIORITY_NAMES.values()}
+        for priority, _, _ in self._queue:
+            name = _PRIORITY_NAMES.get(priority, str(priority))
+            depth_by_priority[name] = depth_by_priority.get(name, 0) + 1
+        now = time.monotonic()
+        return {
+            "enabled": self.enabled,
+            "queue_depth": len(self._queue),
+            "queue_depth_by_priority": depth_by_priority,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "avg_wait_seconds": round(self.total_wait_seconds / self.admitted, 3) if self.admitted else 0.0,
+            "retries": self.retries,
+            "rate_limited_responses": self.rate_limited,
+            "requests_per_minute": self._requests.capacity,
+            "tokens_per_minute": self._tokens.capacity,
+            "requests_available": round(self._requests.level, 1),
+            "tokens_available": round(self._tokens.level, 1),
+            "paused_seconds": round(max(0.0, self._requests.blocked_until - now, self._tokens.blocked_until - now), 2),
+        }
+
+
+rate_limiter = LLMRateLimiter()
+
+
+def initialize_rate_limiter(settings: Settings):
+    rate_limiter.configure(settings)
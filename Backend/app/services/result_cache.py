@@ -0,0 +1,177 @@
+# In file: app/services/result_cache.py
+import hashlib
+import logging
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+import sqlglot
+from sqlglot import exp
+
+from app.core.config import Settings # type: ignore
+from app.services.engine_registry import normalize_dsn # type: ignore
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Canonical rendering of a statement, so formatting and keyword case don't split cache entries."""
+    try:
+        statements = [s for s in sqlglot.parse(sql, read="postgres") if s is not None]
+        if len(statements) == 1:
+            return statements[0].sql(dialect="postgres")
+    except sqlglot.errors.ParseError:
+        pass
+    return _WHITESPACE_RE.sub(" ", sql).strip()
+
+
+def referenced_tables(sql: str) -> Optional[FrozenSet[str]]:
+    """
+    Lower-cased names of every relation the statement(s) touch, or None when the
+    SQL cannot be analysed (callers then have to assume it touches everything).
+    """
+    try:
+        statements = [s for s in sqlglot.parse(sql, read="postgres") if s is not None]
+    except sqlglot.errors.ParseError:
+        return None
+    tables = set()
+    for statement in statements:
+        if isinstance(statement, exp.Command):
+            return None
+        tables.update(table.name.lower() for table in statement.find_all(exp.Table) if table.name)
+    return frozenset(tables)
+
+
+def statements_footprint(statements: Iterable[str]) -> Optional[FrozenSet[str]]:
+    """Union of referenced_tables over several statements; None if any of them cannot be analysed."""
+    touched = set()
+    for statement in statements:
+        tables = referenced_tables(statement)
+        if tables is None:
+            return None
+        touched |= tables
+    return frozenset(touched)
+
+
+class ResultCache:
+    """
+    TTL cache of read-only query results keyed by (DSN, role, normalized SQL),
+    bounded by an approximate memory budget in bytes (pickled size) and evicted
+    LRU. Each entry remembers the tables it read, so writes can invalidate
+    exactly the results they made stale. Cached values must be treated as read-only.
+    """
+
+    def __init__(self, enabled: bool = True, ttl_seconds: int = 300, max_bytes: int = 64 * 1024 * 1024):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        # key -> (dsn, tables or None, stored_at, size, value)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def configure(self, settings: Settings):
+        self.enabled = settings.RESULT_CACHE_ENABLED
+        self.ttl_seconds = settings.RESULT_CACHE_TTL_SECONDS
+        self.max_bytes = settings.RESULT_CACHE_MAX_BYTES
+
+    @staticmethod
+    def make_key(conn_str: str, role: Optional[str], sql: str) -> str:
+        payload = "\x1f".join([normalize_dsn(conn_str), role or "", normalize_sql(sql)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if time.monotonic() - entry[2] <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[4]
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, conn_str: str, sql: str, value: Any):
+        if not self.enabled or self.ttl_seconds <= 0:
+            return
+        try:
+            size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return
+        if size > self.max_bytes:
+            logger.debug(f"Result of {size} bytes exceeds the result-cache budget; not cached.")
+            return
+        dsn = normalize_dsn(conn_str)
+        tables = referenced_tables(sql)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (dsn, tables, time.monotonic(), size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_tables(self, conn_str: str, tables: Optional[Iterable[str]]):
+        """
+        Drops cached results for this DSN that read any of `tables`. With
+        tables=None (unknown footprint), every result for the DSN is dropped.
+        """
+        dsn = normalize_dsn(conn_str)
+        wanted = None if tables is None else {t.lower() for t in tables}
+        with self._lock:
+            stale = [
+                key for key, (entry_dsn, entry_tables, _, _, _) in self._entries.items()
+                if entry_dsn == dsn and (wanted is None or entry_tables is None or entry_tables & wanted)
+            ]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += 1
+        if stale:
+            logger.info(f"Invalidated {len(stale)} cached result(s) for tables {sorted(wanted) if wanted else 'ALL'}.")
+
+    def invalidate_for_statements(self, conn_str: str, statements: Iterable[str], dependent_views: Iterable[str] = ()):
+        """
+        Invalidates whatever the given write/DDL statements may have changed.
+        Cached reads only know the relations they name, so the caller passes the
+        views built on the written tables (see statements_footprint) as well.
+        """
+        touched = statements_footprint(statements)
+        if touched is None:
+            self.invalidate_tables(conn_str, None)
+        elif touched:
+            self.invalidate_tables(conn_str, touched | {view.lower() for view in dependent_views})
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[3]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+result_cache = ResultCache()
+
+
+def initialize_result_cache(settings: Settings):
+    result_cache.configure(settings)
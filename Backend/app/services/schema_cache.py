@@ -0,0 +1,106 @@
+# In file: app/services/schema_cache.py
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import Engine
+
+from app.core.config import Settings # type: ignore
+from app.services import pg_catalog # type: ignore
+from app.services.engine_registry import get_engine, normalize_dsn # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaCache:
+    """
+    Caches introspected schema artefacts per (DSN, kind).
+
+    Every lookup runs a cheap catalog fingerprint query; a cached entry is only
+    served while the fingerprint is unchanged and the entry is younger than the
+    TTL. Cached values are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 32, ttl_seconds: int = 600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def configure(self, settings: Settings):
+        self.max_entries = max(1, settings.SCHEMA_CACHE_MAX_ENTRIES)
+        self.ttl_seconds = settings.SCHEMA_CACHE_TTL_SECONDS
+
+    def get_or_load(self, conn_str: str, kind: str, loader: Callable[[Engine], Any]) -> Tuple[Any, str]:
+        """
+        Returns (value, fingerprint) for the given DSN and artefact kind, calling
+        `loader(engine)` only when nothing valid is cached. Blocking; run it in a thread.
+        """
+        dsn = normalize_dsn(conn_str)
+        engine = get_engine(dsn)
+        fingerprint = None
+        if pg_catalog.is_postgres(engine):
+            with engine.connect() as connection:
+                fingerprint = pg_catalog.fetch_fingerprint(connection)
+
+        key = (dsn, kind)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                cached_fp, stored_at, value = entry
+                fresh = self.ttl_seconds <= 0 or now - stored_at <= self.ttl_seconds
+                if fresh and (fingerprint is None or fingerprint == cached_fp):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value, cached_fp
+                del self._entries[key]
+            self.misses += 1
+
+        value = loader(engine)
+        if fingerprint is None:
+            # Non-Postgres dialects have no catalog digest; fall back to a content hash.
+            fingerprint = hashlib.md5(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+        with self._lock:
+            self._entries[key] = (fingerprint, time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value, fingerprint
+
+    def invalidate(self, conn_str: Optional[str] = None):
+        """Drops every cached artefact for one DSN, or everything when no DSN is given."""
+        with self._lock:
+            if conn_str is None:
+                self._entries.clear()
+            else:
+                dsn = normalize_dsn(conn_str)
+                for key in [k for k in self._entries if k[0] == dsn]:
+                    del self._entries[key]
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+schema_cache = SchemaCache()
+
+
+def initialize_schema_cache(settings: Settings):
+    schema_cache.configure(settings)
@@ -0,0 +1,75 @@
+# In file: app/services/singleflight.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical async calls: the first caller for a key starts
+    the work in its own task and every caller that arrives while it is running
+    awaits the same result. Exceptions reach every waiter. A waiter that is
+    cancelled only stops waiting; the shared work is cancelled when the last
+    waiter is gone. Nothing is cached: once the call finishes, the next caller
+    for the key starts a new one.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self.started = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _task, key=key, call=call: self._forget(key, call))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.debug(f"Single-flight {self.name}: joined in-flight call ({call.waiters} waiting).")
+        call.waiters += 1
+        try:
+            # shield: cancelling one waiter must not cancel the work the others await.
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+                self.abandoned += 1
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+        }
+
+
+# Schema introspection, keyed by normalized DSN (and artefact).
+schema_flight = SingleFlight("schema_introspection")
+# LLM completions, keyed by the hash of model, prompts and response format.
+llm_flight = SingleFlight("llm_calls")
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    return {flight.name: flight.stats() for flight in (schema_flight, llm_flight)}
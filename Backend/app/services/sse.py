@@ -0,0 +1,51 @@
+# In file: app/services/sse.py
+import json
+import logging
+from typing import Any, AsyncIterator
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+
+from app.services.errors import DatabaseServiceError, LLMServiceError # type: ignore
+
+logger = logging.getLogger(__name__)
+
+SSE_MEDIA_TYPE = "text/event-stream"
+# Proxies must not buffer the stream, or partial results arrive all at once.
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def format_event(event: str, data: Any) -> str:
+    """One server-sent event; pydantic models are serialized with their own JSON encoder."""
+    payload = data.model_dump_json() if isinstance(data, BaseModel) else json.dumps(data, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def _with_error_events(events: AsyncIterator[str]) -> AsyncIterator[str]:
+    # Once the 200 and the first bytes are out, failures can only be reported in-band.
+    try:
+        async for event in events:
+            yield event
+    except (DatabaseServiceError, LLMServiceError) as e:
+        logger.error(f"Stream failed: {e}")
+        yield format_event("error", {"status_code": getattr(e, "status_code", 500), "detail": str(e)})
+    except (ValidationError, json.JSONDecodeError) as e:
+        logger.error(f"Stream failed on invalid AI output: {e}")
+        yield format_event("error", {"status_code": 502, "detail": f"The AI agent returned data in an invalid format: {e}"})
+    except HTTPException as e:
+        logger.error(f"Stream failed: {e.detail}")
+        yield format_event("error", {"status_code": e.status_code, "detail": e.detail})
+    except Exception as e:
+        # Anything else would end the stream silently and leave the client without a result.
+        logger.error(f"Unexpected error in stream: {e}", exc_info=True)
+        yield format_event("error", {"status_code": 500, "detail": "An unexpected server error occurred."})
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """
+    Streams pre-formatted events. Errors raised mid-stream become a final `error`
+    event carrying the status code the non-streaming endpoint would have used
+    (500 for unexpected ones).
+    """
+    return StreamingResponse(_with_error_events(events), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
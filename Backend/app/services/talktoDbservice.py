@@ -1,74 +1,306 @@
 import os
+import json
+import asyncio
+import logging
 import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text, inspect, Engine
-from typing import Dict
+from sqlalchemy import text, inspect, Engine
+from app.core.config import Settings, get_settings # type: ignore
+from app.services.engine_registry import get_engine, normalize_dsn # type: ignore
+from app.services import pg_catalog # type: ignore
+from app.services.schema_cache import schema_cache # type: ignore
+from app.services.result_cache import result_cache, statements_footprint # type: ignore
+from app.services.singleflight import schema_flight # type: ignore
+from app.logic.schema_index import SchemaIndex # type: ignore
+from app.logic.sql_guard import guard_sql, GuardedQuery, SQLGuardError # type: ignore
+# The routers catch the shared service errors, so raise those rather than local copies.
+from app.services.errors import DatabaseServiceError # type: ignore
 
-# --- Cache and Thread-Safety Implementation ---
-_engine_cache: Dict[str, Engine] = {}
-_cache_lock = threading.Lock()
+logger = logging.getLogger(__name__)
 
-# --- Custom Exceptions for Clear Error Handling ---
-class ServiceError(Exception):
-    def __init__(self, message, status_code=500):
-        self.message = message
-        self.status_code = status_code
-        super().__init__(self.message)
+# SQLSTATE 57014: query_canceled (raised for both statement_timeout and cancel requests).
+_QUERY_CANCELED_SQLSTATE = "57014"
 
-class DatabaseServiceError(ServiceError): pass
+# --- Dedicated, bounded executor for talk-to-db work ---
+# Schema reads and generated queries can be slow; running them on their own
+# pool keeps them off the event loop and stops them starving other endpoints
+# that share the default executor.
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def initialize_talk_to_db_executor(settings: Settings):
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+    _executor = ThreadPoolExecutor(max_workers=max(1, settings.TALKTODB_MAX_WORKERS), thread_name_prefix="talk-to-db")
+    logger.info(f"Talk-to-DB executor ready with {settings.TALKTODB_MAX_WORKERS} worker(s).")
+
+
+def shutdown_talk_to_db_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="talk-to-db")
+    return _executor
+
+
+# Relevance indexes are built once per schema fingerprint and shared by every request.
+_INDEX_CACHE_MAX_ENTRIES = 16
+_index_cache: "OrderedDict[str, SchemaIndex]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def _get_schema_index(fingerprint: str, catalog: dict) -> SchemaIndex:
+    with _index_cache_lock:
+        index = _index_cache.get(fingerprint)
+        if index is not None:
+            _index_cache.move_to_end(fingerprint)
+            return index
+    index = SchemaIndex(catalog["tables"], catalog["foreign_keys"])
+    with _index_cache_lock:
+        _index_cache[fingerprint] = index
+        while len(_index_cache) > _INDEX_CACHE_MAX_ENTRIES:
+            _index_cache.popitem(last=False)
+    return index
+
+
+class _RunningQuery:
+    """
+    Handle on a query executing in a worker thread, so the event loop can ask
+    the server to cancel it (psycopg2's connection.cancel() sends a PostgreSQL
+    cancel request on a separate socket and is safe to call from another thread).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dbapi_connection = None
+        self.cancelled = False
+
+    def attach(self, dbapi_connection):
+        with self._lock:
+            if self.cancelled:
+                raise DatabaseServiceError("Query was cancelled before it started.", status_code=499)
+            self._dbapi_connection = dbapi_connection
+
+    def detach(self):
+        with self._lock:
+            self._dbapi_connection = None
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            dbapi_connection = self._dbapi_connection
+        if dbapi_connection is not None and hasattr(dbapi_connection, "cancel"):
+            try:
+                dbapi_connection.cancel()
+                logger.info("Sent cancel request for in-flight talk-to-db query.")
+            except Exception as e:
+                logger.warning(f"Failed to cancel in-flight query: {e}")
 
 
 # ===================================================================
 # DATABASE SERVICE CLASS (with Caching)
 # ===================================================================
 class DatabaseService:
+    def __init__(self, settings: Optional[Settings] = None):
+        self.settings = settings or get_settings()
+
     def _get_or_create_engine(self, conn_str: str) -> Engine:
-        if conn_str in _engine_cache:
-            return _engine_cache[conn_str]
-        with _cache_lock:
-            if conn_str in _engine_cache:
-                return _engine_cache[conn_str]
-            print(f"INFO:     Creating and caching new PostgreSQL engine...")
-            try:
-                engine = create_engine(conn_str, pool_recycle=3600, pool_pre_ping=True)
-                _engine_cache[conn_str] = engine
-                return engine
-            except Exception as e:
-                raise DatabaseServiceError(f"Failed to create database engine: {e}", status_code=400)
+        # Engines are shared process-wide through the pooled engine registry.
+        return get_engine(conn_str)
 
-    def get_schema_representation(self, conn_str: str) -> str:
-        engine = self._get_or_create_engine(conn_str)
+    async def get_schema_context(self, conn_str: str, prompt: str, top_k: int) -> Tuple[str, str]:
+        """
+        Returns (schema text for the prompt, schema fingerprint). Only the tables
+        most relevant to `prompt`, and the FK join paths between them, are
+        rendered; schemas with at most `top_k` tables (or top_k <= 0) are sent whole.
+        """
+        loop = asyncio.get_running_loop()
+        return await schema_flight.do(
+            (normalize_dsn(conn_str), "talk_to_db_context", prompt, top_k),
+            lambda: loop.run_in_executor(_get_executor(), self._get_schema_context_sync, conn_str, prompt, top_k),
+        )
+
+    def _get_schema_context_sync(self, conn_str: str, prompt: str, top_k: int) -> Tuple[str, str]:
         try:
-            inspector = inspect(engine)
-            schema_parts = []
-            # Get schemas (like 'public')
-            for schema_name in inspector.get_schema_names():
-                 if schema_name.startswith('pg_') or schema_name == 'information_schema':
-                     continue
-                 for table_name in inspector.get_table_names(schema=schema_name):
-                    columns = inspector.get_columns(table_name, schema=schema_name)
-                    column_defs = [f"{col['name']} (type: {col['type']})" for col in columns]
-                    schema_parts.append(f'Schema "{schema_name}", Table "{table_name}" has columns: {", ".join(column_defs)}.')
-            if not schema_parts:
+            catalog, fingerprint = schema_cache.get_or_load(conn_str, "talk_to_db_catalog", self._load_catalog)
+            index = _get_schema_index(fingerprint, catalog)
+            if len(index) == 0:
                 raise DatabaseServiceError("No user tables found in the database.", status_code=404)
-            return "\n".join(schema_parts)
+            if top_k <= 0 or len(index) <= top_k:
+                return index.render(list(index.tables)), fingerprint
+            selected = index.select_tables(prompt, top_k)
+            logger.info(f"Schema context: {len(selected)} of {len(index)} tables selected for the prompt.")
+            return index.render(selected), fingerprint
+        except DatabaseServiceError:
+            raise
         except Exception as e:
             raise DatabaseServiceError(f"Failed to inspect schema. Error: {e}", status_code=500)
 
-    def execute_query(self, conn_str: str, sql_query: str):
+    def _load_catalog(self, engine: Engine) -> dict:
+        """Tables (as [schema, table, columns]) and foreign keys, in a JSON-friendly shape."""
+        if pg_catalog.is_postgres(engine):
+            with engine.connect() as connection:
+                tables = pg_catalog.fetch_table_columns(connection)
+                foreign_keys = pg_catalog.fetch_foreign_keys(connection)
+            return {
+                "tables": [[schema_name, table_name, columns] for (schema_name, table_name), columns in tables.items()],
+                "foreign_keys": foreign_keys,
+            }
+        inspector = inspect(engine)
+        catalog = {"tables": [], "foreign_keys": []}
+        for schema_name in inspector.get_schema_names():
+            if schema_name.startswith('pg_') or schema_name == 'information_schema':
+                continue
+            for table_name in inspector.get_table_names(schema=schema_name):
+                columns = [
+                    {"column_name": col['name'], "data_type": str(col['type'])}
+                    for col in inspector.get_columns(table_name, schema=schema_name)
+                ]
+                catalog["tables"].append([schema_name, table_name, columns])
+                for fk in inspector.get_foreign_keys(table_name, schema=schema_name):
+                    catalog["foreign_keys"].append({
+                        "name": fk.get('name'),
+                        "referencing_schema": schema_name,
+                        "referencing_table": table_name,
+                        "referencing_columns": fk['constrained_columns'],
+                        "referenced_schema": fk.get('referred_schema') or schema_name,
+                        "referenced_table": fk['referred_table'],
+                        "referenced_columns": fk['referred_columns'],
+                    })
+        return catalog
+
+    async def execute_query(self, conn_str: str, sql_query: str, timeout_ms: Optional[int] = None, use_result_cache: bool = False):
+        """Runs the query on the talk-to-db executor; returns {"data": [dicts]} or {"message": ...}."""
+        return await self._execute(conn_str, sql_query, timeout_ms, use_result_cache, as_rows=False)
+
+    async def execute_query_rows(self, conn_str: str, sql_query: str, timeout_ms: Optional[int] = None, use_result_cache: bool = False):
+        """
+        Like execute_query, but read results come back as {"columns": [...], "rows": [tuples]}
+        so columnar encoders can consume them without building a dict per row.
+        """
+        return await self._execute(conn_str, sql_query, timeout_ms, use_result_cache, as_rows=True)
+
+    async def _execute(self, conn_str: str, sql_query: str, timeout_ms: Optional[int], use_result_cache: bool, as_rows: bool):
+        running = _RunningQuery()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            _get_executor(), self._execute_query_sync, conn_str, sql_query, timeout_ms, use_result_cache, running
+        )
+        try:
+            outcome = await future
+        except asyncio.CancelledError:
+            # The awaiting request went away (client disconnect); stop the query server-side too.
+            running.cancel()
+            raise
+        if "message" in outcome or as_rows:
+            return outcome
+        columns = outcome["columns"]
+        return {"data": [dict(zip(columns, row)) for row in outcome["rows"]], "truncated": outcome["truncated"]}
+
+    def _execute_query_sync(self, conn_str: str, sql_query: str, timeout_ms: Optional[int], use_result_cache: bool, running: _RunningQuery):
+        try:
+            guarded = guard_sql(sql_query, self.settings.TALKTODB_MAX_ROWS, read_only=self.settings.TALKTODB_READ_ONLY)
+        except SQLGuardError as e:
+            raise DatabaseServiceError(f"Generated SQL was rejected: {e}", status_code=400)
+
+        cache_key = result_cache.make_key(conn_str, None, guarded.sql) if guarded.is_read else None
+        if cache_key and use_result_cache:
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        outcome = self._execute_guarded_sync(conn_str, guarded, timeout_ms, running)
+        if cache_key:
+            # Bypassing requests still refresh the entry for everyone else.
+            result_cache.put(cache_key, conn_str, guarded.sql, outcome)
+        return outcome
+
+    def _execute_guarded_sync(self, conn_str: str, guarded: GuardedQuery, timeout_ms: Optional[int], running: _RunningQuery):
+
         engine = self._get_or_create_engine(conn_str)
         try:
             with engine.connect() as connection:
-                if not sql_query.strip().lower().startswith("select"):
+                running.attach(connection.connection.dbapi_connection)
+                try:
                     with connection.begin():
-                        result = connection.execute(text(sql_query))
-                        return {"message": f"Operation successful. {result.rowcount} rows affected."}
-                else:
-                    result = connection.execute(text(sql_query))
-                    rows = [dict(row._mapping) for row in result.fetchall()]
-                    return {"data": rows}
+                        if guarded.is_read and pg_catalog.is_postgres(connection):
+                            # The guard only sees the statement, not what the functions it calls do.
+                            connection.execute(text("SET TRANSACTION READ ONLY"))
+                        if timeout_ms and pg_catalog.is_postgres(connection):
+                            connection.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+                        if guarded.is_read and self.settings.TALKTODB_MAX_PLAN_COST > 0 and pg_catalog.is_postgres(connection):
+                            self._check_plan_cost(connection, guarded)
+                        dependent_views = []
+                        touched = None if guarded.is_read else statements_footprint([guarded.sql])
+                        if touched and pg_catalog.is_postgres(connection):
+                            # Looked up before the write, so views it drops are still found.
+                            dependent_views = pg_catalog.fetch_dependent_views(connection, touched)
+                        outcome = self._run_guarded(connection, guarded)
+                    if not guarded.is_read:
+                        result_cache.invalidate_for_statements(conn_str, [guarded.sql], dependent_views)
+                    return outcome
+                finally:
+                    running.detach()
+        except DatabaseServiceError:
+            raise
         except Exception as e:
+            if getattr(getattr(e, "orig", None), "pgcode", None) == _QUERY_CANCELED_SQLSTATE:
+                if running.cancelled:
+                    raise DatabaseServiceError("Query was cancelled because the client disconnected.", status_code=499)
+                raise DatabaseServiceError(f"Query exceeded statement_timeout of {timeout_ms} ms.", status_code=504)
             raise DatabaseServiceError(f"SQL execution failed. Check query syntax. Error: {e}", status_code=400)
 
+    def _check_plan_cost(self, connection, guarded: GuardedQuery):
+        """Refuses reads whose estimated planner cost exceeds TALKTODB_MAX_PLAN_COST."""
+        plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {guarded.sql}")).scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        total_cost = plan[0]["Plan"]["Total Cost"]
+        if total_cost > self.settings.TALKTODB_MAX_PLAN_COST:
+            raise DatabaseServiceError(
+                f"Query refused: estimated planner cost {total_cost:.0f} exceeds the limit of "
+                f"{self.settings.TALKTODB_MAX_PLAN_COST:.0f}. Narrow the question or add filters.",
+                status_code=422,
+            )
+
+    def _run_guarded(self, connection, guarded: GuardedQuery):
+        """
+        Executes the guarded statement, reading result rows in bounded batches.
+        Returns {"columns", "rows" (tuples), "truncated"} for reads, {"message"} otherwise.
+        """
+        batch_size = max(1, self.settings.TALKTODB_FETCH_BATCH_SIZE)
+        statement = text(guarded.sql)
+        if guarded.is_read:
+            statement = statement.execution_options(stream_results=True, max_row_buffer=batch_size)
+        result = connection.execute(statement)
+        if not result.returns_rows:
+            return {"message": f"Operation successful. {result.rowcount} rows affected."}
+
+        columns = list(result.keys())
+        limit = guarded.max_rows
+        rows = []
+        while limit is None or len(rows) <= limit:
+            batch = result.fetchmany(batch_size)
+            if not batch:
+                break
+            rows.extend(batch)
+        result.close()
+        truncated = limit is not None and len(rows) > limit
+        if truncated:
+            rows = rows[:limit]
+            logger.info(f"Talk-to-DB result truncated to {limit} rows.")
+
+        return {"columns": columns, "rows": [tuple(row) for row in rows], "truncated": truncated}
+
 def get_db_service():
     return DatabaseService()
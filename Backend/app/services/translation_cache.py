@@ -0,0 +1,94 @@
+# In file: app/services/translation_cache.py
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.config import Settings # type: ignore
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Whitespace- and trailing-punctuation-insensitive form of a question. Case is
+    kept: literals such as 'Smith' and 'smith' match different rows.
+    """
+    return _WHITESPACE_RE.sub(" ", prompt).strip().rstrip("?.!;").strip()
+
+
+class TranslationCache:
+    """
+    In-memory LRU/TTL cache of NL-to-SQL translations keyed by
+    (normalized prompt, schema fingerprint, model). A schema change produces a
+    new fingerprint, so stale translations are simply never looked up again and
+    age out of the LRU. Only SQL that executed successfully should be stored.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: int = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, settings: Settings):
+        self.max_entries = max(0, settings.TALKTODB_TRANSLATION_CACHE_MAX_ENTRIES)
+        self.ttl_seconds = settings.TALKTODB_TRANSLATION_CACHE_TTL_SECONDS
+
+    @staticmethod
+    def make_key(prompt: str, fingerprint: str, model: str) -> str:
+        return hashlib.sha256("\x1f".join([normalize_prompt(prompt), fingerprint, model]).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                sql, stored_at = entry
+                if self.ttl_seconds <= 0 or time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return sql
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, sql: str):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (sql, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key: str):
+        """Drops a translation, e.g. when the cached SQL stopped executing cleanly."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+translation_cache = TranslationCache()
+
+
+def initialize_translation_cache(settings: Settings):
+    translation_cache.configure(settings)
@@ -0,0 +1,72 @@
+# In file: benchmarks/bench_columnar_output.py
+"""
+Compares serialization cost of one /fetch-view-data page in JSON vs Arrow IPC
+vs Parquet, on synthetic rows shaped like a typical governed view.
+
+Run from the Backend directory:
+    python -m benchmarks.bench_columnar_output --rows 100000
+"""
+import argparse
+import datetime
+import decimal
+import json
+import time
+
+from app.api import models # type: ignore
+from app.services import columnar # type: ignore
+
+COLUMNS = ["id", "email", "full_name", "balance", "is_active", "created_at"]
+
+
+def make_rows(count: int):
+    base = datetime.datetime(2024, 1, 1)
+    return [
+        (
+            i,
+            f"user{i}@example.com",
+            f"User Number {i}",
+            decimal.Decimal(i % 10000) / 100,
+            i % 3 != 0,
+            base + datetime.timedelta(seconds=i),
+        )
+        for i in range(count)
+    ]
+
+
+def encode_json(columns, rows) -> bytes:
+    # Mirrors the endpoint: dict per row -> response model -> JSON body.
+    response = models.FetchViewDataResponse(
+        view_name="bench_governed_view",
+        row_count=len(rows),
+        data=[dict(zip(columns, row)) for row in rows],
+    )
+    return json.dumps(response.model_dump(mode="json")).encode()
+
+
+def timed(label, fn, repeat):
+    best, size = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn())
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<10} {best * 1000:10.1f} ms {size / 1024:12.1f} KiB")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    print(f"{args.rows} rows x {len(COLUMNS)} columns (best of {args.repeat})")
+    print(f"{'format':<10} {'time':>13} {'payload':>16}")
+    json_time = timed("json", lambda: encode_json(COLUMNS, rows), args.repeat)
+    for fmt in ("arrow", "parquet"):
+        fmt_time = timed(fmt, lambda: columnar.encode(COLUMNS, rows, fmt), args.repeat)
+        print(f"{'':<10} {json_time / fmt_time:10.1f}x faster than json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# In file: benchmarks/bench_prompt_encoding.py
+"""
+Compares prompt size of the previous pretty-printed JSON schema payloads with
+the compact encodings in app.logic.prompt_encoding, per endpoint, on a
+synthetic schema shaped like a typical OLTP database.
+
+Run from the Backend directory:
+    python -m benchmarks.bench_prompt_encoding --tables 50
+"""
+import argparse
+import json
+
+from app.api import models # type: ignore
+from app.logic import prompt_encoding # type: ignore
+
+COLUMN_TEMPLATE = [
+    ("id", "integer"),
+    ("created_at", "timestamp without time zone"),
+    ("updated_at", "timestamp without time zone"),
+    ("name", "character varying(255)"),
+    ("email", "character varying(255)"),
+    ("status", "text"),
+    ("amount", "numeric(12,2)"),
+    ("is_active", "boolean"),
+]
+
+
+def make_schema(table_count: int) -> models.ExtractedSchema:
+    tables = {}
+    foreign_keys = []
+    for i in range(table_count):
+        columns = [models.ExtractedColumn(column_name=name, data_type=dtype) for name, dtype in COLUMN_TEMPLATE]
+        if i:
+            columns.append(models.ExtractedColumn(column_name=f"table_{i - 1}_id", data_type="integer"))
+            foreign_keys.append(models.ExtractedForeignKey(
+                referencing_table=f"table_{i}", referencing_columns=[f"table_{i - 1}_id"],
+                referenced_table=f"table_{i - 1}", referenced_columns=["id"],
+            ))
+        tables[f"table_{i}"] = models.ExtractedTable(columns=columns, schema_name="public")
+    return models.ExtractedSchema(tables=tables, foreign_keys=foreign_keys)
+
+
+def classify(schema: models.ExtractedSchema) -> list:
+    return [
+        models.ClassifiedTable(
+            table_name=name,
+            columns=[
+                models.ClassifiedColumn(
+                    column_name=c.column_name, data_type=c.data_type,
+                    classification=models.DataClassification.PII if c.column_name == "email" else models.DataClassification.PUBLIC,
+                    reasoning="",
+                )
+                for c in table.columns
+            ],
+        )
+        for name, table in schema.tables.items()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=50)
+    args = parser.parse_args()
+
+    schema = make_schema(args.tables)
+    classified = classify(schema)
+    first_name, first_table = next(iter(schema.tables.items()))
+    payloads = {
+        "classify_data": (
+            json.dumps(schema.model_dump(), indent=2),
+            prompt_encoding.encode_schema(schema),
+        ),
+        "generate_masking_sql": (
+            json.dumps([t.model_dump(include={"table_name": True, "columns": {"__all__": {"column_name", "data_type", "classification"}}}) for t in classified], indent=2),
+            prompt_encoding.encode_classified_tables(classified),
+        ),
+        "explain_referential_integrity": (
+            json.dumps({"foreign_keys": [fk.model_dump() for fk in schema.foreign_keys], "all_tables": list(schema.tables)}, indent=2),
+            "\n".join(prompt_encoding.encode_foreign_key(fk) for fk in schema.foreign_keys),
+        ),
+        "generate_quality_plan": (
+            json.dumps(first_table.model_dump(), indent=2),
+            prompt_encoding.encode_table(first_name, first_table),
+        ),
+    }
+
+    print(f"{args.tables} tables x {len(COLUMN_TEMPLATE)}+ columns (estimated tokens)")
+    print(f"{'endpoint':<32} {'json':>9} {'compact':>9} {'saved':>7}")
+    for endpoint, (before, after) in payloads.items():
+        before_tokens = prompt_encoding.estimate_tokens(before)
+        after_tokens = prompt_encoding.estimate_tokens(after)
+        print(f"{endpoint:<32} {before_tokens:>9} {after_tokens:>9} {1 - after_tokens / before_tokens:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from app.services import engine_registry  # type: ignore
+from app.services.engine_registry import EngineRegistry  # type: ignore
+
+
+class _FakePool:
+    async def close(self):
+        pass
+
+
+def test_slow_dsn_does_not_block_other_dsns(monkeypatch):
+    created = []
+
+    async def fake_create_pool(dsn, **kwargs):
+        created.append(dsn)
+        if "slow" in dsn:
+            await asyncio.sleep(0.5)
+        return _FakePool()
+
+    monkeypatch.setattr(engine_registry.asyncpg, "create_pool", fake_create_pool)
+    registry = EngineRegistry()
+
+    async def run():
+        slow = [asyncio.create_task(registry.get_async_pool("postgresql://u@slow/db")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        fast = await registry.get_async_pool("postgresql://u@fast/db")
+        fast_elapsed = time.monotonic() - started
+        slow_pools = await asyncio.gather(*slow)
+        return fast, fast_elapsed, slow_pools
+
+    fast, fast_elapsed, slow_pools = asyncio.run(run())
+
+    assert fast_elapsed < 0.2
+    assert all(pool is slow_pools[0] for pool in slow_pools)
+    assert sum("slow" in dsn for dsn in created) == 1
+
+
+def test_failed_pool_creation_is_retried(monkeypatch):
+    attempts = []
+
+    async def fake_create_pool(dsn, **kwargs):
+        attempts.append(dsn)
+        if len(attempts) == 1:
+            raise OSError("connection refused")
+        return _FakePool()
+
+    monkeypatch.setattr(engine_registry.asyncpg, "create_pool", fake_create_pool)
+    registry = EngineRegistry()
+
+    async def run():
+        try:
+            await registry.get_async_pool("postgresql://u@host/db")
+        except engine_registry.DatabaseServiceError as e:
+            first_error = e
+        else:
+            first_error = None
+        pool = await registry.get_async_pool("postgresql://u@host/db")
+        return first_error, pool
+
+    first_error, pool = asyncio.run(run())
+
+    assert first_error is not None and first_error.status_code == 500
+    assert isinstance(pool, _FakePool)
+    assert len(attempts) == 2
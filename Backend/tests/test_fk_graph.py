@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+import pytest
+
+from app.api import models  # type: ignore
+from app.logic import referential_integrity  # type: ignore
+from app.logic.fk_graph import FKGraph  # type: ignore
+from app.services.errors import LLMServiceError  # type: ignore
+
+
+def _fk(referencing, referenced, column="id"):
+    return models.ExtractedForeignKey(
+        referencing_table=referencing,
+        referencing_columns=[f"{referenced}_{column}"],
+        referenced_table=referenced,
+        referenced_columns=[column],
+    )
+
+
+def _schema(tables, foreign_keys):
+    return models.ExtractedSchema(
+        tables={name: models.ExtractedTable(columns=[models.ExtractedColumn(column_name="id", data_type="integer")]) for name in tables},
+        foreign_keys=foreign_keys,
+    )
+
+
+@pytest.fixture
+def graph():
+    # customers <- orders <- order_items -> products; employees references itself;
+    # a <-> b form a cycle that c depends on; lonely has no keys at all.
+    return FKGraph(_schema(
+        ["customers", "orders", "order_items", "products", "employees", "a", "b", "c", "lonely"],
+        [
+            _fk("orders", "customers"),
+            _fk("order_items", "orders"),
+            _fk("order_items", "products"),
+            _fk("employees", "employees"),
+            _fk("a", "b"),
+            _fk("b", "a"),
+            _fk("c", "a"),
+        ],
+    ))
+
+
+def test_roots_are_tables_that_reference_nothing(graph):
+    assert graph.roots == ["customers", "products", "employees", "lonely"]
+
+
+def test_depth_is_the_longest_reference_chain(graph):
+    assert graph.depth["customers"] == 0
+    assert graph.depth["orders"] == 1
+    assert graph.depth["order_items"] == 2
+    assert graph.depth["employees"] == 0
+
+
+def test_cycles_share_one_depth(graph):
+    assert graph.depth["a"] == graph.depth["b"] == 0
+    assert graph.depth["c"] == 1
+
+
+def test_cycles_include_self_references(graph):
+    assert sorted(graph.cycles) == [["a", "b"], ["employees"]]
+    assert graph.in_cycle("a") and graph.in_cycle("employees")
+    assert not graph.in_cycle("orders")
+
+
+def test_impact_set_is_every_transitive_dependent_nearest_first(graph):
+    assert graph.impact_set("customers") == ["orders", "order_items"]
+    assert graph.impact_set("products") == ["order_items"]
+    assert graph.impact_set("order_items") == []
+    assert graph.impact_set("a") == ["b", "c"]
+    assert graph.impact_set("employees") == []
+
+
+def test_components_group_connected_tables(graph):
+    components = sorted(sorted(members) for members in graph.components)
+
+    assert components == [["a", "b", "c"], ["customers", "order_items", "orders", "products"], ["employees"], ["lonely"]]
+
+
+def test_tables_outside_the_extraction_become_external_nodes():
+    graph = FKGraph(_schema(["orders"], [_fk("orders", "customers")]))
+
+    assert graph.external_tables == {"customers"}
+    assert graph.roots == ["customers"]
+    assert referential_integrity.build_report(graph, [], []).foundational_tables == []
+
+
+class _FakeLLM:
+    def __init__(self, fail_all=False):
+        self.fail_all = fail_all
+
+    async def call_llm(self, system_prompt, user_prompt, **kwargs):
+        if self.fail_all:
+            raise LLMServiceError("Groq API unavailable", 503)
+        if "orders.customers_id -> customers.id" in user_prompt:
+            return json.dumps({
+                "relationship_explanations": [{
+                    "from_table": "orders", "to_table": "customers",
+                    "business_rule": "Every order belongs to a customer.", "impact_of_change": "Orders lose their customer.",
+                }],
+                "foundational_tables": [],
+            })
+        if "products" in user_prompt:
+            raise LLMServiceError("rate limited", 429)
+        return '{"relationship_explanations": [{"from_table": '
+
+
+def test_explain_schema_falls_back_for_failed_batches(graph):
+    report = asyncio.run(referential_integrity.explain_schema(graph, _FakeLLM(), concurrency=2, max_items_per_batch=1))
+
+    rules = {(item.from_table, item.to_table): item.business_rule for item in report.relationship_explanations}
+    assert len(rules) == len(graph.foreign_keys)
+    assert rules[("orders", "customers")] == "Every order belongs to a customer."
+    assert rules[("order_items", "products")] == "Every `order_items` row must point to an existing `products` row."
+    assert [item.table_name for item in report.foundational_tables] == ["customers", "products", "employees", "lonely"]
+
+
+def test_explain_schema_raises_when_every_batch_fails(graph):
+    with pytest.raises(LLMServiceError):
+        asyncio.run(referential_integrity.explain_schema(graph, _FakeLLM(fail_all=True), concurrency=2, max_items_per_batch=1))
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+from groq import APIConnectionError
+
+from app.services import llm_service
+from app.services.rate_limiter import LLMRateLimiter
+
+DELAY_SECONDS = 0.2
+CONCURRENT_CALLS = 8
+
+
+class _RawResponse:
+    headers = {}
+
+    def __init__(self, content: str, total_tokens=None):
+        self._content = content
+        self._total_tokens = total_tokens
+
+    async def parse(self):
+        usage = SimpleNamespace(total_tokens=self._total_tokens) if self._total_tokens is not None else None
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self._content))],
+            usage=usage,
+        )
+
+
+class _DelayedCompletions:
+    """Stands in for AsyncGroq.chat.completions.with_raw_response: every call takes DELAY_SECONDS."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, model, messages, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(DELAY_SECONDS)
+        finally:
+            self.in_flight -= 1
+        return _RawResponse(f"answer to {messages[-1]['content']}")
+
+
+def test_concurrent_calls_overlap(monkeypatch):
+    completions = _DelayedCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(with_raw_response=completions)))
+    monkeypatch.setattr(llm_service, "groq_client", client)
+    monkeypatch.setattr(llm_service.response_cache, "enabled", False)
+    monkeypatch.setattr(llm_service.limiter, "enabled", False)
+
+    async def run():
+        monkeypatch.setattr(llm_service, "_llm_semaphore", asyncio.Semaphore(CONCURRENT_CALLS))
+        service = llm_service.LLMService()
+        started = time.perf_counter()
+        # Distinct prompts, so single-flight does not coalesce them into one call.
+        answers = await asyncio.gather(*(
+            service.call_llm("system", f"question {i}", endpoint="test") for i in range(CONCURRENT_CALLS)
+        ))
+        return answers, time.perf_counter() - started
+
+    answers, elapsed = asyncio.run(run())
+
+    assert answers == [f"answer to question {i}" for i in range(CONCURRENT_CALLS)]
+    assert completions.max_in_flight == CONCURRENT_CALLS
+    # Serialized calls would take CONCURRENT_CALLS * DELAY_SECONDS (1.6s).
+    assert elapsed < DELAY_SECONDS * 3
+
+
+class _FlakyCompletions:
+    """Fails the first call with a connection error, then answers reporting USED_TOKENS of usage."""
+
+    USED_TOKENS = 100
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, model, messages, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise APIConnectionError(request=httpx.Request("POST", "https://api.groq.test"))
+        return _RawResponse("ok", total_tokens=self.USED_TOKENS)
+
+
+def test_failed_attempt_refunds_its_token_reservation(monkeypatch):
+    completions = _FlakyCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(with_raw_response=completions)))
+    limiter = LLMRateLimiter(requests_per_minute=0, tokens_per_minute=10000, enabled=True)
+    limiter.backoff_base_seconds = 0.0
+    monkeypatch.setattr(llm_service, "groq_client", client)
+    monkeypatch.setattr(llm_service, "limiter", limiter)
+    monkeypatch.setattr(llm_service.response_cache, "enabled", False)
+
+    async def run():
+        monkeypatch.setattr(llm_service, "_llm_semaphore", asyncio.Semaphore(1))
+        return await llm_service.LLMService().call_llm("system", "question", endpoint="test")
+
+    assert asyncio.run(run()) == "ok"
+    assert completions.calls == 2
+    # Only the successful attempt's real usage is charged; the failed one was refunded.
+    assert 10000 - _FlakyCompletions.USED_TOKENS <= limiter.stats()["tokens_available"] < 10000 - _FlakyCompletions.USED_TOKENS + 50
@@ -0,0 +1,165 @@
+import pytest
+
+from app.api import models  # type: ignore
+from app.logic import masking_compiler  # type: ignore
+from app.logic.data_gov_logic import clean_masking_plan  # type: ignore
+
+PII = models.DataClassification.PII
+SENSITIVE = models.DataClassification.SENSITIVE
+PUBLIC = models.DataClassification.PUBLIC
+
+
+def _column(name, data_type="text", classification=PII):
+    return models.ClassifiedColumn(column_name=name, data_type=data_type, classification=classification)
+
+
+def _masked(name, literal):
+    return f"CASE WHEN current_user = 'admin' THEN \"{name}\" ELSE {literal} END AS \"{name}\""
+
+
+@pytest.mark.parametrize(
+    "data_type, literal",
+    [
+        ("text", "'***'"),
+        ("character varying(255)", "'***'"),
+        ("VARCHAR(255)", "'***'"),
+        ("bpchar", "'***'"),
+        ("integer", "'0'"),
+        ("numeric(10,2)", "'0'"),
+        ("double precision", "'0'"),
+        ("date", "'1970-01-01'"),
+        ("timestamp(6) without time zone", "'1970-01-01 00:00:00'"),
+        ("TIMESTAMP(3) WITH TIME ZONE", "'1970-01-01 00:00:00+00'"),
+        ("time with time zone", "'00:00:00'"),
+        ("boolean", "'false'"),
+        ("uuid", "'00000000-0000-0000-0000-000000000000'"),
+        ("jsonb", "'{}'"),
+        ("bytea", "''"),
+        ("inet", "'0.0.0.0'"),
+        ("text[]", "NULL"),
+        ("character varying(64)[]", "NULL"),
+        ("integer[]", "NULL"),
+        ("mood_enum", "NULL"),
+        ("geometry(Point,4326)", "NULL"),
+    ],
+)
+def test_mask_literal_by_type_family(data_type, literal):
+    assert masking_compiler.mask_literal(data_type) == literal
+
+
+def test_only_pii_and_sensitive_columns_are_masked():
+    assert masking_compiler.compile_column(_column("email"), set()) == _masked("email", "'***'")
+    assert masking_compiler.compile_column(_column("salary", "numeric", SENSITIVE), set()) == _masked("salary", "'0'")
+    assert masking_compiler.compile_column(_column("country", classification=PUBLIC), set()) == '"country"'
+
+
+def test_key_columns_are_never_masked():
+    table = models.ClassifiedTable(
+        table_name="customers",
+        schema_name="sales",
+        columns=[_column("customer_id", "integer"), _column("account_no", "text", SENSITIVE), _column("email")],
+    )
+
+    view = masking_compiler.compile_view(table, ["customer_id", "account_no"])
+
+    assert '        "customer_id",\n        "account_no",\n' in view
+    assert _masked("email", "'***'") in view
+    assert "CASE WHEN current_user = 'admin' THEN \"customer_id\"" not in view
+    assert "CASE WHEN current_user = 'admin' THEN \"account_no\"" not in view
+
+
+def test_compile_masking_plan_looks_up_keys_per_table():
+    tables = [
+        models.ClassifiedTable(table_name="customers", columns=[_column("id", "integer")]),
+        models.ClassifiedTable(table_name="orders", columns=[_column("id", "integer")]),
+        models.ClassifiedTable(table_name="empty", columns=[]),
+    ]
+
+    statements = masking_compiler.compile_masking_plan(tables, {"customers": ["id"]})
+
+    assert len(statements) == 2
+    assert '        "id"\n' in statements[0]
+    assert _masked("id", "'0'") in statements[1]
+
+
+def test_identifiers_with_embedded_quotes_are_escaped():
+    table = models.ClassifiedTable(
+        table_name='odd"table',
+        schema_name='my"schema',
+        columns=[_column('e"mail'), _column('k"ey', "integer")],
+    )
+
+    view = masking_compiler.compile_view(table, ['k"ey'])
+
+    assert view.startswith('CREATE OR REPLACE VIEW "my""schema"."odd""table_governed_view" AS')
+    assert view.endswith('FROM\n        "my""schema"."odd""table";')
+    assert 'THEN "e""mail" ELSE \'***\' END AS "e""mail"' in view
+    assert '        "k""ey"' in view
+
+
+def test_view_name_is_unqualified_when_schema_is_unknown():
+    table = models.ClassifiedTable(table_name="customers", columns=[_column("email")])
+
+    view = masking_compiler.compile_view(table)
+
+    assert view.startswith('CREATE OR REPLACE VIEW "customers_governed_view" AS')
+    assert view.endswith('FROM\n        "customers";')
+
+
+def _customers():
+    return models.ClassifiedTable(
+        table_name="customers",
+        columns=[_column("id", "integer"), _column("email"), _column("phone"), _column("country", classification=PUBLIC)],
+    )
+
+
+def _plan(table):
+    return {column["column_name"]: column["select_expression"] for column in table["columns"]}
+
+
+def test_clean_masking_plan_matches_reordered_expressions_by_alias():
+    llm_data = {"tables": [{"table_name": "customers", "columns": [
+        {"select_expression": '"country"'},
+        {"select_expression": _masked("phone", "'***'")},
+        {"select_expression": '"id"'},
+        {"select_expression": _masked("email", "'***'")},
+    ]}]}
+
+    cleaned = clean_masking_plan(llm_data, [_customers()], {"customers": ["id"]})
+
+    table = cleaned["tables"][0]
+    assert [column["column_name"] for column in table["columns"]] == ["id", "email", "phone", "country"]
+    assert _plan(table) == {
+        "id": '"id"',
+        "email": _masked("email", "'***'"),
+        "phone": _masked("phone", "'***'"),
+        "country": '"country"',
+    }
+
+
+def test_clean_masking_plan_compiles_dropped_columns_with_known_keys():
+    llm_data = {"tables": [{"table": "customers", "select": [_masked("email", "'***'"), '"country"']}]}
+
+    cleaned = clean_masking_plan(llm_data, [_customers()], {"customers": ["id"]})
+
+    plan = _plan(cleaned["tables"][0])
+    assert plan["id"] == '"id"'
+    assert plan["phone"] == _masked("phone", "'***'")
+    assert plan["email"] == _masked("email", "'***'")
+
+
+def test_clean_masking_plan_leaves_dropped_columns_unmasked_without_keys():
+    llm_data = {"tables": [{"table_name": "customers", "columns": [{"select_expression": _masked("email", "'***'")}]}]}
+
+    cleaned = clean_masking_plan(llm_data, [_customers()])
+
+    plan = _plan(cleaned["tables"][0])
+    assert plan["id"] == '"id"'
+    assert plan["phone"] == '"phone"'
+    assert plan["email"] == _masked("email", "'***'")
+
+
+def test_clean_masking_plan_skips_tables_the_model_left_out():
+    cleaned = clean_masking_plan({"tables": [{"table_name": "other", "columns": []}]}, [_customers()], {})
+
+    assert cleaned["tables"] == []
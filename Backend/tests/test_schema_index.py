@@ -0,0 +1,62 @@
+from app.logic.schema_index import SchemaIndex  # type: ignore
+
+
+def _columns(*names):
+    return [{"column_name": name, "data_type": "integer"} for name in names]
+
+
+def _index():
+    tables = [
+        ["sales", "customers", _columns("id", "name")],
+        ["sales", "orders", _columns("id", "customer_id", "total")],
+        ["archive", "orders", _columns("id", "customer_id", "archived_at")],
+    ]
+    foreign_keys = [
+        {
+            "name": "orders_customer_fk",
+            "referencing_schema": "sales", "referencing_table": "orders", "referencing_columns": ["customer_id"],
+            "referenced_schema": "sales", "referenced_table": "customers", "referenced_columns": ["id"],
+        },
+        {
+            "name": "archived_orders_customer_fk",
+            "referencing_schema": "archive", "referencing_table": "orders", "referencing_columns": ["customer_id"],
+            "referenced_schema": "sales", "referenced_table": "customers", "referenced_columns": ["id"],
+        },
+    ]
+    return SchemaIndex(tables, foreign_keys)
+
+
+def test_same_named_tables_in_different_schemas_are_kept_apart():
+    index = _index()
+
+    assert len(index) == 3
+    assert ("sales", "orders") in index.tables and ("archive", "orders") in index.tables
+
+
+def test_render_qualifies_tables_and_joins_by_schema():
+    index = _index()
+
+    rendered = index.render(list(index.tables))
+
+    assert '"archive"."orders": id integer, customer_id integer, archived_at integer' in rendered
+    assert '"sales"."orders": id integer, customer_id integer, total integer' in rendered
+    assert '- "archive"."orders"."customer_id" = "sales"."customers"."id"' in rendered
+    assert '- "sales"."orders"."customer_id" = "sales"."customers"."id"' in rendered
+
+
+def test_select_tables_uses_schema_terms_and_fk_bridges():
+    index = _index()
+
+    selected = index.select_tables("archived orders", top_k=1)
+
+    assert selected == [("archive", "orders")]
+    assert ("archive", "orders") in index.select_tables("customer names of archive orders", top_k=2)
+
+
+def test_foreign_keys_without_schema_resolve_only_unambiguous_names():
+    tables = [["s1", "a", _columns("id", "b_id")], ["s1", "b", _columns("id")], ["s2", "b", _columns("id")]]
+    foreign_keys = [{"referencing_table": "a", "referencing_columns": ["b_id"], "referenced_table": "b", "referenced_columns": ["id"]}]
+
+    index = SchemaIndex(tables, foreign_keys)
+
+    assert index.foreign_keys == []
@@ -0,0 +1,111 @@
+import pytest
+
+from app.logic.sql_guard import SQLGuardError, guard_sql  # type: ignore
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "INSERT INTO orders (id) VALUES (1)",
+        "UPDATE orders SET total = 0",
+        "DELETE FROM orders",
+        "DROP TABLE orders",
+        "CREATE TABLE t (id int)",
+        "ALTER TABLE orders ADD COLUMN note text",
+        "TRUNCATE orders",
+        "GRANT SELECT ON orders TO analyst",
+    ],
+)
+def test_writes_and_ddl_are_refused_in_read_only_mode(sql):
+    with pytest.raises(SQLGuardError, match="read-only"):
+        guard_sql(sql, max_rows=100)
+
+
+def test_writes_pass_through_unchanged_when_not_read_only():
+    guarded = guard_sql("UPDATE orders SET total = 0;", max_rows=100, read_only=False)
+
+    assert not guarded.is_read
+    assert guarded.statement_type == "UPDATE"
+    assert guarded.sql == "UPDATE orders SET total = 0"
+    assert guarded.max_rows is None
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT 1; SELECT 2",
+        "SELECT * FROM orders; DROP TABLE orders",
+        "SELECT * FROM orders;; DELETE FROM orders",
+    ],
+)
+def test_multiple_statements_are_refused(sql):
+    with pytest.raises(SQLGuardError, match="Exactly one SQL statement"):
+        guard_sql(sql, max_rows=100, read_only=False)
+
+
+def test_empty_and_unparsable_sql_is_refused():
+    with pytest.raises(SQLGuardError, match="empty"):
+        guard_sql(" ;\n", max_rows=100)
+    with pytest.raises(SQLGuardError, match="could not be parsed"):
+        guard_sql("SELECT FROM WHERE (", max_rows=100)
+
+
+def test_limit_is_added_with_a_probe_row():
+    guarded = guard_sql("```sql\nSELECT * FROM orders\n```", max_rows=100)
+
+    assert guarded.is_read
+    assert guarded.sql == "SELECT * FROM orders LIMIT 101"
+    assert guarded.max_rows == 100
+    assert guarded.probe_row_added
+
+
+def test_smaller_own_limit_is_kept():
+    guarded = guard_sql("SELECT * FROM orders LIMIT 5", max_rows=100)
+
+    assert guarded.sql == "SELECT * FROM orders LIMIT 5"
+    assert guarded.max_rows == 5
+    assert not guarded.probe_row_added
+
+
+def test_larger_own_limit_is_clamped():
+    guarded = guard_sql("SELECT * FROM orders ORDER BY id LIMIT 100000", max_rows=100)
+
+    assert guarded.sql == "SELECT * FROM orders ORDER BY id LIMIT 101"
+    assert guarded.max_rows == 100
+    assert guarded.probe_row_added
+
+
+def test_non_literal_limit_is_capped_from_the_outside():
+    guarded = guard_sql("SELECT * FROM orders FETCH FIRST 500 ROWS ONLY", max_rows=100)
+
+    assert guarded.sql.startswith("SELECT * FROM (SELECT * FROM orders")
+    assert guarded.sql.endswith(") AS _guarded LIMIT 101")
+
+
+def test_read_only_cte_is_a_read():
+    guarded = guard_sql("WITH recent AS (SELECT * FROM orders WHERE total > 10) SELECT id FROM recent", max_rows=10)
+
+    assert guarded.is_read
+    assert guarded.statement_type == "SELECT"
+    assert guarded.sql.endswith("LIMIT 11")
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "WITH gone AS (DELETE FROM orders RETURNING id) SELECT * FROM gone",
+        "SELECT * FROM orders FOR UPDATE",
+        "SELECT id FROM orders WHERE id IN (SELECT order_id FROM order_items FOR SHARE)",
+        "SELECT * INTO orders_copy FROM orders",
+    ],
+)
+def test_selects_with_side_effects_are_refused(sql):
+    with pytest.raises(SQLGuardError, match="side effects"):
+        guard_sql(sql, max_rows=100)
+
+
+def test_row_locking_select_is_not_treated_as_a_read():
+    guarded = guard_sql("SELECT * FROM orders FOR UPDATE", max_rows=100, read_only=False)
+
+    assert not guarded.is_read
+    assert guarded.max_rows is None
@@ -0,0 +1,13 @@
+from app.services.translation_cache import TranslationCache, normalize_prompt  # type: ignore
+
+
+def test_normalize_prompt_folds_whitespace_and_trailing_punctuation():
+    assert normalize_prompt("  How many\n orders   per customer?! ") == "How many orders per customer"
+
+
+def test_prompts_differing_only_in_literal_case_do_not_share_an_entry():
+    cache = TranslationCache()
+    cache.put(cache.make_key("orders for 'Smith'", "fp", "model"), "SELECT * FROM orders WHERE name = 'Smith'")
+
+    assert cache.get(cache.make_key("orders for 'smith'", "fp", "model")) is None
+    assert cache.get(cache.make_key("orders  for 'Smith'?", "fp", "model")) == "SELECT * FROM orders WHERE name = 'Smith'"
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from app.services.db_service import ViewExport  # type: ignore
+
+
+class _FakeResult:
+    def __init__(self, batches, fetching, release):
+        self._batches = batches
+        self._fetching = fetching
+        self._release = release
+        self.closed_mid_fetch = False
+        self.connection = None
+
+    def keys(self):
+        return ["id"]
+
+    def partitions(self, size):
+        for batch in self._batches:
+            self._fetching.set()
+            self._release.wait(1)
+            if self.connection.closed:
+                self.closed_mid_fetch = True
+            yield batch
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_close_waits_for_the_batch_being_fetched():
+    fetching, release = threading.Event(), threading.Event()
+    connection = _FakeConnection()
+    result = _FakeResult([[(1,)], [(2,)]], fetching, release)
+    result.connection = connection
+    export = ViewExport(connection, result, "ndjson", batch_size=1)
+    chunks = iter(export)
+
+    reader = threading.Thread(target=lambda: next(chunks))
+    reader.start()
+    fetching.wait(1)
+    closer = threading.Thread(target=export.close)
+    closer.start()
+    time.sleep(0.05)
+    assert not connection.closed
+
+    release.set()
+    reader.join(1)
+    closer.join(1)
+
+    assert connection.closed
+    assert not result.closed_mid_fetch
+    assert list(chunks) == []
@@ -165,7 +165,7 @@ const AIAgentPage = () => {
         if (!classifications) return;
         setIsLoading(true); setCurrentStep('Generating...'); setError(null);
         try {
-            const res = await postGenerateMaskingSQL(classifications);
+            const res = await postGenerateMaskingSQL(connectionString, classifications);
             setSqlStatements(res.sql_statements);
         } catch (err: any) { setError(err.message || 'SQL Generation failed.'); }
         finally { setIsLoading(false); setCurrentStep(''); }
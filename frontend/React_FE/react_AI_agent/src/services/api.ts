@@ -20,6 +20,53 @@ async function request<T>(endpoint: string, options: RequestInit = {}): Promise<
   }
 }
 
+export type StreamHandlers = {
+  [event: string]: ((data: any) => void) | undefined;
+};
+
+// POSTs to a server-sent-events endpoint and calls handlers[event] with the parsed
+// data of every event as it arrives. Resolves with the `done` payload; an `error`
+// event (a failure after streaming began) is thrown like any other API error.
+async function streamSSE<T>(endpoint: string, body: unknown, handlers: StreamHandlers = {}, signal?: AbortSignal): Promise<T> {
+  const response = await fetch(`${API_BASE_URL}${endpoint}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify(body),
+    signal,
+  });
+  if (!response.ok || !response.body) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.detail || 'An API error occurred');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result: T | undefined;
+  while (true) {
+    const { value, done } = await reader.read();
+    buffer += decoder.decode(value, { stream: !done });
+    const blocks = buffer.split('\n\n');
+    buffer = done ? '' : blocks.pop() ?? '';
+    for (const block of blocks) {
+      let event = 'message';
+      const dataLines: string[] = [];
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart());
+      }
+      if (!dataLines.length) continue;
+      const data = JSON.parse(dataLines.join('\n'));
+      if (event === 'error') throw new Error(data.detail || 'The stream failed.');
+      if (event === 'done') result = data;
+      handlers[event]?.(data);
+    }
+    if (done) break;
+  }
+  if (result === undefined) throw new Error(`Stream from ${endpoint} ended without a result.`);
+  return result;
+}
+
 export interface TableDetails {
   columns: {
     column_name: string;
@@ -67,6 +114,18 @@ export const postExplainIntegrity = (connection_string: string) => {
     });
 };
 
+export type IntegrityStreamHandlers = {
+  graph?: (data: { table_dependencies: any[]; cycles: string[][] }) => void;
+  relationship?: (item: RelationshipExplanation) => void;
+  foundational_table?: (item: FoundationalTable) => void;
+  invalid?: (data: { kind: string; error: string; item: any }) => void;
+};
+
+// Progressive variant of postExplainIntegrity: each explanation is handed over as soon as it is written.
+export const streamExplainIntegrity = (connection_string: string, handlers: IntegrityStreamHandlers = {}, signal?: AbortSignal) => {
+    return streamSSE<ReferentialIntegrityResponse>('/data-gov/explain_referential_integrity/stream', { connection_string }, handlers, signal);
+};
+
 
 
 export interface RelationshipExplanation {
@@ -89,6 +148,7 @@ export interface ReferentialIntegrityResponse {
 
 export interface ClassificationResult {
   table_name: string;
+  schema_name?: string | null;
   columns: {
     column_name: string;
     data_type: string;
@@ -103,10 +163,20 @@ export const postClassifyData = (schema_data: ExtractedSchema) => {
   });
 };
 
-export const postGenerateMaskingSQL = (classification_results: ClassificationResult[]) => {
+export type ClassificationStreamHandlers = {
+  table?: (table: ClassificationResult) => void;
+  invalid?: (data: { kind: string; error: string; item: any }) => void;
+};
+
+// Progressive variant of postClassifyData: each table is handed over once all of its columns are classified.
+export const streamClassifyData = (schema_data: ExtractedSchema, handlers: ClassificationStreamHandlers = {}, signal?: AbortSignal) => {
+  return streamSSE<{ classification_results: ClassificationResult[] }>('/data-gov/classify_data/stream', { schema_data }, handlers, signal);
+};
+
+export const postGenerateMaskingSQL = (connection_string: string, classification_results: ClassificationResult[]) => {
   return request<{ sql_statements: string[]; message: string }>('/data-gov/generate_masking_sql', {
     method: 'POST',
-    body: JSON.stringify({ classification_results }),
+    body: JSON.stringify({ connection_string, classification_results }),
   });
 };
 
@@ -269,4 +339,19 @@ export const postExecuteQualityChecks = async (connectionString: string, tableNa
         throw new Error(errorData.detail || 'Failed to execute quality checks.');
     }
     return response.json();
-};
\ No newline at end of file
+};
+
+export type QualityPlanStreamHandlers = {
+  check?: (check: ProposedQualityCheck) => void;
+  invalid?: (data: { kind: string; error: string; item: any }) => void;
+};
+
+// Progressive variant of postGenerateQualityPlan: each proposed check is handed over as soon as it is written.
+export const streamQualityPlan = (connectionString: string, tableName: string, handlers: QualityPlanStreamHandlers = {}, signal?: AbortSignal): Promise<GenerateQualityPlanResponse> => {
+    return streamSSE<GenerateQualityPlanResponse>(
+        '/data-quality/generate-quality-plan/stream',
+        { connection_string: connectionString, table_name: tableName },
+        handlers,
+        signal,
+    );
+};